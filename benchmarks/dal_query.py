@@ -0,0 +1,67 @@
+"""Benchmark `DataAccessLayer.query` against `DataAccessLayer.query_arrow` on a wide float table.
+
+A local SQLite file is used as a stand-in for the warehouse. If `duckdb-engine` is installed,
+the same table is also benchmarked on DuckDB, which exercises the native arrow fetch.
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from data_access_layer import DataAccessLayer
+
+
+def make_data(n_rows: int, n_cols: int) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    return pd.DataFrame(rng.random((n_rows, n_cols)), columns=[f"f_{i}" for i in range(n_cols)])
+
+
+def best_of(func: Callable, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        ts = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - ts)
+    return min(timings)
+
+
+def run(dal: DataAccessLayer, name: str, repeat: int):
+    query = "SELECT * FROM wide"
+    t_pandas = best_of(lambda: dal.query(query), repeat)
+    t_arrow = best_of(lambda: dal.query_arrow(query), repeat)
+    t_arrow_pandas = best_of(lambda: dal.query_arrow(query).to_pandas(), repeat)
+    logger.info(f"[{name}] query:                    {t_pandas:.3f}s")
+    logger.info(f"[{name}] query_arrow:              {t_arrow:.3f}s ({t_pandas / t_arrow:.1f}x)")
+    logger.info(f"[{name}] query_arrow().to_pandas(): {t_arrow_pandas:.3f}s ({t_pandas / t_arrow_pandas:.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-rows", type=int, default=500_000)
+    parser.add_argument("--n-cols", type=int, default=11)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    data = make_data(args.n_rows, args.n_cols)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        dal = DataAccessLayer(f"sqlite:///{Path(tmpdir) / 'bench.db'}").connect()
+        data.to_sql("wide", dal.engine, index=False, chunksize=50_000)
+        run(dal, "sqlite", args.repeat)
+
+        try:
+            import duckdb_engine  # noqa: F401
+        except ImportError:
+            logger.warning("duckdb-engine is not installed. Skipping the duckdb benchmark")
+            return
+        dal = DataAccessLayer(f"duckdb:///{Path(tmpdir) / 'bench.duckdb'}").connect()
+        data.to_sql("wide", dal.engine, index=False, chunksize=50_000)
+        run(dal, "duckdb", args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Benchmark `BaseFeatureView.read` with and without `fast_coerce_types` on each feature view.
+
+The sklearn datasets are loaded in an in memory SQLite database, as in the extract tasks.
+"""
+import argparse
+import time
+from typing import Callable, Type
+
+import pandas as pd
+from loguru import logger
+
+from data_access_layer.dal import SklearnDataAccessLayer
+from feature_store.feature_views import BaseFeatureView, DiabetesFeatureView, IrisFeatureView
+
+
+def best_of(func: Callable[[], pd.DataFrame], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        ts = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - ts)
+    return min(timings)
+
+
+def run(dal: SklearnDataAccessLayer, feature_view: Type[BaseFeatureView], repeat: int):
+    name = feature_view.__name__
+    data = feature_view.read(dal)
+    compact = feature_view.read(dal, fast_coerce_types=True)
+    t_read = best_of(lambda: feature_view.read(dal), repeat)
+    t_fast = best_of(lambda: feature_view.read(dal, fast_coerce_types=True), repeat)
+    size, compact_size = data.memory_usage(deep=True).sum(), compact.memory_usage(deep=True).sum()
+    logger.info(f"[{name}] read:                         {t_read * 1000:.1f}ms {size / 1024:.1f} KiB")
+    logger.info(
+        f"[{name}] read(fast_coerce_types=True): {t_fast * 1000:.1f}ms {compact_size / 1024:.1f} KiB "
+        f"({t_read / t_fast:.1f}x faster, {size / compact_size:.1f}x smaller)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    dal = SklearnDataAccessLayer().connect()
+    for feature_view in (DiabetesFeatureView, IrisFeatureView):
+        run(dal, feature_view, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Benchmark stacked `GroupFeatureGenerator`s against a single `MultiGroupFeatureGenerator`.
+
+Both compute the same mean, median, min, max and percentile features of a target over the
+same group columns, as done when stacking generators in a `ColumnTransformer`.
+"""
+import argparse
+import time
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+from sklearn.compose import ColumnTransformer
+
+from feature_store.derived_features.aggregated_features import GroupFeatureGenerator, MultiGroupFeatureGenerator
+
+METRICS = ["mean", "median", "min", "max"]
+PERCENTILES = [0.1, 0.25, 0.75, 0.9]
+
+
+def make_data(n_rows: int, n_groups: int) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    return pd.DataFrame(
+        {
+            "industry": rng.integers(0, n_groups, n_rows).astype(str),
+            "country": rng.choice(["US", "FR", "ES", "DE"], n_rows),
+            "sales": rng.random(n_rows),
+        }
+    )
+
+
+def best_of(func: Callable, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        ts = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - ts)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-rows", type=int, default=1_000_000)
+    parser.add_argument("--n-groups", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    data = make_data(args.n_rows, args.n_groups)
+    X, y = data[["industry", "country"]], data.sales
+    group_cols = ["industry", "country"]
+
+    generators = [(m, GroupFeatureGenerator(group_cols, m), group_cols) for m in METRICS]
+    generators += [
+        (f"p{q}", GroupFeatureGenerator(group_cols, "percentile", percentile_q=q), group_cols) for q in PERCENTILES
+    ]
+    stacked = ColumnTransformer(generators, n_jobs=1)
+    multi = MultiGroupFeatureGenerator(group_cols, METRICS, percentiles=PERCENTILES)
+
+    t_stacked = best_of(lambda: stacked.fit(X, y), args.repeat)
+    t_multi = best_of(lambda: multi.fit(X, y), args.repeat)
+    logger.info(f"{len(generators)} stacked GroupFeatureGenerator fit: {t_stacked:.3f}s")
+    logger.info(f"MultiGroupFeatureGenerator fit:            {t_multi:.3f}s ({t_stacked / t_multi:.1f}x)")
+
+    t_stacked = best_of(lambda: stacked.transform(X), args.repeat)
+    t_multi = best_of(lambda: multi.transform(X), args.repeat)
+    logger.info(f"{len(generators)} stacked GroupFeatureGenerator transform: {t_stacked:.3f}s")
+    logger.info(f"MultiGroupFeatureGenerator transform:            {t_multi:.3f}s ({t_stacked / t_multi:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Benchmark `load_mlflow_model_with_flavour` with and without a `ModelCache`.
+
+A random forest is registered in a temporary sqlite MLFlow registry and loaded through its
+`models:/name/Production` URI, as the scoring jobs do.
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import mlflow
+import numpy as np
+from loguru import logger
+from sklearn.ensemble import RandomForestRegressor
+
+from models.model_cache import ModelCache
+from models.predict import load_mlflow_model_with_flavour
+
+
+def register_model(name: str) -> str:
+    rng = np.random.default_rng(42)
+    X = rng.random((1_000, 20))
+    model = RandomForestRegressor(n_estimators=100, random_state=42).fit(X, X.sum(axis=1))
+    with mlflow.start_run():
+        model_info = mlflow.sklearn.log_model(model, "model", registered_model_name=name)
+    mlflow.MlflowClient().transition_model_version_stage(name, model_info.registered_model_version, "Production")
+    return f"models:/{name}/Production"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--flavour", default="sklearn", choices=["sklearn", "pyfunc"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)  # NOTE: the artifacts are stored in ./mlruns
+        mlflow.set_tracking_uri(f"sqlite:///{Path(tmp_dir) / 'mlruns.db'}")
+        model_uri = register_model("benchmark")
+
+        ts = time.perf_counter()
+        for _ in range(args.repeat):
+            load_mlflow_model_with_flavour(model_uri, args.flavour)
+        logger.info(f"no cache:          {(time.perf_counter() - ts) / args.repeat * 1000:8.1f}ms per load")
+
+        cache = ModelCache(cache_dir=str(Path(tmp_dir) / "model_cache"))
+        for _ in range(args.repeat):
+            load_mlflow_model_with_flavour(model_uri, args.flavour, cache=cache)
+        logger.info(f"memory cache miss: {cache.load_seconds * 1000:8.1f}ms, including the download")
+        logger.info(f"memory cache hit:  {cache.hit_seconds / cache.hits * 1000:8.1f}ms, resolving the stage")
+
+        cache = ModelCache(cache_dir=str(Path(tmp_dir) / "model_cache"))  # NOTE: as in another process
+        load_mlflow_model_with_flavour(model_uri, args.flavour, cache=cache)
+        logger.info(f"disk cache hit:    {cache.load_seconds * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
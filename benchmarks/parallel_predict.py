@@ -0,0 +1,53 @@
+"""Benchmark the throughput of `Predictor` batch predictions from 1 to N worker processes.
+
+The model is a gradient boosting regressor, whose `predict` is single threaded, so the
+sequential `predict_in_batches` only uses one core whatever the joblib backend.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+from sklearn.ensemble import GradientBoostingRegressor
+
+from models.predict import Config, Predictor
+
+
+def make_data(n_rows: int, n_cols: int) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    return pd.DataFrame(rng.random((n_rows, n_cols)), columns=[f"f_{i}" for i in range(n_cols)])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-rows", type=int, default=1_000_000)
+    parser.add_argument("--n-cols", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    X = make_data(args.n_rows, args.n_cols)
+    X_train = X.head(5_000)
+    model = GradientBoostingRegressor(n_estimators=200, random_state=42).fit(X_train, X_train.sum(axis=1))
+    config = Config(src_features="", src_model="models:/benchmark/1", dst_y_hat="", progress_bar=False)
+    predictor = Predictor(config)
+
+    ts = time.perf_counter()
+    y_hat = predictor.predict_in_batches(model, X, args.batch_size)
+    baseline = args.n_rows / (time.perf_counter() - ts)
+    logger.info(f"predict_in_batches:                {baseline:12,.0f} rows/s")
+
+    for n_workers in range(1, args.max_workers + 1):
+        ts = time.perf_counter()
+        y_hat_processes = predictor.predict_in_processes(model, X, args.batch_size, n_workers)
+        throughput = args.n_rows / (time.perf_counter() - ts)
+        assert np.allclose(y_hat, y_hat_processes)
+        logger.info(
+            f"predict_in_processes({n_workers:2d} workers): {throughput:12,.0f} rows/s ({throughput / baseline:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
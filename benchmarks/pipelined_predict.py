@@ -0,0 +1,55 @@
+"""Benchmark `Predictor.predict_to_parquet` with its stages one after the other or overlapped.
+
+The features are compressed with zstd, so reading and writing take a share of the time
+comparable to the predictions of a linear model. The time of each stage is logged.
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+from sklearn.linear_model import LinearRegression
+
+from data_access_layer.parquet import LazyParquet
+from models.predict import Config, Predictor
+
+
+def write_features(path: str, n_rows: int, n_cols: int):
+    rng = np.random.default_rng(42)
+    data = pd.DataFrame(rng.random((n_rows, n_cols)), columns=[f"f_{i}" for i in range(n_cols)])
+    data.to_parquet(path, compression="zstd", row_group_size=100_000)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-rows", type=int, default=4_000_000)
+    parser.add_argument("--n-cols", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=100_000)
+    parser.add_argument("--queue-sizes", type=int, nargs="+", default=[0, 2])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        src = str(Path(tmp_dir) / "features.parquet")
+        write_features(src, args.n_rows, args.n_cols)
+        X_train = pd.read_parquet(src).head(10_000)
+        model = LinearRegression().fit(X_train, X_train.sum(axis=1))
+        predictor = Predictor(
+            Config(src_features=src, src_model="models:/benchmark/1", dst_y_hat="", progress_bar=False)
+        )
+        for queue_size in args.queue_sizes:
+            dst = str(Path(tmp_dir) / f"y_hat_{queue_size}.parquet")
+            ts = time.perf_counter()
+            predictor.predict_to_parquet(model, LazyParquet(src), dst, args.batch_size, queue_size)
+            elapsed = time.perf_counter() - ts
+            stages = ", ".join(
+                f"{stage} {timing.busy:.2f}s busy {timing.waiting:.2f}s waiting"
+                for stage, timing in predictor.stage_timings.items()
+            )
+            logger.info(f"[queue_size={queue_size}] {elapsed:.2f}s ({stages})")
+
+
+if __name__ == "__main__":
+    main()
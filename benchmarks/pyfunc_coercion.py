@@ -0,0 +1,59 @@
+"""Benchmark the per batch coercion of the pyfunc model inputs in `Predictor.predict_in_batches`.
+
+The previous implementation, which read the input schema and cast and copied every batch, is
+kept here as the reference. The model predictions themselves are not timed.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+from mlflow.types.schema import ColSpec, Schema
+
+from models.predict import Predictor, PreparedModel
+
+
+def make_data(n_rows: int, n_cols: int) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    data = pd.DataFrame(rng.random((n_rows, n_cols)), columns=[f"f_{i}" for i in range(n_cols)])
+    data["count"] = rng.integers(0, 100, n_rows)
+    return data
+
+
+def previous_coerce(input_schema: Schema, X: pd.DataFrame) -> pd.DataFrame:
+    dtypes = Predictor.get_pandas_dtypes_from_input_schema(input_schema)
+    return X.astype(dtypes).replace({pd.NA: None})
+
+
+def time_batches(coerce, X: pd.DataFrame, batch_size: int) -> float:
+    ts = time.perf_counter()
+    for i in range(0, len(X), batch_size):
+        coerce(X.iloc[i : i + batch_size])  # noqa: E203
+    return time.perf_counter() - ts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-rows", type=int, default=200_000)
+    parser.add_argument("--n-cols", type=int, default=50)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 1_000, 10_000])
+    args = parser.parse_args()
+
+    X = make_data(args.n_rows, args.n_cols)
+    input_schema = Schema([ColSpec("double", name) for name in X.columns[:-1]] + [ColSpec("long", "count")])
+    prepared = PreparedModel(None)
+    prepared.dtypes = Predictor.get_pandas_dtypes_from_input_schema(input_schema)  # NOTE: as read from a pyfunc
+
+    for batch_size in args.batch_sizes:
+        t_previous = time_batches(lambda batch: previous_coerce(input_schema, batch), X, batch_size)
+        t_prepared = time_batches(prepared.coerce, X, batch_size)
+        n_batches = -(-args.n_rows // batch_size)
+        logger.info(
+            f"[batch_size={batch_size}] previous: {t_previous / n_batches * 1e6:8.0f}us/batch, "
+            f"prepared: {t_prepared / n_batches * 1e6:8.0f}us/batch ({t_previous / t_prepared:.0f}x faster)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Benchmark `BaseSchema.validate` against `coerce_filter_columns` and `validate_fast`.
+
+The schema has float columns, an int column with a builtin check and a date column with the
+`date_time_iso_format` regex check, as the feature views do.
+"""
+import argparse
+import time
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+import pandera as pa
+from loguru import logger
+
+from datasets.datasets import BaseSchema
+
+
+class BenchmarkSchema(BaseSchema):
+    f_0: float
+    f_1: float
+    f_2: float
+    f_3: float
+    count: int = pa.Field(ge=0)
+    country: str = pa.Field(isin=["US", "FR", "ES", "DE"])
+    created_date: str
+
+
+def make_data(n_rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    data = pd.DataFrame({f"f_{i}": rng.random(n_rows).astype(np.float32) for i in range(4)})
+    data["count"] = rng.integers(0, 100, n_rows)
+    data["country"] = rng.choice(["US", "FR", "ES", "DE"], n_rows)
+    dates = pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 10**8, 1_000), unit="s")
+    data["created_date"] = rng.choice(dates.strftime("%Y-%m-%dT%H:%M:%SZ"), n_rows)
+    data["extra"] = 1
+    return data
+
+
+def timeit(func: Callable) -> float:
+    ts = time.perf_counter()
+    func()
+    return time.perf_counter() - ts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--sample", type=int, default=10_000)
+    args = parser.parse_args()
+
+    for n_rows in args.n_rows:
+        data = make_data(n_rows)
+        t_validate = timeit(lambda: BenchmarkSchema.validate(data))
+        t_coerce = timeit(lambda: BenchmarkSchema.coerce_filter_columns(data))
+        t_fast = timeit(lambda: BenchmarkSchema.validate_fast(data, sample=args.sample))
+        t_fast_full = timeit(lambda: BenchmarkSchema.validate_fast(data, sample=None))
+        logger.info(f"[{n_rows:,} rows] validate:                   {t_validate:.3f}s")
+        logger.info(f"[{n_rows:,} rows] coerce_filter_columns:      {t_coerce:.3f}s (no checks)")
+        logger.info(f"[{n_rows:,} rows] validate_fast(sample={args.sample}): {t_fast:.3f}s")
+        logger.info(f"[{n_rows:,} rows] validate_fast(sample=None):  {t_fast_full:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Benchmark the peak memory of `Predictor.run` against `Predictor.predict_to_parquet`.
+
+Each mode runs in its own process and reports the growth of its peak resident memory over
+the memory after the imports and the model fit, since Arrow allocations are not seen by
+`tracemalloc`. The peak is read from `/proc`, so the benchmark only runs on linux.
+
+The streaming memory is bounded by the row group size of the features, which defaults to the
+batch size. Pass `--row-group-size 0` to write them in a single row group.
+"""
+import argparse
+import multiprocessing
+import tempfile
+import time
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from loguru import logger
+from sklearn.linear_model import LinearRegression
+
+from data_access_layer.parquet import LazyParquet
+from models.predict import Config, Predictor
+
+
+def reset_peak_rss():
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+
+
+def read_rss() -> Tuple[int, int]:
+    """Current and peak resident memory of the process in bytes."""
+    with open("/proc/self/status") as f:
+        status = dict(line.split(":", 1) for line in f)
+    return int(status["VmRSS"].split()[0]) * 1024, int(status["VmHWM"].split()[0]) * 1024
+
+
+def write_features(path: str, n_rows: int, n_cols: int, row_group_size: int | None):
+    rng = np.random.default_rng(42)
+    data = pd.DataFrame(rng.random((n_rows, n_cols)), columns=[f"f_{i}" for i in range(n_cols)])
+    data.to_parquet(path, row_group_size=row_group_size)
+
+
+def run(mode: str, src: str, dst: str, batch_size: int, queue: multiprocessing.Queue):
+    features = LazyParquet(src)
+    X_train = pq.ParquetFile(src).read_row_group(0).to_pandas()
+    model = LinearRegression().fit(X_train, X_train.sum(axis=1))
+    predictor = Predictor(Config(src_features=src, src_model="models:/benchmark/1", dst_y_hat=dst, progress_bar=False))
+    reset_peak_rss()
+    rss, _ = read_rss()
+    ts = time.perf_counter()
+    if mode == "stream":
+        predictor.predict_to_parquet(model, features, dst, batch_size)
+    else:
+        predictor.run(model, features).y_hat.to_frame().to_parquet(dst)
+    elapsed = time.perf_counter() - ts
+    _, peak = read_rss()
+    queue.put((peak - rss, elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-rows", type=int, nargs="+", default=[1_000_000, 4_000_000])
+    parser.add_argument("--n-cols", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=100_000)
+    parser.add_argument("--row-group-size", type=int, default=None, help="Defaults to the batch size")
+    args = parser.parse_args()
+    row_group_size = args.batch_size if args.row_group_size is None else args.row_group_size or None
+
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_rows in args.n_rows:
+            src = str(Path(tmp_dir) / "features.parquet")
+            write_features(src, n_rows, args.n_cols, row_group_size)
+            results = {}
+            for mode in ("run", "stream"):
+                queue = context.Queue()
+                process = context.Process(
+                    target=run, args=(mode, src, str(Path(tmp_dir) / f"y_hat_{mode}.parquet"), args.batch_size, queue)
+                )
+                process.start()
+                results[mode] = queue.get()
+                process.join()
+            pd.testing.assert_frame_equal(
+                pd.read_parquet(Path(tmp_dir) / "y_hat_run.parquet"),
+                pd.read_parquet(Path(tmp_dir) / "y_hat_stream.parquet"),
+            )
+            for mode, (peak, elapsed) in results.items():
+                logger.info(f"[{n_rows:,} rows] {mode:6s}: {peak / 2**20:8.1f} MiB peak {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Benchmark the peak memory of the derived features transformers on a wide frame.
+
+The previous implementations, which copied the whole input frame, are kept here as the
+reference. Peak memory is measured with `tracemalloc`, which tracks the numpy buffers.
+"""
+import argparse
+import time
+import tracemalloc
+from typing import Callable, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from feature_store.derived_features.aggregated_features import GroupFeatureGenerator
+from feature_store.derived_features.row_features import FormulaTransformer
+
+
+def make_data(n_rows: int, n_cols: int) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    data = pd.DataFrame(rng.random((n_rows, n_cols)), columns=[f"f_{i}" for i in range(n_cols)])
+    data["country"] = rng.choice(["US", "FR", "ES", "DE"], n_rows)
+    return data
+
+
+def peak_memory(func: Callable) -> Tuple[float, float]:
+    """Peak memory allocated by the function in MiB, and its duration in seconds."""
+    tracemalloc.start()
+    ts = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - ts
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2**20, elapsed
+
+
+def copying_group_transform(generator: GroupFeatureGenerator, X: pd.DataFrame) -> pd.DataFrame:
+    X = X.copy()
+    new_col_name = generator._get_new_col_name()
+    X[new_col_name] = X.set_index(generator.group_cols).index.map(generator.values_by_group)
+    return X[[new_col_name]]
+
+
+def copying_group_fit(X: pd.DataFrame, y: pd.Series) -> pd.Series:
+    X = X.copy()
+    X[y.name] = y
+    return X.groupby(["country"])[y.name].mean()
+
+
+def copying_formula_transform(transformer: FormulaTransformer, X: pd.DataFrame) -> pd.DataFrame:
+    return X.eval(transformer.formula)[transformer._get_feature_name_out_from_formula()]
+
+
+def report(name: str, previous: Callable, current: Callable):
+    previous_peak, previous_time = peak_memory(previous)
+    current_peak, current_time = peak_memory(current)
+    logger.info(f"[{name}] copying: {previous_peak:8.1f} MiB peak {previous_time:.3f}s")
+    logger.info(
+        f"[{name}] current: {current_peak:8.1f} MiB peak {current_time:.3f}s "
+        f"({previous_peak / max(current_peak, 1e-9):.0f}x less memory)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-rows", type=int, default=200_000)
+    parser.add_argument("--n-cols", type=int, default=200)
+    args = parser.parse_args()
+
+    X = make_data(args.n_rows, args.n_cols)
+    logger.info(f"Input frame: {X.memory_usage(deep=True).sum() / 2**20:.1f} MiB")
+
+    generator = GroupFeatureGenerator(group_cols=["country"], group_metric="mean").fit(X, X.f_0)
+    report(
+        "GroupFeatureGenerator.transform",
+        lambda: copying_group_transform(generator, X),
+        lambda: generator.transform(X),
+    )
+    report(
+        "GroupFeatureGenerator.fit",
+        lambda: copying_group_fit(X, X.f_0),
+        lambda: GroupFeatureGenerator(["country"], "mean").fit(X, X.f_0),
+    )
+
+    transformer = FormulaTransformer(formula="ratio = f_1 / f_2")
+    report(
+        "FormulaTransformer.transform",
+        lambda: copying_formula_transform(transformer, X),
+        lambda: transformer.fit_transform(X),
+    )
+
+
+if __name__ == "__main__":
+    main()
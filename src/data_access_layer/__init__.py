@@ -1,3 +1,14 @@
+from data_access_layer.async_dal import AsyncDataAccessLayer
+from data_access_layer.cache import QueryCache
 from data_access_layer.dal import DataAccessLayer, InMemoryDataAccessLayer
+from data_access_layer.engines import PoolConfig, dispose_engines, get_engine
 
-__all__ = ["DataAccessLayer", "InMemoryDataAccessLayer"]
+__all__ = [
+    "AsyncDataAccessLayer",
+    "DataAccessLayer",
+    "InMemoryDataAccessLayer",
+    "PoolConfig",
+    "QueryCache",
+    "dispose_engines",
+    "get_engine",
+]
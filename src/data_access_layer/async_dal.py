@@ -0,0 +1,99 @@
+"""Asyncio data access layer to run several queries concurrently against the same storage."""
+import os
+from typing import Any, Callable, Dict, Iterator, Optional, TypeVar
+
+import pandas as pd
+import pyarrow as pa
+from sqlalchemy import MetaData, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.sql import Selectable
+
+from data_access_layer.dal import DataAccessProtocol, _bulk_load, _query_arrow, _read_sql
+from data_access_layer.engines import PoolConfig, get_pool_kwargs
+
+T = TypeVar("T")
+
+
+class AsyncDataAccessLayer:
+    """Provides an asyncio data access layer for any SQLAlchemy storage with an async driver
+
+    The connection string must use an async driver, e.g. `postgresql+asyncpg://` or
+    `sqlite+aiosqlite://`. Engines are bound to an event loop, so unlike `DataAccessLayer`
+    they are not shared between instances.
+    """
+
+    engine: AsyncEngine
+    conn_string: str
+    pool_config: PoolConfig | None
+
+    def __init__(
+        self,
+        conn_string: Optional[str] = os.getenv("ASYNC_DATABASE_URL"),
+        pool_config: PoolConfig | None = None,
+    ):
+        self.conn_string = conn_string
+        self.pool_config = pool_config
+
+    def connect(self, conn_string: Optional[str] = None) -> "AsyncDataAccessLayer":
+        """Create the async engine and return the connected DAL instance"""
+        self.conn_string = conn_string or self.conn_string
+        self.engine = create_async_engine(
+            self.conn_string,
+            echo=bool(os.getenv("ECHO_QUERY", False)),
+            **get_pool_kwargs(self.conn_string, self.pool_config or PoolConfig()),
+        )
+        return self
+
+    async def query(self, query: str | Selectable, *, dtype: Dict[str, Any] | None = None) -> pd.DataFrame:
+        async with self.engine.connect() as conn:
+            return await conn.run_sync(lambda sync_conn: _read_sql(_executable(query), sync_conn, dtype))
+
+    async def run_sync(self, func: Callable[[DataAccessProtocol], T]) -> T:
+        """Run sync code written for the `DataAccessProtocol` (e.g. `BaseFeatureView.read`).
+
+        The function gets a DAL bound to a single connection, inside a transaction that is
+        committed when it returns. Its database I/O is awaited on the event loop, so several
+        calls can run concurrently.
+
+        Args:
+            func (Callable[[DataAccessProtocol], T]): Function receiving a sync DAL
+
+        Returns:
+            T: The result of the function
+        """
+        async with self.engine.begin() as conn:
+            return await conn.run_sync(lambda sync_conn: func(ConnectionDataAccessLayer(sync_conn)))
+
+    async def dispose(self):
+        """Close all the connections of the engine"""
+        await self.engine.dispose()
+
+
+class ConnectionDataAccessLayer(DataAccessProtocol):
+    """Sync data access layer bound to a single connection, as used by `AsyncDataAccessLayer.run_sync`"""
+
+    engine: Engine
+    metadata: MetaData
+
+    def __init__(self, conn: Connection):
+        self.engine = conn  # type: ignore[assignment] # NOTE: pandas and SQLAlchemy accept both
+        self.metadata = MetaData(bind=conn)
+
+    def query(self, query: str | Selectable, *, dtype: Dict[str, Any] | None = None) -> pd.DataFrame:
+        return _read_sql(_executable(query), self.engine, dtype)  # type: ignore[arg-type]
+
+    def query_chunks(self, query: str | Selectable, chunksize: int = 100_000) -> Iterator[pd.DataFrame]:
+        conn = self.engine.execution_options(stream_results=True)
+        yield from pd.read_sql(_executable(query), conn, chunksize=chunksize)
+
+    def query_arrow(self, query: str | Selectable) -> pa.Table:
+        return _query_arrow(self.engine, query)  # type: ignore[arg-type]
+
+    def bulk_load(self, data: pd.DataFrame, table_name: str, *, batch_size: int = 100_000, force: bool = False) -> bool:
+        return _bulk_load(self.engine, data, table_name, batch_size=batch_size, force=force)  # type: ignore[arg-type]
+
+
+def _executable(query: str | Selectable) -> Selectable:
+    """Async engines only execute SQLAlchemy constructs, so plain strings are wrapped in `text`."""
+    return text(query) if isinstance(query, str) else query
@@ -0,0 +1,128 @@
+"""Local disk cache for query results, stored as parquet files."""
+import hashlib
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import pandas as pd
+from loguru import logger
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql import Selectable
+
+
+class QueryCache:
+    """Caches query results on local disk with a time to live and a LRU size limit.
+
+    Results are stored as one parquet file per query. The file modification time is the
+    time the result was cached, used for the TTL, and the access time is the last time it
+    was read, used for the LRU eviction. Several processes can share the same directory.
+
+    Example:
+        >>> cache = QueryCache("/tmp/query_cache", ttl_seconds=3600)  # doctest: +SKIP
+        >>> dal = DataAccessLayer(conn_string, cache=cache).connect()  # doctest: +SKIP
+        >>> df = dal.query("SELECT * FROM my_table")  # doctest: +SKIP
+        >>> cache.stats()  # doctest: +SKIP
+        {'hits': 0, 'misses': 1, 'entries': 1, 'size_bytes': 1024}
+
+    Attributes:
+        cache_dir (Path): Directory where the results are stored.
+        ttl_seconds (float | None): Seconds a result is valid for. None to never expire.
+        max_size_bytes (int): Maximum total size of the cached results.
+        hits (int): Number of queries served from the cache.
+        misses (int): Number of queries not found in the cache.
+    """
+
+    def __init__(self, cache_dir: str, ttl_seconds: float | None = 24 * 3600, max_size_bytes: int = 2**30):
+        self.cache_dir = Path(cache_dir)
+        self.ttl_seconds = ttl_seconds
+        self.max_size_bytes = max_size_bytes
+        self.hits = 0
+        self.misses = 0
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(query: str | Selectable, engine: Engine) -> str:
+        """Cache key of a query run on an engine.
+
+        Plain SQL is normalized by collapsing whitespace and removing the trailing
+        semicolon. SQLAlchemy selectables are compiled for the engine dialect and keyed by
+        the SQL text and the bound parameters.
+
+        Examples:
+            >>> from sqlalchemy import create_engine
+            >>> engine = create_engine("sqlite://")
+            >>> QueryCache.key("SELECT *\\n  FROM my_table;", engine) == QueryCache.key("SELECT * FROM my_table", engine)
+            True
+        """
+        if isinstance(query, str):
+            sql = re.sub(r"\s+", " ", query).strip().rstrip(";").strip()
+        else:
+            compiled = query.compile(dialect=engine.dialect)
+            sql = f"{compiled} {sorted(compiled.params.items())}"
+        url = engine.url.render_as_string(hide_password=True)
+        return hashlib.sha256(f"{url}\n{sql}".encode()).hexdigest()
+
+    def get(self, key: str) -> pd.DataFrame | None:
+        """Returns the cached result for the key or None if it is missing or expired."""
+        path = self._path(key)
+        try:
+            stat = path.stat()
+            if self.ttl_seconds is not None and time.time() - stat.st_mtime > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+                raise FileNotFoundError(path)
+            data = pd.read_parquet(path)
+            os.utime(path, (time.time(), stat.st_mtime))
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        logger.debug("Query cache hit {key}", key=key)
+        return data
+
+    def put(self, key: str, data: pd.DataFrame):
+        """Stores the result for the key and evicts the least recently used ones above the size limit."""
+        path = self._path(key)
+        tmp_path = self.cache_dir / f"{key}.{uuid.uuid4().hex}.tmp"
+        try:
+            data.to_parquet(tmp_path)
+        except (ValueError, TypeError) as e:
+            tmp_path.unlink(missing_ok=True)
+            logger.warning("Query result cannot be cached as parquet: {error}", error=e)
+            return
+        os.replace(tmp_path, path)  # NOTE: atomic, other processes never read a partial file
+        self._evict()
+
+    def invalidate(self, key: str | None = None):
+        """Removes the cached result for the key, or every cached result if no key is given."""
+        paths = [self._path(key)] if key is not None else list(self.cache_dir.glob("*.parquet"))
+        for path in paths:
+            path.unlink(missing_ok=True)
+
+    def stats(self) -> Dict[str, int]:
+        """Hit and miss counters of this instance, and number and size of the cached results."""
+        sizes = [stat.st_size for _, stat in self._entries()]
+        return {"hits": self.hits, "misses": self.misses, "entries": len(sizes), "size_bytes": sum(sizes)}
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.parquet"
+
+    def _entries(self) -> List[Tuple[Path, os.stat_result]]:
+        entries = []
+        for path in self.cache_dir.glob("*.parquet"):
+            try:
+                entries.append((path, path.stat()))
+            except FileNotFoundError:  # NOTE: removed by another process
+                continue
+        return entries
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda entry: entry[1].st_atime)
+        total_size = sum(stat.st_size for _, stat in entries)
+        for path, stat in entries:
+            if total_size <= self.max_size_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total_size -= stat.st_size
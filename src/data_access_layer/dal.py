@@ -1,56 +1,306 @@
+import hashlib
+import io
 import os
-from typing import Optional, Protocol
+from typing import Any, Dict, Iterator, List, Optional, Protocol, Sequence
 
 import pandas as pd
+import pyarrow as pa
 from sklearn import datasets
 from sklearn.utils import Bunch
-from sqlalchemy import MetaData
-from sqlalchemy.engine import Engine, create_engine
+from sqlalchemy import Column, DateTime, MetaData, String, Table, func, inspect, select, table, text
+from sqlalchemy.engine import Connection, Dialect, Engine, create_engine
 from sqlalchemy.pool import StaticPool
+from sqlalchemy.schema import CreateTable
 from sqlalchemy.sql import Selectable
 
+from data_access_layer.cache import QueryCache
+from data_access_layer.engines import PoolConfig, get_engine
+
 
 class DataAccessProtocol(Protocol):
     engine: Engine
     metadata: MetaData
 
-    def query(self, query: str | Selectable) -> pd.DataFrame:
+    def query(self, query: str | Selectable, *, dtype: Dict[str, Any] | None = ...) -> pd.DataFrame:
+        ...
+
+    def query_chunks(self, query: str | Selectable, chunksize: int = ...) -> Iterator[pd.DataFrame]:
+        ...
+
+    def query_arrow(self, query: str | Selectable) -> pa.Table:
+        ...
+
+    def bulk_load(self, data: pd.DataFrame, table_name: str, *, batch_size: int = ..., force: bool = ...) -> bool:
         ...
 
 
+_bulk_loads_metadata = MetaData()
+_bulk_loads = Table(
+    "_dal_bulk_loads",
+    _bulk_loads_metadata,
+    Column("table_name", String(255), primary_key=True),
+    Column("checksum", String(64), nullable=False),
+)
+
+
 class DataAccessLayer(DataAccessProtocol):
-    """Provides a thread safe data access layer for any SQLAlchemy compatible storage"""
+    """Provides a thread safe data access layer for any SQLAlchemy compatible storage
+
+    Engines are shared by every DAL connected to the same connection string with the same
+    pool settings, see `data_access_layer.engines`. Results of `query` are cached when a
+    `QueryCache` is given, see `data_access_layer.cache`.
+    """
 
     engine: Engine
     metadata: MetaData
     conn_string: str
+    pool_config: PoolConfig | None
+    cache: QueryCache | None
 
-    def __init__(self, conn_string: Optional[str] = os.getenv("DATABASE_URL")):
+    def __init__(
+        self,
+        conn_string: Optional[str] = os.getenv("DATABASE_URL"),
+        pool_config: PoolConfig | None = None,
+        cache: QueryCache | None = None,
+    ):
         self.conn_string = conn_string
+        self.pool_config = pool_config
+        self.cache = cache
 
     def connect(self, conn_string: Optional[str] = None) -> "DataAccessLayer":
         """Connect to the datasource and return the connected DAL instance"""
         self.conn_string = conn_string or self.conn_string
-        self.engine = create_engine(
+        self.engine = get_engine(
             self.conn_string,
+            self.pool_config,
             echo=bool(os.getenv("ECHO_QUERY", False)),
         )
         self.metadata = MetaData(bind=self.engine)
         return self
 
-    def query(self, query: str | Selectable) -> pd.DataFrame:
-        return pd.read_sql(query, self.engine)
+    def query(self, query: str | Selectable, *, dtype: Dict[str, Any] | None = None) -> pd.DataFrame:
+        """Run a query and return its results.
+
+        Args:
+            query (str | Selectable): SQL query or SQLAlchemy selectable
+            dtype (Dict[str, Any] | None, optional): Dtypes the result columns are cast to once read
+                with the inferred ones. Defaults to None.
+
+        Returns:
+            pd.DataFrame: The results
+        """
+        if self.cache is None:
+            return _read_sql(query, self.engine, dtype)
+        key = self.cache.key(query, self.engine)
+        data = self.cache.get(key)
+        if data is None:
+            data = _read_sql(query, self.engine)
+            self.cache.put(key, data)
+        return data.astype(dtype) if dtype else data  # NOTE: the cache keeps the results with the inferred dtypes
+
+    def invalidate_cache(self, query: str | Selectable | None = None):
+        """Remove the cached result of the query, or all the cached results if no query is given."""
+        if self.cache is not None:
+            self.cache.invalidate(self.cache.key(query, self.engine) if query is not None else None)
+
+    def query_chunks(self, query: str | Selectable, chunksize: int = 100_000) -> Iterator[pd.DataFrame]:
+        """Stream the results of a query as dataframes of at most `chunksize` rows.
+
+        The query is executed with `stream_results` so drivers that support server side
+        cursors (e.g. postgres) only hold one chunk in memory at a time. The connection
+        is released once the generator is exhausted or closed.
+
+        Args:
+            query (str | Selectable): The query to execute
+            chunksize (int, optional): Number of rows per chunk. Defaults to 100_000.
+
+        Yields:
+            Iterator[pd.DataFrame]: The query results, one chunk at a time
+        """
+        with self.engine.connect().execution_options(stream_results=True) as conn:
+            yield from pd.read_sql(query, conn, chunksize=chunksize)
+
+    def query_arrow(self, query: str | Selectable) -> pa.Table:
+        """Execute a query and return the results as a `pyarrow.Table`.
+
+        Drivers with a native columnar fetch (e.g. duckdb, snowflake, ADBC) hand over the
+        arrow data directly. For any other driver the raw DBAPI rows are transposed into
+        columns and converted by arrow, skipping the per value object handling of
+        `pd.read_sql`. Note that SQLAlchemy result type processors are not applied and
+        every column must hold values of a single type.
+
+        Use `table.to_pandas()` or `table.to_pandas(types_mapper=pd.ArrowDtype)` to get
+        a dataframe backed by numpy or arrow dtypes respectively.
+
+        Args:
+            query (str | Selectable): The query to execute
+
+        Returns:
+            pa.Table: The query results
+        """
+        with self.engine.connect() as conn:
+            return _query_arrow(conn, query)
+
+    def bulk_load(self, data: pd.DataFrame, table_name: str, *, batch_size: int = 100_000, force: bool = False) -> bool:
+        """Replace the table with the content of the dataframe using the fastest available insert.
+
+        The table is recreated and filled in a single transaction: postgres uses `COPY`, any
+        other database uses the DBAPI `executemany` in batches of `batch_size` rows, or
+        `DataFrame.to_sql` for DBAPI drivers with named parameters. A checksum of the loaded
+        data is stored in the `_dal_bulk_loads` table so the load is skipped if the table
+        already exists with the same content and as many rows, e.g. it was not truncated since.
+
+        Args:
+            data (pd.DataFrame): The data to load. The index is not loaded.
+            table_name (str): The destination table
+            batch_size (int, optional): Rows per `executemany` call. Defaults to 100_000.
+            force (bool, optional): Load even if the table content did not change. Defaults to False.
+
+        Returns:
+            bool: True if the data was loaded, False if the load was skipped.
+        """
+        with self.engine.begin() as conn:
+            return _bulk_load(conn, data, table_name, batch_size=batch_size, force=force)
+
+
+def _read_sql(query: str | Selectable, con: Engine | Connection, dtype: Dict[str, Any] | None = None) -> pd.DataFrame:
+    """`pd.read_sql`, using `read_sql_query` when dtypes are given as it is the one accepting them."""
+    if not dtype:
+        return pd.read_sql(query, con)
+    return pd.read_sql_query(query, con, dtype=dtype)
+
+
+def _query_arrow(conn: Connection, query: str | Selectable) -> pa.Table:
+    """Execute a query on the connection and return the results as a `pyarrow.Table`."""
+    result = conn.execute(text(query) if isinstance(query, str) else query)
+    columns = list(result.keys())
+    cursor = result.cursor
+    if hasattr(cursor, "fetch_arrow_table"):
+        return cursor.fetch_arrow_table()
+    if hasattr(cursor, "fetch_arrow_all"):
+        table = cursor.fetch_arrow_all()
+        if table is not None:
+            return table
+        return pa.table({c: pa.array([]) for c in columns})
+    return _rows_to_arrow(cursor.fetchall(), columns)
+
+
+def _bulk_load(conn: Connection, data: pd.DataFrame, table_name: str, *, batch_size: int, force: bool) -> bool:
+    """Replace the table with the content of the dataframe inside the current transaction of the connection."""
+    checksum = _checksum(data)
+    if conn.dialect.name == "sqlite":
+        # NOTE: the DDL is not run in the transaction, so concurrent first loads could both create the table
+        create_table = str(CreateTable(_bulk_loads).compile(dialect=conn.dialect)).strip()
+        conn.exec_driver_sql(create_table.replace("CREATE TABLE", "CREATE TABLE IF NOT EXISTS", 1))
+    else:
+        _bulk_loads_metadata.create_all(conn)
+    if not force and inspect(conn).has_table(table_name):
+        stored = conn.execute(select(_bulk_loads.c.checksum).where(_bulk_loads.c.table_name == table_name))
+        if stored.scalar() == checksum and _count_rows(conn, table_name) == len(data):
+            return False
+
+    data.head(0).to_sql(table_name, conn, if_exists="replace", index=False)
+    if conn.dialect.name == "postgresql":
+        _copy_insert(conn, data, table_name)
+    else:
+        _executemany_insert(conn, data, table_name, batch_size)
+
+    conn.execute(_bulk_loads.delete().where(_bulk_loads.c.table_name == table_name))
+    conn.execute(_bulk_loads.insert().values(table_name=table_name, checksum=checksum))
+    return True
+
+
+def _count_rows(conn: Connection, table_name: str) -> int:
+    return conn.execute(select(func.count()).select_from(table(table_name))).scalar()
+
+
+def _rows_to_arrow(rows: Sequence[Sequence], columns: List[str], sample_size: int = 1000) -> pa.Table:
+    """Convert DBAPI rows to an arrow table.
+
+    The column types are inferred from a sample of the rows so the whole result can be
+    converted by arrow in a single pass as a struct array. If the sampled types do not fit
+    (e.g. a column is only null in the sample) the rows are converted column by column.
+    """
+    if not rows:
+        return pa.table({c: pa.array([]) for c in columns})
+    fields = [pa.field(str(i), pa.array(values).type) for i, values in enumerate(zip(*rows[:sample_size]))]
+    if not any(pa.types.is_null(f.type) for f in fields):
+        try:
+            struct_array = pa.array(rows, type=pa.struct(fields))
+            batch = pa.RecordBatch.from_struct_array(struct_array)
+            return pa.Table.from_batches([batch]).rename_columns(columns)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass
+    return pa.table([pa.array(values) for values in zip(*rows)], names=columns)
+
+
+def _checksum(data: pd.DataFrame) -> str:
+    """Hash of the dataframe columns, dtypes and values, ignoring the index."""
+    digest = hashlib.sha256(str(list(data.dtypes.astype(str).items())).encode())
+    digest.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _copy_insert(conn: Connection, data: pd.DataFrame, table_name: str):
+    """Insert the dataframe with the postgres `COPY` command."""
+    quote = conn.dialect.identifier_preparer.quote
+    columns = ", ".join(quote(str(c)) for c in data.columns)
+    buffer = io.StringIO()
+    data.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    with conn.connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {quote(table_name)} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def _executemany_insert(conn: Connection, data: pd.DataFrame, table_name: str, batch_size: int):
+    """Insert the dataframe in batches with the DBAPI `executemany`."""
+    quote = conn.dialect.identifier_preparer.quote
+    columns = ", ".join(quote(str(c)) for c in data.columns)
+    match conn.dialect.paramstyle:
+        case "qmark":
+            placeholders = ", ".join("?" for _ in data.columns)
+        case "format" | "pyformat":
+            placeholders = ", ".join("%s" for _ in data.columns)
+        case "numeric":
+            placeholders = ", ".join(f":{i + 1}" for i in range(len(data.columns)))
+        case _:  # NOTE: named parameters
+            data.to_sql(table_name, conn, if_exists="append", index=False, chunksize=batch_size, method="multi")
+            return
+    statement = f"INSERT INTO {quote(table_name)} ({columns}) VALUES ({placeholders})"
+
+    for i in range(0, len(data), batch_size):
+        batch = data.iloc[i : i + batch_size]  # noqa: E203
+        rows = list(zip(*(_to_python_values(batch[c], conn.dialect) for c in batch.columns)))
+        conn.exec_driver_sql(statement, rows)
+
+
+def _to_python_values(values: pd.Series, dialect: Dialect) -> list:
+    """Convert a series to a list of python scalars, with None for missing values.
+
+    Timestamps are converted as `to_sql` does, with the `DateTime` type of the dialect, e.g. to
+    the text format SQLite compares them in.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        datetime_type = DateTime(timezone=values.dt.tz is not None).dialect_impl(dialect)
+        process = datetime_type.bind_processor(dialect) or (lambda value: value)
+        return [None if pd.isna(value) else process(value) for value in values.dt.to_pydatetime()]
+    if values.hasnans:
+        return values.astype(object).where(values.notna(), None).tolist()
+    return values.tolist()
 
 
 class InMemoryDataAccessLayer(DataAccessLayer):
-    """Provides a thread safe data access layer for in memory SQLite storage"""
+    """Provides a thread safe data access layer for in memory SQLite storage
+
+    Each instance owns its engine, and therefore its database, so it is never shared.
+    """
 
     engine: Engine
     metadata: MetaData
     conn_string: str
 
-    def __init__(self, conn_string: Optional[str] = "sqlite://"):
-        super().__init__(conn_string)
+    def __init__(self, conn_string: Optional[str] = "sqlite://", cache: QueryCache | None = None):
+        super().__init__(conn_string, cache=cache)
 
     def connect(self, conn_string: Optional[str] = None) -> "InMemoryDataAccessLayer":
         self.engine = create_engine(
@@ -77,14 +327,23 @@ class SklearnDataAccessLayer(InMemoryDataAccessLayer):
         return self
 
     def load_data(self, dataset_name: str = "diabetes"):
-        sklearn_dataset: Bunch = None
-        match dataset_name:
-            case "diabetes":
-                sklearn_dataset = datasets.load_diabetes()
-            case "iris":
-                sklearn_dataset = datasets.load_iris()
-            case _:
-                raise ValueError(f"Unknown dataset: {dataset_name}")
-        df = pd.DataFrame(sklearn_dataset.data, columns=sklearn_dataset.feature_names)
-        df["target"] = pd.Series(sklearn_dataset.target, name="target")
-        df.to_sql(dataset_name, self.engine, if_exists="replace", index=False)
+        load_sklearn_dataset(self, dataset_name)
+
+
+def load_sklearn_dataset(dal: DataAccessProtocol, dataset_name: str = "diabetes"):
+    """Loads a sklearn dataset into the table of the same name.
+
+    It works with any DAL, e.g. the one passed by `AsyncDataAccessLayer.run_sync`. Nothing is
+    written if the table already holds the dataset, see `DataAccessLayer.bulk_load`.
+    """
+    sklearn_dataset: Bunch = None
+    match dataset_name:
+        case "diabetes":
+            sklearn_dataset = datasets.load_diabetes()
+        case "iris":
+            sklearn_dataset = datasets.load_iris()
+        case _:
+            raise ValueError(f"Unknown dataset: {dataset_name}")
+    df = pd.DataFrame(sklearn_dataset.data, columns=sklearn_dataset.feature_names)
+    df["target"] = pd.Series(sklearn_dataset.target, name="target")
+    dal.bulk_load(df, dataset_name)
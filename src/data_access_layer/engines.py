@@ -0,0 +1,109 @@
+"""Process wide registry of SQLAlchemy engines so connection pools are shared and reused."""
+import os
+import threading
+from typing import Any, Dict, Hashable, Tuple
+
+from sqlalchemy.engine import Engine, create_engine, make_url
+from sqlalchemy.pool import QueuePool
+
+from config import BaseConfig
+
+
+class PoolConfig(BaseConfig):
+    """Connection pool settings. Can be set with the `DB_POOL_*` environment variables."""
+
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_pre_ping: bool = True
+    pool_recycle: int = -1  # NOTE: seconds after which a connection is recycled, -1 to disable
+
+    class Config:
+        env_prefix = "DB_"
+
+
+_engines: Dict[Tuple[str, Hashable], Engine] = {}
+_lock = threading.Lock()
+
+
+def get_engine(conn_string: str, pool_config: PoolConfig | None = None, **kwargs) -> Engine:
+    """Returns the engine registered for the connection string, creating it if needed.
+
+    Engines are keyed by the connection string, the pool settings and any extra
+    `create_engine` keyword arguments, so every caller with the same settings shares
+    the same warm connection pool.
+
+    Args:
+        conn_string (str): SQLAlchemy connection string
+        pool_config (PoolConfig | None, optional): Pool settings. Defaults to the ones in the environment.
+        **kwargs: Extra keyword arguments for `create_engine`
+
+    Returns:
+        Engine: The shared engine
+    """
+    engine_kwargs = {**get_pool_kwargs(conn_string, pool_config or PoolConfig()), **kwargs}
+    key = (conn_string, _hashable(engine_kwargs))
+    with _lock:
+        if key not in _engines:
+            _engines[key] = create_engine(conn_string, **engine_kwargs)
+        return _engines[key]
+
+
+def dispose_engines():
+    """Closes the connections of every registered engine and empties the registry."""
+    with _lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
+
+def get_pool_kwargs(conn_string: str, pool_config: PoolConfig) -> Dict[str, Any]:
+    """Pool keyword arguments for `create_engine`.
+
+    Sizing arguments are only valid for queue pools, so they are dropped for dialects that
+    use other pool classes by default (e.g. sqlite).
+    """
+    url = make_url(conn_string)
+    pool_kwargs: Dict[str, Any] = {
+        "pool_pre_ping": pool_config.pool_pre_ping,
+        "pool_recycle": pool_config.pool_recycle,
+    }
+    if issubclass(url.get_dialect().get_pool_class(url), QueuePool):
+        pool_kwargs |= {
+            "pool_size": pool_config.pool_size,
+            "max_overflow": pool_config.max_overflow,
+            "pool_timeout": pool_config.pool_timeout,
+        }
+    return pool_kwargs
+
+
+def _hashable(value: Any) -> Hashable:
+    """Hashable form of keyword arguments holding dicts or lists, e.g. `connect_args`.
+
+    Examples:
+        >>> _hashable({"connect_args": {"timeout": 10, "uri": True}, "echo": False})
+        (('connect_args', (('timeout', 10), ('uri', True))), ('echo', False))
+        >>> _hashable({"args": [1, {"a": 2}]})
+        (('args', (1, (('a', 2),))),)
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((key, _hashable(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(item) for item in value)
+    if isinstance(value, set):
+        return frozenset(_hashable(item) for item in value)
+    return value
+
+
+def _reset_pools_after_fork():
+    """Drop the connections inherited from the parent process without closing them.
+
+    The engines stay registered and open fresh connections in the child on first use.
+    """
+    global _lock
+    _lock = threading.Lock()
+    for engine in _engines.values():
+        engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_reset_pools_after_fork)
@@ -1,7 +1,41 @@
 """Module to provide small utilites functions when interating with files"""
+import functools
+import itertools
+import os
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
+from queue import Queue
+from typing import Any, Callable, Iterable, Iterator, List, Tuple
 from urllib.parse import urlparse
 
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+
+from config import BaseModelValidator
+from data_access_layer import handoff
+
+
+class ParquetOptions(BaseModelValidator):
+    """Options to write parquet files and datasets.
+
+    Attributes:
+        partition_cols (List[str]): Columns to hive partition the dataset by. No partitioning if empty.
+        row_group_size (int | None): Maximum rows per row group. Readers streaming the file, such as
+            `LazyParquet.iter_batches`, hold a whole row group in memory, so it is bounded by default.
+            None for the pyarrow default, up to 64Mi rows in a file and 1Mi rows in a dataset.
+        compression (str): Compression codec, e.g. snappy, zstd, gzip or none.
+        use_dictionary (bool): Whether to dictionary encode the columns.
+    """
+
+    partition_cols: List[str] = []
+    row_group_size: int | None = 100_000
+    compression: str = "snappy"
+    use_dictionary: bool = True
+
 
 def create_dir_if_not_exists(file_path: str) -> bool:
     """Creates the parent directory if it does not exist and is a local path
@@ -28,3 +62,311 @@ def check_is_local_path(file_path: str) -> bool:
     """
     parsed = urlparse(file_path)
     return parsed.scheme == ""
+
+
+def write_parquet(
+    data: pd.DataFrame, file_path: str, options: ParquetOptions | None = None, *, append: bool = False
+) -> int:
+    """Writes a dataframe to a parquet file, or to a partitioned dataset, see `write_parquet_chunks`.
+
+    Args:
+        data (pd.DataFrame): The dataframe to write
+        file_path (str): The destination file path, or directory for partitioned datasets
+        options (ParquetOptions | None, optional): Parquet write options. Defaults to `ParquetOptions()`.
+        append (bool, optional): Keep the existing files of a partitioned dataset. Defaults to False.
+
+    Returns:
+        int: The number of rows written
+    """
+    return write_parquet_chunks([data], file_path, options, append=append)
+
+
+def write_parquet_chunks(
+    chunks: Iterable[pd.DataFrame],
+    file_path: str,
+    options: ParquetOptions | None = None,
+    *,
+    append: bool = False,
+) -> int:
+    """Writes an iterable of dataframes to a single parquet file or to a partitioned dataset.
+
+    Chunks are written as they arrive, so only one chunk needs to be in memory at a time.
+    The schema of the first chunk is used for all of them and following chunks are cast to
+    it. Columns with only missing values in the first chunks, which have the arrow null type,
+    take the type of the first chunk with values, and the rows written before are rewritten
+    with it. No file is written if `chunks` is empty.
+
+    Without `partition_cols` the chunks go to a single file with row groups of at most
+    `row_group_size` rows. With `partition_cols`, `file_path` is the root directory of a
+    hive partitioned dataset (`col=value/part-*.parquet`), which replaces the existing one,
+    including the partitions that are not written again. With `append`, the new files are
+    added to the existing partitions instead, e.g. for incremental extracts.
+
+    The chunks are first written to a temporary file, or directory for partitioned datasets,
+    prefixed by an underscore so parquet readers ignore it. It is moved in place once every
+    chunk is written and removed if a chunk raises, so a failed write leaves the destination
+    as it was.
+
+    Args:
+        chunks (Iterable[pd.DataFrame]): The dataframes to write
+        file_path (str): The destination file path, or directory for partitioned datasets
+        options (ParquetOptions | None, optional): Parquet write options. Defaults to `ParquetOptions()`.
+        append (bool, optional): Keep the existing files of a partitioned dataset. Defaults to False.
+
+    Returns:
+        int: The total number of rows written
+    """
+    options = options or ParquetOptions()
+    tables = (pa.Table.from_pandas(chunk, preserve_index=False) for chunk in chunks)
+    first = next(tables, None)
+    if first is None:
+        return 0
+    n_rows = 0
+
+    def count_rows() -> Iterator[pa.Table]:
+        nonlocal n_rows
+        for table in itertools.chain([first], tables):
+            n_rows += table.num_rows
+            yield table
+
+    if options.partition_cols:
+        _write_dataset(count_rows(), *_resolve_filesystem(file_path), options, append)
+    else:
+        with ParquetChunkWriter(file_path, options) as writer:
+            for table in count_rows():
+                writer.write(table)
+    return n_rows
+
+
+class ParquetChunkWriter:
+    """Writes dataframes one after the other to a single parquet file.
+
+    The file is created with the schema of the first dataframe and the following ones are cast
+    to it, except for its null columns, see `write_parquet_chunks`. It is written to a temporary file next to `file_path`, prefixed by an underscore so
+    parquet readers ignore it, and moved in place by `close`. Used as a context manager, it is
+    closed on success and `abort` removes the temporary file on error.
+
+    Example:
+        >>> with ParquetChunkWriter("data/y_hat.parquet") as writer:  # doctest: +SKIP
+        ...     for chunk in chunks:
+        ...         writer.write(chunk)
+
+    Attributes:
+        file_path (str): The destination file path.
+        options (ParquetOptions): Parquet write options, `partition_cols` is ignored.
+        empty_schema (pa.Schema | None): Schema of the empty file written if no dataframe is. None to not write it.
+        n_rows (int): Number of rows written so far.
+    """
+
+    def __init__(self, file_path: str, options: ParquetOptions | None = None, empty_schema: pa.Schema | None = None):
+        self.file_path = file_path
+        self.options = options or ParquetOptions()
+        self.empty_schema = empty_schema
+        self.n_rows = 0
+        self._filesystem, self._path = _resolve_filesystem(file_path)
+        self._tmp_path = self._new_tmp_path()
+        self._writer: pq.ParquetWriter | None = None
+
+    def __enter__(self) -> "ParquetChunkWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, chunk: pd.DataFrame | pa.Table):
+        """Appends the dataframe, or arrow table, to the file."""
+        table = chunk if isinstance(chunk, pa.Table) else pa.Table.from_pandas(chunk, preserve_index=False)
+        if self._writer is None:
+            self._open(table.schema)
+        elif not (schema := _promote_null_fields(self._writer.schema, table.schema)).equals(self._writer.schema):
+            self._promote(schema)
+        self._writer.write_table(table.cast(self._writer.schema), row_group_size=self.options.row_group_size)
+        self.n_rows += table.num_rows
+
+    def close(self):
+        """Moves the written file in place."""
+        if self._writer is None:
+            if self.empty_schema is None:
+                return
+            self._open(self.empty_schema)
+        self._writer.close()
+        self._filesystem.move(self._tmp_path, self._path)
+
+    def abort(self):
+        """Removes the written file, the destination is left as it was."""
+        if self._writer is None:
+            return
+        self._writer.close()
+        if self._filesystem.get_file_info(self._tmp_path).type != pafs.FileType.NotFound:
+            self._filesystem.delete_file(self._tmp_path)
+
+    def _open(self, schema: pa.Schema):
+        self._writer = _parquet_writer(self._filesystem, self._tmp_path, schema, self.options)
+
+    def _promote(self, schema: pa.Schema):
+        """Rewrites the rows written so far to a new temporary file with the schema, one row group at a time."""
+        self._writer.close()
+        written_path, self._tmp_path = self._tmp_path, self._new_tmp_path()
+        self._open(schema)
+        _copy_row_groups(self._filesystem, written_path, self._writer)
+        self._filesystem.delete_file(written_path)
+
+    def _new_tmp_path(self) -> str:
+        parent, _, name = self._path.rpartition("/")
+        return f"{parent}/_{name}.{uuid.uuid4().hex}.tmp"
+
+
+def _promote_null_fields(schema: pa.Schema, other: pa.Schema) -> pa.Schema:
+    """The schema with the type in `other` of its null fields, e.g. columns with only missing values in a first chunk.
+
+    Example:
+        >>> _promote_null_fields(pa.schema([("a", pa.int64()), ("b", pa.null())]), pa.schema([("b", pa.string())]))
+        a: int64
+        b: string
+    """
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type) and (j := other.get_field_index(field.name)) >= 0:
+            schema = schema.set(i, field.with_type(other.field(j).type))
+    return schema
+
+
+def _parquet_writer(
+    filesystem: pafs.FileSystem, path: str, schema: pa.Schema, options: ParquetOptions
+) -> pq.ParquetWriter:
+    return pq.ParquetWriter(
+        path,
+        schema,
+        filesystem=filesystem,
+        compression=options.compression,
+        use_dictionary=options.use_dictionary,
+    )
+
+
+def _copy_row_groups(filesystem: pafs.FileSystem, path: str, writer: pq.ParquetWriter):
+    """Writes the row groups of the parquet file to the writer, cast to its schema."""
+    with filesystem.open_input_file(path) as f:
+        parquet_file = pq.ParquetFile(f)
+        for i in range(parquet_file.num_row_groups):
+            writer.write_table(parquet_file.read_row_group(i).cast(writer.schema))
+
+
+def _resolve_filesystem(file_path: str) -> Tuple[pafs.FileSystem, str]:
+    """Filesystem and path of a local path or of a URI, e.g. `s3://bucket/key`."""
+    if check_is_local_path(file_path):
+        return pafs.LocalFileSystem(), os.path.abspath(file_path)
+    return pafs.FileSystem.from_uri(file_path)
+
+
+def _write_dataset(
+    tables: Iterable[pa.Table],
+    filesystem: pafs.FileSystem,
+    base_dir: str,
+    options: ParquetOptions,
+    append: bool,
+):
+    """Writes the tables to a temporary dataset in `base_dir`, whose files are moved in place once all are written.
+
+    Unless `append` is set, everything else in `base_dir` is deleted before the new files are
+    moved in, so the partitions that are not written again do not keep stale rows.
+    """
+    staging_dir = f"{base_dir}/_tmp-{uuid.uuid4().hex}"
+    write_dataset = functools.partial(
+        ds.write_dataset,
+        base_dir=staging_dir,
+        filesystem=filesystem,
+        format="parquet",
+        partitioning=options.partition_cols,
+        partitioning_flavor="hive",
+        file_options=ds.ParquetFileFormat().make_write_options(
+            compression=options.compression, use_dictionary=options.use_dictionary
+        ),
+        min_rows_per_group=options.row_group_size or 0,
+        max_rows_per_group=options.row_group_size or 1024 * 1024,
+        existing_data_behavior="overwrite_or_ignore",  # NOTE: every run writes files with new names
+    )
+    tables = iter(tables)
+    pending: pa.Table | None = next(tables)
+    schema = pending.schema
+    n_runs = 0
+
+    def run_tables() -> Iterator[pa.Table]:
+        """The tables up to the next one whose schema promotes a null field, which is left pending."""
+        nonlocal pending, schema
+        table, pending = pending, None
+        yield table.cast(schema)
+        for table in tables:
+            if not (promoted := _promote_null_fields(schema, table.schema)).equals(schema):
+                pending, schema = table, promoted
+                return
+            yield table.cast(schema)
+
+    try:
+        # NOTE: a dataset is written with a single schema, so it is written again from each promotion
+        # and the files written before are rewritten with the final schema
+        while pending is not None:
+            basename_template = f"part-{uuid.uuid4().hex}-{{i}}.parquet"
+            _write_batches_from_caller_thread(
+                run_tables(), functools.partial(write_dataset, schema=schema, basename_template=basename_template)
+            )
+            n_runs += 1
+        written = filesystem.get_file_info(pafs.FileSelector(staging_dir, recursive=True))
+        written = [file_info.path for file_info in written if file_info.type == pafs.FileType.File]
+        file_schema = pa.schema([field for field in schema if field.name not in options.partition_cols])
+        for staged_path in written if n_runs > 1 else []:
+            if not pq.read_schema(staged_path, filesystem=filesystem).equals(file_schema):
+                with _parquet_writer(filesystem, f"{staged_path}.promoted", file_schema, options) as writer:
+                    _copy_row_groups(filesystem, staged_path, writer)
+                filesystem.move(f"{staged_path}.promoted", staged_path)
+        if not append:
+            for file_info in filesystem.get_file_info(pafs.FileSelector(base_dir)):
+                if file_info.path == staging_dir:
+                    continue
+                if file_info.type == pafs.FileType.Directory:
+                    filesystem.delete_dir(file_info.path)
+                else:
+                    filesystem.delete_file(file_info.path)
+        for staged_path in written:
+            path = f"{base_dir}/{staged_path[len(staging_dir) + 1 :]}"  # noqa: E203
+            filesystem.create_dir(path.rpartition("/")[0])
+            filesystem.move(staged_path, path)
+    finally:
+        if filesystem.get_file_info(staging_dir).type != pafs.FileType.NotFound:
+            filesystem.delete_dir(staging_dir)
+
+
+def _write_batches_from_caller_thread(tables: Iterable[pa.Table], write: Callable[[Iterator[pa.RecordBatch]], Any]):
+    """Feed the record batches of the tables to a pyarrow writer running in a background thread.
+
+    pyarrow pulls the batches of `write_dataset` from its own threads, but the tables may come
+    from resources bound to the caller thread, such as database cursors. Tables are therefore
+    produced in the caller thread and handed over through a bounded queue.
+    """
+    queue: Queue = Queue(maxsize=2)
+
+    def consume() -> Iterator[pa.RecordBatch]:
+        # NOTE: the caller thread always ends the stream, with the end of data or its error
+        while (item := handoff.get(queue, stopped=lambda: False)) is not handoff.END_OF_DATA:
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    def put(item: Any, future: Future):
+        if not handoff.put(queue, item, future.done):
+            future.result()  # NOTE: raises the writer error if any
+            raise RuntimeError("Parquet writer stopped before consuming all the data")
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(write, consume())
+        try:
+            for table in tables:
+                for batch in table.to_batches():
+                    put(batch, future)
+        except BaseException as e:
+            if not future.done():
+                put(e, future)
+            raise
+        put(handoff.END_OF_DATA, future)
+        future.result()
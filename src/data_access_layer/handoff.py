@@ -0,0 +1,89 @@
+"""Bounded queue handoff between a producer and a consumer running in different threads."""
+import time
+from queue import Empty, Full, Queue
+from typing import Any, Callable
+
+# NOTE: put by the producer after its last item
+END_OF_DATA = object()
+
+
+class StageTiming:
+    """Seconds a stage spent working, and waiting on its input or on a full output queue.
+
+    The stage with the most busy time is the bottleneck of the pipeline, the other ones wait for it.
+
+    Attributes:
+        busy (float): Seconds spent working.
+        waiting (float): Seconds spent blocked on the queues.
+    """
+
+    def __init__(self, busy: float = 0.0, waiting: float = 0.0):
+        self.busy = busy
+        self.waiting = waiting
+
+    def __repr__(self) -> str:
+        return f"StageTiming(busy={self.busy:.3f}, waiting={self.waiting:.3f})"
+
+
+def put(queue: Queue, item: Any, stopped: Callable[[], bool], timing: StageTiming | None = None) -> bool:
+    """Put the item in the queue unless its consumer stopped. Returns whether it was put.
+
+    The queue is polled, so a producer blocked on a full queue notices when the consumer stops,
+    e.g. because it failed.
+
+    Example:
+        >>> queue = Queue(maxsize=1)
+        >>> put(queue, 1, stopped=lambda: False), put(queue, 2, stopped=lambda: True)
+        (True, False)
+
+    Args:
+        queue (Queue): The bounded queue
+        item (Any): The item, or `END_OF_DATA`
+        stopped (Callable[[], bool]): Whether the consumer stopped
+        timing (StageTiming | None, optional): Timing the wait is added to. Defaults to None.
+
+    Returns:
+        bool: Whether the item was put
+    """
+    ts = time.perf_counter()
+    try:
+        while not stopped():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+    finally:
+        if timing is not None:
+            timing.waiting += time.perf_counter() - ts
+
+
+def get(queue: Queue, stopped: Callable[[], bool], timing: StageTiming | None = None) -> Any:
+    """Get an item from the queue, or `END_OF_DATA` once its producer stopped and the queue is empty.
+
+    Example:
+        >>> queue = Queue()
+        >>> queue.put(1)
+        >>> get(queue, stopped=lambda: True), get(queue, stopped=lambda: True) is END_OF_DATA
+        (1, True)
+
+    Args:
+        queue (Queue): The bounded queue
+        stopped (Callable[[], bool]): Whether the producer stopped
+        timing (StageTiming | None, optional): Timing the wait is added to. Defaults to None.
+
+    Returns:
+        Any: The item, or `END_OF_DATA`
+    """
+    ts = time.perf_counter()
+    try:
+        while True:
+            try:
+                return queue.get(timeout=0.1)
+            except Empty:
+                if stopped() and queue.empty():
+                    return END_OF_DATA
+    finally:
+        if timing is not None:
+            timing.waiting += time.perf_counter() - ts
@@ -0,0 +1,141 @@
+"""Lazy, projection aware reading of parquet files and datasets."""
+from typing import Any, Iterator, List, Sequence, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from loguru import logger
+
+from data_access_layer.files import check_is_local_path
+
+Filters = List[Tuple[str, str, Any]] | List[List[Tuple[str, str, Any]]]
+
+LARGE_ROW_GROUP_ROWS = 1024 * 1024  # NOTE: the default maximum of `pyarrow.dataset.write_dataset`
+
+
+class LazyParquet:
+    """Lazy handle to a parquet file or hive partitioned dataset.
+
+    Nothing is read until `to_pandas` or `iter_batches` is called, so the columns and
+    filters can be narrowed down first, e.g. once the model inputs are known. Only the
+    selected columns are read and the filters are used to skip partitions and row groups.
+    Local files are memory mapped.
+
+    Example:
+        >>> features = LazyParquet("data/features.parquet")  # doctest: +SKIP
+        >>> X = features.select(["age", "bmi"]).filter([("sex", ">", 0)]).to_pandas()  # doctest: +SKIP
+
+    Attributes:
+        path (str): Path to the parquet file or dataset directory.
+        columns (List[str] | None): Columns to read. All of them if None.
+        filters (Filters | None): Row filters in the `pyarrow.parquet.read_table` DNF format.
+        memory_map (bool): Whether to memory map local files.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        columns: Sequence[str] | None = None,
+        filters: Filters | None = None,
+        memory_map: bool = True,
+    ):
+        self.path = path
+        self.columns = list(columns) if columns is not None else None
+        self.filters = filters
+        self.memory_map = memory_map and check_is_local_path(path)
+
+    def __repr__(self) -> str:
+        return f"LazyParquet(path={self.path!r}, columns={self.columns!r}, filters={self.filters!r})"
+
+    @property
+    def schema(self) -> pa.Schema:
+        """Schema of the selected columns, read from the file metadata only."""
+        schema = ds.dataset(self.path, format="parquet", partitioning="hive").schema
+        if self.columns is None:
+            return schema
+        return pa.schema([schema.field(c) for c in self.columns])
+
+    @property
+    def column_names(self) -> List[str]:
+        return self.schema.names
+
+    def select(self, columns: Sequence[str]) -> "LazyParquet":
+        """Returns a new handle reading only the given columns."""
+        return LazyParquet(self.path, columns, self.filters, self.memory_map)
+
+    def filter(self, filters: Filters) -> "LazyParquet":
+        """Returns a new handle reading only the rows matching the filters."""
+        return LazyParquet(self.path, self.columns, filters, self.memory_map)
+
+    def to_arrow(self) -> pa.Table:
+        # NOTE: the index columns written by pandas are read too, so `to_pandas` keeps the index
+        return pq.read_table(
+            self.path,
+            columns=self.columns,
+            filters=self.filters,
+            memory_map=self.memory_map,
+            use_pandas_metadata=True,
+        )
+
+    def to_pandas(self) -> pd.DataFrame:
+        """Read the selected columns and rows into a dataframe."""
+        return self.to_arrow().to_pandas()
+
+    def iter_batches(self, batch_size: int = 100_000, prefetch: bool = True) -> Iterator[pd.DataFrame]:
+        """Read the selected columns and rows as dataframes of at most `batch_size` rows.
+
+        Args:
+            batch_size (int, optional): Maximum rows per dataframe. Defaults to 100_000.
+            prefetch (bool, optional): Whether to decode batches ahead of the consumer with the pyarrow
+                scanner. It is faster, but can read the whole file ahead of a slow consumer. Without it,
+                one row group is read at a time, so the memory stays at about one row group, and a
+                warning is logged for files with row groups of more than `LARGE_ROW_GROUP_ROWS` rows.
+                Defaults to True.
+        """
+        dataset = ds.dataset(self.path, format="parquet", partitioning="hive")
+        expression = pq.filters_to_expression(self.filters) if self.filters else None
+        columns = _with_index_columns(self.columns, dataset.schema)
+        if prefetch:
+            for batch in dataset.to_batches(columns=columns, filter=expression, batch_size=batch_size):
+                yield batch.to_pandas()
+            return
+        for fragment in dataset.get_fragments(filter=expression):
+            metadata = fragment.metadata
+            max_rows = max((metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)), default=0)
+            if max_rows > LARGE_ROW_GROUP_ROWS:
+                logger.warning(
+                    f"{fragment.path} has row groups of up to {max_rows} rows, each read whole in memory. "
+                    "Rewrite it with a smaller row group size to bound the memory, see `ParquetOptions`."
+                )
+            for row_group in fragment.split_by_row_group(expression, schema=dataset.schema):
+                batches = row_group.to_batches(
+                    schema=dataset.schema, columns=columns, filter=expression, batch_size=batch_size
+                )
+                for batch in batches:
+                    yield batch.to_pandas()
+
+
+def _with_index_columns(columns: List[str] | None, schema: pa.Schema) -> List[str] | None:
+    """The columns and the index columns recorded in the pandas metadata of the schema, if any.
+
+    Example:
+        >>> schema = pa.Schema.from_pandas(pd.DataFrame({"a": [1]}, index=pd.Index([10], name="id")))
+        >>> _with_index_columns(["a"], schema)
+        ['a', 'id']
+    """
+    if columns is None or not schema.pandas_metadata:
+        return columns
+    # NOTE: a RangeIndex is stored as a dict in the metadata, not as a column
+    index_columns = [c for c in schema.pandas_metadata["index_columns"] if isinstance(c, str) and c not in columns]
+    return columns + [c for c in index_columns if c in schema.names]
+
+
+def read_parquet(
+    path: str,
+    columns: Sequence[str] | None = None,
+    filters: Filters | None = None,
+    memory_map: bool = True,
+) -> pd.DataFrame:
+    """Read the given columns and rows of a parquet file or dataset, see `LazyParquet`."""
+    return LazyParquet(path, columns, filters, memory_map).to_pandas()
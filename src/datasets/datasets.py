@@ -1,13 +1,18 @@
-from typing import Any, Dict
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Type
 
+import numpy as np
 import pandas as pd
 import pandera as pa
 from loguru import logger
+from pandera.engines import pandas_engine
 from pandera.typing import Series
 from pandera.typing.pandas import DataFrame
 
 from datasets import options
 
+_compiled_schemas: Dict[Type["BaseSchema"], "CompiledSchema"] = {}
+
 
 class BaseSchema(pa.DataFrameModel):
     """Base schema with helpers and validation functions checks."""
@@ -23,12 +28,11 @@ class BaseSchema(pa.DataFrameModel):
 
     @classmethod
     def fill_missing_cols(cls, data: pd.DataFrame | DataFrame) -> pd.DataFrame | DataFrame:
-        columns = list(cls.to_schema().columns)
-        cols_to_fill = [c for c in columns if c not in data]
+        cols_to_fill = [c for c in cls.compiled_schema().names if c not in data]
         if cols_to_fill:
             logger.warning(
                 "Data for table {table} is missing columns: {columns}. Filling with None",
-                table=cls.__class__,
+                table=cls.__name__,
                 columns=cols_to_fill,
             )
             for c in cols_to_fill:
@@ -43,7 +47,260 @@ class BaseSchema(pa.DataFrameModel):
         does not raise an error if the data does not conform to the schema, and it
         won't apply any pandera custom checks.
         """
-        schema = cls.to_schema()
-        schema_dtypes: Dict[str, Any] = {c: pandera_type.type for c, pandera_type in schema.get_dtypes(data).items()}
-        columns = list(schema_dtypes.keys())
-        return data[columns].astype(schema_dtypes)
+        schema_dtypes = cls.compiled_schema().resolve_dtypes(data.columns)
+        data = data[list(schema_dtypes)]
+        dtypes_to_coerce = {c: dtype for c, dtype in schema_dtypes.items() if data[c].dtype != dtype}
+        return data.astype(dtypes_to_coerce) if dtypes_to_coerce else data
+
+    @classmethod
+    def compiled_schema(cls) -> "CompiledSchema":
+        """The schema of the class resolved once into a `CompiledSchema`, cached per class.
+
+        Examples:
+            >>> class MySchema(BaseSchema):
+            ...     value: float = pa.Field(alias="Value")
+            >>> compiled = MySchema.compiled_schema()
+            >>> compiled.names, compiled.aliases, compiled.dtypes
+            (['Value'], {'value': 'Value'}, {'Value': dtype('float64')})
+        """
+        if cls not in _compiled_schemas:
+            schema = cls.to_schema()
+            aliases = {field.original_name: name for name, (_, field) in cls.__fields__.items()}
+            _compiled_schemas[cls] = CompiledSchema(schema, aliases)
+        return _compiled_schemas[cls]
+
+    @classmethod
+    def validate_fast(
+        cls, data: pd.DataFrame, *, sample: int | float | None = 10_000, random_state: int | None = None
+    ) -> DataFrame["BaseSchema"]:
+        """Validate the data with full vectorized dtype and nullability checks, and the custom checks on a sample.
+
+        A middle ground between `validate`, which runs every check on every row, and
+        `coerce_filter_columns`, which runs none. Columns are filtered and only those with a
+        different dtype are coerced. Then every row is checked for nulls in non nullable
+        columns, while the custom and builtin checks (e.g. `date_time_iso_format`, `ge`) only
+        run on a random sample of the rows.
+
+        Example:
+            >>> data = pd.DataFrame({"value": [1.0, 2.0], "extra": ["a", "b"]})
+            >>> class MySchema(BaseSchema):
+            ...     value: float = pa.Field(ge=0)
+            >>> MySchema.validate_fast(data)
+               value
+            0    1.0
+            1    2.0
+
+        Args:
+            data (pd.DataFrame): The data to validate
+            sample (int | float | None, optional): Number of rows, or fraction of the rows if a float,
+                the checks run on. All of them if None. Defaults to 10_000.
+            random_state (int | None, optional): Seed of the sample. Defaults to None.
+
+        Raises:
+            pa.errors.SchemaError: If a column is missing or can not be coerced, or any check fails
+
+        Returns:
+            DataFrame[BaseSchema]: The filtered and coerced data
+        """
+        compiled = cls.compiled_schema()
+        data = compiled.coerce(data)
+        failure_cases = compiled.failure_cases(data, sample=sample, random_state=random_state)
+        if len(failure_cases):
+            raise compiled.schema_error(cls.__name__, data, failure_cases)
+        return data
+
+    @classmethod
+    def validate_chunks(
+        cls,
+        chunks: Iterable[pd.DataFrame],
+        *,
+        lazy: bool = False,
+        sample: int | float | None = None,
+        random_state: int | None = None,
+    ) -> Iterator[DataFrame["BaseSchema"]]:
+        """Validate a stream of chunks, e.g. from `DataAccessLayer.query_chunks`, without loading all of them.
+
+        Each chunk is filtered, coerced and checked as in `validate_fast`, and yielded. The first
+        failing chunk raises before it is yielded, so invalid data never reaches the consumer.
+        With `lazy`, failing chunks are still yielded, their failure cases are collected and
+        reported together once the stream is consumed. Uniqueness is only checked within each chunk.
+
+        Example:
+            >>> class MySchema(BaseSchema):
+            ...     value: float = pa.Field(ge=0)
+            >>> chunks = [pd.DataFrame({"value": [1.0, -1.0]}), pd.DataFrame({"value": [-2.0]})]
+            >>> validated = list(MySchema.validate_chunks(chunks, lazy=True))
+            Traceback (most recent call last):
+            ...
+            pandera.errors.SchemaError: MySchema failed 2 checks in 2 chunks:
+            value   greater_than_or_equal_to    2
+
+        Args:
+            chunks (Iterable[pd.DataFrame]): The data to validate
+            lazy (bool, optional): Yield the failing chunks and report all the failures at the end. Defaults to False.
+            sample (int | float | None, optional): Number of rows, or fraction of the rows if a float,
+                of each chunk the checks run on. All of them if None. Defaults to None.
+            random_state (int | None, optional): Seed of the samples. Defaults to None.
+
+        Raises:
+            pa.errors.SchemaError: Right away if a column is missing or can not be coerced, or if a
+                check fails unless `lazy`, in which case once all the chunks are yielded. Its
+                `failure_cases` has a `chunk` column.
+
+        Yields:
+            Iterator[DataFrame[BaseSchema]]: The filtered and coerced chunks
+        """
+        compiled = cls.compiled_schema()
+        failures = []
+        for i, chunk in enumerate(chunks):
+            chunk = compiled.coerce(chunk)
+            failure_cases = compiled.failure_cases(chunk, sample=sample, random_state=random_state)
+            if len(failure_cases):
+                if not lazy:
+                    raise compiled.schema_error(cls.__name__, chunk, failure_cases.assign(chunk=i))
+                failures.append(failure_cases.assign(chunk=i))
+            yield chunk
+        if failures:
+            raise compiled.schema_error(cls.__name__, None, pd.concat(failures, ignore_index=True))
+
+
+class CompiledSchema:
+    """Pandera schema resolved once, with what the fast paths of `BaseSchema` need.
+
+    Attributes:
+        schema (pa.DataFrameSchema): The pandera schema.
+        columns (Dict[str, pa.Column]): Columns by name, or by pattern for regex columns, with their checks.
+        names (List[str]): Names of the columns, excluding the regex ones.
+        dtypes (Dict[str, Any]): Target pandas or numpy dtype of each column, excluding the regex ones.
+        aliases (Dict[str, str]): Column name of each schema attribute.
+        checks (List[pa.Check]): Dataframe level checks.
+        has_regex (bool): Whether some columns are regex patterns, resolved against the data columns.
+    """
+
+    def __init__(self, schema: pa.DataFrameSchema, aliases: Dict[str, str] | None = None):
+        self.schema = schema
+        self.columns: Dict[str, pa.Column] = dict(schema.columns)
+        self.names: List[str] = [name for name, column in self.columns.items() if not column.regex]
+        self.dtypes: Dict[str, Any] = self._get_dtypes({name: self.columns[name] for name in self.names})
+        self.aliases: Dict[str, str] = aliases or {}
+        self.checks: List[pa.Check] = list(schema.checks)
+        self.has_regex = any(column.regex for column in self.columns.values())
+
+    def resolve_columns(self, data_columns: pd.Index) -> Dict[str, pa.Column]:
+        """Columns of the schema for the given data columns, with regex columns expanded to their matches."""
+        if not self.has_regex:
+            return self.columns
+        resolved = {}
+        for name, column in self.columns.items():
+            if column.regex:
+                resolved |= {c: column for c in data_columns if re.match(name, str(c))}
+            else:
+                resolved[name] = column
+        return resolved
+
+    def resolve_dtypes(self, data_columns: pd.Index) -> Dict[str, Any]:
+        """Target dtype of each schema column for the given data columns, see `resolve_columns`."""
+        if not self.has_regex:
+            return self.dtypes
+        return self._get_dtypes(self.resolve_columns(data_columns))
+
+    def coerce(self, data: pd.DataFrame) -> pd.DataFrame:
+        """Filter the schema columns, coercing only the ones whose dtype does not match.
+
+        Raises:
+            pa.errors.SchemaError: If a required column is missing or can not be coerced
+        """
+        columns = self.resolve_columns(data.columns)
+        missing = [name for name, column in columns.items() if column.required and name not in data]
+        if missing:
+            raise pa.errors.SchemaError(self.schema, data, f"Missing columns {missing}")
+        data = data[[name for name in columns if name in data]]
+        coerced = {}
+        for name in data.columns:
+            dtype = columns[name].dtype
+            if dtype is None or dtype.check(pandas_engine.Engine.dtype(data[name].dtype)):
+                continue
+            try:
+                coerced[name] = dtype.coerce(data[name])
+            except (ValueError, TypeError) as e:
+                raise pa.errors.SchemaError(self.schema, data, f"Column {name} can not be coerced to {dtype}: {e}")
+        return data.assign(**coerced) if coerced else data
+
+    def failure_cases(
+        self, data: pd.DataFrame, *, sample: int | float | None = None, random_state: int | None = None
+    ) -> pd.DataFrame:
+        """Failure cases of the nullability and uniqueness checks on every row, and the other checks on a sample.
+
+        Returns:
+            pd.DataFrame: One row per failure with the `column`, `check`, `index` and `failure_case`
+        """
+        columns = self.resolve_columns(data.columns)
+        failures = []
+        for name, column in columns.items():
+            if name not in data:
+                continue
+            values = data[name].to_numpy()
+            if not column.nullable and values.dtype.kind not in "iub":  # NOTE: numpy ints and bools can't be null
+                is_null = np.isnan(values) if values.dtype.kind == "f" else pd.isna(values)
+                failures.append(self._failures(data[name][is_null], name, "not_nullable"))
+            if column.unique:
+                failures.append(self._failures(data[name][data[name].duplicated(keep=False)], name, "field_uniqueness"))
+
+        positions = self._sample_positions(len(data), sample, random_state)
+        for name, column in columns.items():
+            for check in column.checks if name in data else []:
+                values = data[name] if positions is None else data[name].iloc[positions]
+                failures.append(self._check_failures(check, values.dropna() if check.ignore_na else values, name))
+        for check in self.checks:
+            failures.append(self._check_failures(check, data if positions is None else data.iloc[positions], None))
+
+        failures = [f for f in failures if len(f)]
+        if not failures:
+            return pd.DataFrame(columns=["column", "check", "index", "failure_case"])
+        return pd.concat(failures, ignore_index=True)
+
+    def schema_error(self, name: str, data: pd.DataFrame | None, failure_cases: pd.DataFrame) -> pa.errors.SchemaError:
+        """Error reporting the number of failures of each column and check."""
+        counts = failure_cases.fillna({"column": ""}).groupby(["column", "check"]).size().to_string(header=False)
+        n_chunks = f" in {failure_cases['chunk'].nunique()} chunks" if "chunk" in failure_cases else ""
+        message = f"{name} failed {len(failure_cases)} checks{n_chunks}:\n{counts}"
+        return pa.errors.SchemaError(self.schema, data, message, failure_cases=failure_cases)
+
+    @staticmethod
+    def _get_dtypes(columns: Dict[str, pa.Column]) -> Dict[str, Any]:
+        return {name: column.dtype.type for name, column in columns.items() if column.dtype is not None}
+
+    @staticmethod
+    def _sample_positions(n_rows: int, sample: int | float | None, random_state: int | None) -> np.ndarray | None:
+        """Sorted positions of the sampled rows, None for all the rows."""
+        size = round(n_rows * sample) if isinstance(sample, float) else sample
+        if size is None or size >= n_rows:
+            return None
+        return np.sort(np.random.default_rng(random_state).choice(n_rows, size, replace=False))
+
+    @classmethod
+    def _check_failures(cls, check: pa.Check, obj: pd.Series | pd.DataFrame, column: str | None) -> pd.DataFrame:
+        result = check(obj)
+        name = check.name or str(check)
+        failure_cases = result.failure_cases
+        if result.check_passed:
+            return cls._failures(pd.Series(dtype=object), column, name)
+        if isinstance(failure_cases, pd.DataFrame):  # NOTE: dataframe checks, one failure per failing cell
+            stacked = failure_cases.stack(dropna=False)
+            return pd.DataFrame(
+                {
+                    "column": stacked.index.get_level_values(-1),
+                    "check": name,
+                    "index": stacked.index.get_level_values(0),
+                    "failure_case": stacked.to_numpy(),
+                }
+            )
+        if not isinstance(failure_cases, pd.Series):
+            failure_cases = pd.Series([failure_cases], dtype=object)
+        return cls._failures(failure_cases, column, name)
+
+    @staticmethod
+    def _failures(failure_cases: pd.Series, column: str | None, check: str) -> pd.DataFrame:
+        return pd.DataFrame(
+            {"column": column, "check": check, "index": failure_cases.index, "failure_case": failure_cases.to_numpy()}
+        )
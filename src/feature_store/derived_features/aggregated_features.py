@@ -1,22 +1,44 @@
 import warnings
-from typing import Any, List, Literal, Mapping
+from typing import Any, Dict, List, Literal, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
 from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.utils.validation import check_is_fitted
 
+from feature_store.derived_features.sketches import GroupQuantileSketch
+
 
 class GroupFeatureGenerator(BaseEstimator, TransformerMixin):
     """Class used for generating group features as median or rank per group.
 
+    Data that does not fit in memory can be fitted in chunks with `partial_fit`, which keeps
+    mergeable per-group state: sums and counts for the mean, exact minimum and maximum,
+    and a `GroupQuantileSketch` for the median, rank and percentiles. The sketch gives the
+    same values as `fit` for groups with up to `2 * sketch_size` rows and approximate ones
+    above.
+
+    Example:
+        >>> X = pd.DataFrame({"country": ["US", "US", "FR", "FR"], "sales": [1.0, 3.0, 5.0, 6.0]})
+        >>> generator = GroupFeatureGenerator(group_cols=["country"], group_metric="median")
+        >>> for chunk in (X[:2], X[2:]):
+        ...     generator = generator.partial_fit(chunk, chunk.sales)
+        >>> generator.values_by_group
+        {'FR': 5.5, 'US': 2.0}
+
     Attributes:
         group_cols (List): List of columns used for calculating the aggregated value.
         metric (str): The metric to be used for replacement, can be one of
             ['mean', 'median', 'rank']
-        values_by_group (Mapping[str, Any]): a mapping of column
-            name to dictionary mapping of the metric values for each group in
-            the column. Set in fit method.
+        groups_ (pd.Index): the fitted groups, a MultiIndex when grouping by several columns.
+            Set in fit method.
+        group_values_ (np.ndarray): the metric value of each group, aligned with `groups_`.
+            Set in fit method.
         target_name (str): Target column name used for grouping. Default to the y passed in fit.
+        target_name_ (str): The target column name, or the name of the y passed in fit. Set in fit method.
+        sketch_size (int): Number of centroids per group of the quantile sketch used by `partial_fit`.
+        state_ (pd.DataFrame | pd.Series | GroupQuantileSketch | None): Per-group state updated
+            by `partial_fit`. Reset by `fit`.
     """
 
     def __init__(
@@ -25,6 +47,7 @@ class GroupFeatureGenerator(BaseEstimator, TransformerMixin):
         group_metric: Literal["mean", "median", "rank", "min", "max", "percentile"],
         percentile_q: float | None = None,
         target_name: str = "y",
+        sketch_size: int = 1000,
     ):
         if group_metric not in ("mean", "median", "rank", "min", "max", "percentile"):
             raise ValueError(f"Invalid metric {group_metric}.")
@@ -33,15 +56,12 @@ class GroupFeatureGenerator(BaseEstimator, TransformerMixin):
         self.group_metric = group_metric
         self.target_name = target_name
         self.percentile_q = percentile_q
+        self.sketch_size = sketch_size
 
     def fit(self, X: pd.DataFrame, y: pd.Series):
-        self.values_by_group: Mapping[str, Any] = {}
-        X = X.copy()
-        if self.target_name == "y":
-            self.target_name = str(y.name)
-            X[self.target_name] = y
-
-        X_group = X.groupby(self.group_cols)[self.target_name]
+        # NOTE: group the target by the key columns, so X is never copied
+        self.target_name_, target = self._get_target(X, y)
+        X_group = target.groupby([X[col] for col in self.group_cols])
         X_agg: pd.Series
 
         with warnings.catch_warnings():
@@ -52,17 +72,80 @@ class GroupFeatureGenerator(BaseEstimator, TransformerMixin):
                 case "rank":
                     X_agg = X_group.median().rank()
                 case "percentile":
-                    X_agg = X_group.agg(self.percentile, q=self.percentile_q)
+                    X_agg = X_group.quantile(self.percentile_q)
+
+        self.groups_: pd.Index = X_agg.index
+        self.group_values_: np.ndarray = X_agg.to_numpy()
+        self.state_: pd.DataFrame | pd.Series | GroupQuantileSketch | None = None
+        return self
 
-        self.values_by_group = X_agg.to_dict()
+    def partial_fit(self, X: pd.DataFrame, y: pd.Series):
+        """Update the group values with a chunk of the training data.
+
+        Args:
+            X (pd.DataFrame): Chunk with the group columns, and the target column if `target_name` is set
+            y (pd.Series): Target of the chunk, used when `target_name` is not set
+
+        Returns:
+            GroupFeatureGenerator: The fitted instance, usable after every chunk
+        """
+        self.target_name_, target = self._get_target(X, y)
+        data = X[self.group_cols].assign(**{self.target_name_: target}).dropna(subset=self.group_cols)
+        state = getattr(self, "state_", None)
+
+        X_group = data.groupby(self.group_cols)[self.target_name_]
+        match self.group_metric:
+            case "mean":
+                chunk_state = X_group.agg(["sum", "count"])
+                state = chunk_state if state is None else state.add(chunk_state, fill_value=0)
+                X_agg = state["sum"] / state["count"]
+            case "min" | "max":
+                chunk_state = X_group.agg(self.group_metric)
+                if state is not None:
+                    levels = list(range(chunk_state.index.nlevels))
+                    chunk_state = pd.concat([state, chunk_state]).groupby(level=levels).agg(self.group_metric)
+                state = X_agg = chunk_state
+            case "median" | "rank" | "percentile":
+                state = GroupQuantileSketch(self.sketch_size) if state is None else state
+                state.update(_get_group_keys(data, self.group_cols), data[self.target_name_].to_numpy())
+                X_agg = state.quantile(self.percentile_q if self.group_metric == "percentile" else 0.5)
+                X_agg = X_agg.rank() if self.group_metric == "rank" else X_agg
+
+        X_agg = X_agg.sort_index()  # NOTE: same group order as fit
+        self.state_ = state
+        self.groups_ = X_agg.index
+        self.group_values_ = X_agg.to_numpy()
         return self
 
     def transform(self, X: pd.DataFrame, y=None):
-        check_is_fitted(self, "values_by_group")
-        X = X.copy()
-        new_col_name = self._get_new_col_name()
-        X[new_col_name] = X.set_index(self.group_cols).index.map(self.values_by_group)
-        return X[[new_col_name]]
+        check_is_fitted(self, "group_values_")
+        values = _lookup_group_values(self.groups_, self.group_values_, _get_group_keys(X, self.group_cols))
+        return pd.DataFrame({self._get_new_col_name(): values}, index=X.index)
+
+    @property
+    def values_by_group(self) -> Dict[Any, Any]:
+        """Mapping of each fitted group to its metric value."""
+        return dict(zip(self.groups_, self.group_values_))
+
+    def __setstate__(self, state: Dict[str, Any]):
+        # NOTE: generators pickled before the array-backed lookup stored the `values_by_group` mapping
+        if "values_by_group" in state:
+            values_by_group, group_cols = state.pop("values_by_group"), state["group_cols"]
+            groups = list(values_by_group)
+            if len(group_cols) > 1 and groups:
+                state["groups_"] = pd.MultiIndex.from_tuples(groups, names=group_cols)
+            else:
+                state["groups_"] = pd.Index(groups, name=group_cols[0])
+            state["group_values_"] = np.array(list(values_by_group.values()), dtype=float)
+            state["state_"] = None
+        state.setdefault("sketch_size", 1000)
+        super().__setstate__(state)
+
+    def _get_target(self, X: pd.DataFrame, y: pd.Series | None) -> Tuple[str, pd.Series]:
+        """Name and values of the target: the y passed in fit by default, or the `target_name` column of X."""
+        if self.target_name == "y" and y is not None:
+            return str(y.name), y
+        return self.target_name, y if y is not None and y.name == self.target_name else X[self.target_name]
 
     def get_feature_names_out(self, feature_names=None):
         return [self._get_new_col_name()]
@@ -82,13 +165,123 @@ class GroupFeatureGenerator(BaseEstimator, TransformerMixin):
             >>> GroupFeatureGenerator(group_cols=["industry", "country"], target_name='sales', group_metric='percentile', percentile_q=0.5)._get_new_col_name()
             'percentile_50_sales_industry_country'
         """
-        metric = self.group_metric
-        if metric == "percentile":
-            metric = f"{metric}_{self.percentile_q*100:.0f}"
-        new_name = "_".join([metric, self.target_name] + self.group_cols)
-        return new_name
+        target_name = getattr(self, "target_name_", self.target_name)
+        return _get_group_feature_name(self.group_metric, target_name, self.group_cols, self.percentile_q)
 
     @staticmethod
     def percentile(x: pd.DataFrame, q: float) -> pd.DataFrame:
         """Wrapper for groupby quantile aggregation function"""
         return x.quantile(q)
+
+
+class MultiGroupFeatureGenerator(BaseEstimator, TransformerMixin):
+    """Generates several group features of several targets with a single groupby.
+
+    Equivalent to stacking one `GroupFeatureGenerator` per target, metric and percentile
+    over the same `group_cols`, with the same output column names, but the groups are
+    computed once and all the percentiles in a single quantile call.
+
+    Example:
+        >>> X = pd.DataFrame({"country": ["US", "US", "FR"], "sales": [1.0, 3.0, 5.0]})
+        >>> t = MultiGroupFeatureGenerator(["country"], ["mean", "max"], percentiles=[0.5], target_names=["sales"])
+        >>> print(t.fit_transform(X))
+           mean_sales_country  max_sales_country  percentile_50_sales_country
+        0                 2.0                3.0                          2.0
+        1                 2.0                3.0                          2.0
+        2                 5.0                5.0                          5.0
+
+    Attributes:
+        group_cols (List): List of columns used for calculating the aggregated values.
+        group_metrics (List[str]): Metrics to compute, any of ['mean', 'median', 'rank', 'min', 'max'].
+        percentiles (List[float]): Quantiles to compute, between 0 and 1.
+        target_names (List[str] | None): Columns of X to aggregate. Defaults to the y passed in fit.
+        groups_ (pd.Index): the fitted groups, a MultiIndex when grouping by several columns.
+            Set in fit method.
+        group_values_ (np.ndarray): the value of each group (rows) and feature (columns), aligned
+            with `groups_` and `feature_names_out_`. Set in fit method.
+        feature_names_out_ (List[str]): Names of the generated features. Set in fit method.
+    """
+
+    def __init__(
+        self,
+        group_cols: List,
+        group_metrics: Sequence[Literal["mean", "median", "rank", "min", "max"]] = (),
+        percentiles: Sequence[float] = (),
+        target_names: List[str] | None = None,
+    ):
+        invalid_metrics = set(group_metrics) - {"mean", "median", "rank", "min", "max"}
+        if invalid_metrics:
+            raise ValueError(f"Invalid metrics {sorted(invalid_metrics)}.")
+        if not group_metrics and not percentiles:
+            raise ValueError("At least one metric or percentile is required.")
+
+        self.group_cols = group_cols
+        self.group_metrics = group_metrics
+        self.percentiles = percentiles
+        self.target_names = target_names
+
+    def fit(self, X: pd.DataFrame, y: pd.Series | None = None):
+        if self.target_names is None:
+            targets = [str(y.name)]
+            data = X[self.group_cols].assign(**{targets[0]: y})
+        else:
+            targets = list(self.target_names)
+            data = X[self.group_cols + targets]
+
+        X_group = data.groupby(self.group_cols)[targets]
+        stats = [m for m in ("mean", "median", "min", "max") if m in self.group_metrics]
+        if "rank" in self.group_metrics and "median" not in stats:
+            stats.append("median")
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            X_agg = X_group.agg(stats) if stats else None
+            X_quantiles = X_group.quantile(list(self.percentiles)).unstack() if self.percentiles else None
+
+        groups = X_agg.index if X_agg is not None else X_quantiles.index  # type: ignore[union-attr]
+        features: Dict[str, pd.Series] = {}
+        for target in targets:
+            for metric in self.group_metrics:
+                name = _get_group_feature_name(metric, target, self.group_cols)
+                features[name] = X_agg[(target, "median" if metric == "rank" else metric)]  # type: ignore[index]
+                if metric == "rank":
+                    features[name] = features[name].rank()
+            for q in self.percentiles:
+                name = _get_group_feature_name("percentile", target, self.group_cols, q)
+                features[name] = X_quantiles[(target, q)].reindex(groups)  # type: ignore[index]
+
+        self.groups_: pd.Index = groups
+        self.group_values_: np.ndarray = np.column_stack([v.to_numpy(dtype=float) for v in features.values()])
+        self.feature_names_out_: List[str] = list(features)
+        return self
+
+    def transform(self, X: pd.DataFrame, y=None):
+        check_is_fitted(self, "group_values_")
+        values = _lookup_group_values(self.groups_, self.group_values_, _get_group_keys(X, self.group_cols))
+        return pd.DataFrame(values, index=X.index, columns=self.feature_names_out_)
+
+    def get_feature_names_out(self, feature_names=None):
+        check_is_fitted(self, "feature_names_out_")
+        return list(self.feature_names_out_)
+
+
+def _get_group_feature_name(metric: str, target_name: str, group_cols: List, percentile_q: float | None = None) -> str:
+    if metric == "percentile":
+        metric = f"{metric}_{percentile_q*100:.0f}"  # type: ignore[operator]
+    return "_".join([metric, target_name] + list(group_cols))
+
+
+def _get_group_keys(X: pd.DataFrame, group_cols: List) -> pd.Index:
+    """Index of the group of each row, comparable with the fitted groups."""
+    if len(group_cols) == 1:
+        return pd.Index(X[group_cols[0]])
+    return pd.MultiIndex.from_frame(X[group_cols])
+
+
+def _lookup_group_values(groups: pd.Index, values: np.ndarray, keys: pd.Index) -> np.ndarray:
+    """Values of the group of each key, NaN for the groups that were not fitted."""
+    codes = groups.get_indexer(keys)
+    if (codes >= 0).all():
+        return values.take(codes, axis=0)
+    found = (codes >= 0).reshape(-1, *([1] * (values.ndim - 1)))
+    return np.where(found, values.take(codes, axis=0), np.nan)  # NOTE: unseen groups
@@ -0,0 +1,203 @@
+"""Parsing and compilation of row-wise formulas into vectorized callables."""
+import ast
+import re
+import textwrap
+from typing import Dict, List, Mapping, Tuple
+
+import numpy as np
+
+try:
+    import numexpr
+except ImportError:  # NOTE: optional, plain numpy is used without it
+    numexpr = None
+
+_ALLOWED_NODES = (
+    ast.Expression,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.Compare,
+    ast.Name,
+    ast.Constant,
+    ast.Load,
+    # NOTE: operators
+    ast.Add,
+    ast.Sub,
+    ast.Mult,
+    ast.Div,
+    ast.Pow,
+    ast.BitAnd,
+    ast.BitOr,
+    ast.USub,
+    ast.UAdd,
+    ast.Invert,
+    ast.Lt,
+    ast.LtE,
+    ast.Gt,
+    ast.GtE,
+    ast.Eq,
+    ast.NotEq,
+)
+
+_BACKTICK_NAME_REGEX = re.compile(r"`([^`]+)`")
+
+
+class CompiledFormula:
+    """Formula parsed once and compiled into a vectorized callable over numpy arrays.
+
+    A formula is one or more `name = expression` lines, separated by new lines or `;`.
+    Expressions support `+ - * / **`, comparisons, `&`, `|`, `~` and their `and`, `or`,
+    `not` spellings, numeric constants and column names, quoted with backticks when they
+    are not identifiers (e.g. `` `sepal length (cm)` ``). A line can use the names assigned
+    by the previous ones. This is the arithmetic subset of the `DataFrame.eval` syntax:
+    function calls, attributes, strings, chained comparisons and `@` variables are not
+    supported. Expressions are evaluated with numexpr when it is installed, and with numpy
+    otherwise.
+
+    Example:
+        >>> formula = CompiledFormula("revenue_per_capita = revenue / employees; is_large = revenue_per_capita > 150")
+        >>> formula.inputs, formula.outputs
+        (['revenue', 'employees'], ['revenue_per_capita', 'is_large'])
+        >>> formula({"revenue": np.array([100.0, 400.0]), "employees": np.array([1, 2])}, size=2)
+        {'revenue_per_capita': array([100., 200.]), 'is_large': array([False,  True])}
+        >>> CompiledFormula("is_wide = `sepal width (cm)` > 3 and not `petal width (cm)` > 1").inputs
+        ['sepal width (cm)', 'petal width (cm)']
+
+    Attributes:
+        formula (str): The formula source.
+        assignments (List[Tuple[str, ast.Expression]]): The validated expression of each line, with the backtick
+            quoted names replaced by identifiers.
+        inputs (List[str]): Columns read by the formula, in order of appearance.
+        outputs (List[str]): Names assigned by the formula, in order of appearance.
+    """
+
+    def __init__(self, formula: str):
+        self.formula = formula
+        source, self._names = self._replace_backtick_names(formula)
+        self.assignments = self._parse(source, formula)
+        self._inputs: List[str] = []
+        self._outputs: List[str] = []
+        for name, expression in self.assignments:
+            names = sorted((n.col_offset, n.id) for n in ast.walk(expression) if isinstance(n, ast.Name))
+            for _, input_name in names:
+                if input_name not in self._outputs and input_name not in self._inputs:
+                    self._inputs.append(input_name)
+            if name not in self._outputs:
+                self._outputs.append(name)
+        self.inputs = [self._names.get(name, name) for name in self._inputs]
+        self.outputs = [self._names.get(name, name) for name in self._outputs]
+        self._sources = [ast.unparse(expression) for _, expression in self.assignments]
+        self._code = [compile(expression, "<formula>", "eval") for _, expression in self.assignments]
+
+    def __repr__(self) -> str:
+        return f"CompiledFormula({self.formula!r})"
+
+    def __reduce__(self):
+        return CompiledFormula, (self.formula,)  # NOTE: code objects can not be pickled, recompile instead
+
+    def __call__(self, columns: Mapping[str, np.ndarray], size: int) -> Dict[str, np.ndarray]:
+        """Evaluates the formula.
+
+        Args:
+            columns (Mapping[str, np.ndarray]): Array of each input column
+            size (int): Number of rows, constant expressions are broadcast to it
+
+        Returns:
+            Dict[str, np.ndarray]: Array of each output
+        """
+        env = {name: columns[input_name] for name, input_name in zip(self._inputs, self.inputs)}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for (name, _), source, code in zip(self.assignments, self._sources, self._code):
+                result = self._evaluate_numexpr(source, env) if numexpr is not None else None
+                if result is None:
+                    result = eval(code, {"__builtins__": {}}, env)  # NOTE: safe, the AST is validated
+                env[name] = np.broadcast_to(result, (size,)) if np.ndim(result) == 0 else result
+        return {output_name: env[name] for name, output_name in zip(self._outputs, self.outputs)}
+
+    @staticmethod
+    def _evaluate_numexpr(source: str, env: Dict[str, np.ndarray]) -> np.ndarray | None:
+        try:
+            return numexpr.evaluate(source, local_dict=env)
+        except (TypeError, ValueError, NotImplementedError, KeyError):  # NOTE: e.g. object arrays
+            return None
+
+    @staticmethod
+    def _replace_backtick_names(formula: str) -> Tuple[str, Dict[str, str]]:
+        """Replaces the backtick quoted names by identifiers, as `DataFrame.eval` does.
+
+        Examples:
+            >>> CompiledFormula._replace_backtick_names("x = `a b` + `c-d` * `a b`")
+            ('x = _backtick_0 + _backtick_1 * _backtick_0', {'_backtick_0': 'a b', '_backtick_1': 'c-d'})
+        """
+        names: Dict[str, str] = {}
+        identifiers: Dict[str, str] = {}
+
+        def replace(match: re.Match) -> str:
+            name = match.group(1)
+            if name not in identifiers:
+                identifiers[name] = f"_backtick_{len(identifiers)}"
+                names[identifiers[name]] = name
+            return identifiers[name]
+
+        return _BACKTICK_NAME_REGEX.sub(replace, formula), names
+
+    @staticmethod
+    def _parse(source: str, formula: str | None = None) -> List[Tuple[str, ast.Expression]]:
+        """Parses and validates the `name = expression` lines of a formula.
+
+        `and`, `or` and `not` are rewritten to the elementwise `&`, `|` and `~`.
+
+        Args:
+            source (str): The formula, with backtick quoted names replaced by identifiers
+            formula (str | None, optional): The original formula, for the error messages. Defaults to `source`.
+
+        Examples:
+            >>> CompiledFormula._parse("x = __import__('os')")
+            Traceback (most recent call last):
+            ...
+            ValueError: Unsupported Call in formula "x = __import__('os')".
+            >>> ast.unparse(CompiledFormula._parse("x = a > 1 and not b or c")[0][1])
+            '(a > 1) & ~b | c'
+        """
+        formula = source if formula is None else formula
+        try:
+            module = ast.parse(textwrap.dedent(source).strip())
+        except SyntaxError as e:
+            raise ValueError(f"Invalid formula {formula!r}: {e.msg}.") from e
+        assignments = []
+        for statement in module.body:
+            if (
+                not isinstance(statement, ast.Assign)
+                or len(statement.targets) != 1
+                or not isinstance(statement.targets[0], ast.Name)
+            ):
+                raise ValueError(f"Formula lines must be `name = expression`, got {ast.unparse(statement)!r}.")
+            expression = ast.fix_missing_locations(_BooleanOperators().visit(ast.Expression(body=statement.value)))
+            for node in ast.walk(expression):
+                if not isinstance(node, _ALLOWED_NODES):
+                    raise ValueError(f'Unsupported {type(node).__name__} in formula "{formula}".')
+                if isinstance(node, ast.Compare) and len(node.ops) > 1:
+                    raise ValueError(f'Chained comparisons are not supported in formula "{formula}".')
+                if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float, bool)):
+                    raise ValueError(f'Unsupported constant {node.value!r} in formula "{formula}".')
+            assignments.append((statement.targets[0].id, expression))
+        if not assignments:
+            raise ValueError(f"Empty formula {formula!r}.")
+        return assignments
+
+
+class _BooleanOperators(ast.NodeTransformer):
+    """Rewrites `and`, `or` and `not` to `&`, `|` and `~`, which apply elementwise to arrays."""
+
+    def visit_BoolOp(self, node: ast.BoolOp) -> ast.AST:
+        self.generic_visit(node)
+        op = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+        result = node.values[0]
+        for value in node.values[1:]:
+            result = ast.copy_location(ast.BinOp(left=result, op=op, right=value), node)
+        return result
+
+    def visit_UnaryOp(self, node: ast.UnaryOp) -> ast.AST:
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            return ast.copy_location(ast.UnaryOp(op=ast.Invert(), operand=node.operand), node)
+        return node
@@ -0,0 +1,182 @@
+"""Fused execution of the derived features transformers."""
+import textwrap
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Set
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin, clone
+from sklearn.utils.validation import check_is_fitted
+
+from feature_store.derived_features.aggregated_features import GroupFeatureGenerator, MultiGroupFeatureGenerator
+from feature_store.derived_features.formulas import CompiledFormula
+from feature_store.derived_features.row_features import FormulaTransformer
+
+GroupStep = GroupFeatureGenerator | MultiGroupFeatureGenerator
+Step = FormulaTransformer | GroupStep
+
+
+class FeatureStage(NamedTuple):
+    """Steps run together: the fused formulas first, then the group steps in parallel."""
+
+    formula: CompiledFormula | None
+    group_steps: List[GroupStep]
+
+
+class FeaturePipeline(BaseEstimator, TransformerMixin):
+    """Runs formula and group feature transformers as a single fused transformer.
+
+    Unlike stacking the transformers in a `ColumnTransformer`, steps can use the features
+    generated by other steps, and no intermediate dataframe is built per step. The steps are
+    ordered by their column dependencies into stages. In each stage, every ready formula is
+    fused into a single `CompiledFormula` evaluated in one pass over numpy arrays. Then the
+    ready group steps, which are independent, are run in a thread pool. The features are
+    written into a single block at the end when they are all floats, otherwise they keep
+    their dtypes, e.g. bool for comparisons, as with the unfused transformers.
+
+    Example:
+        >>> X = pd.DataFrame({"country": ["US", "US", "FR"], "revenue": [100, 300, 50], "employees": [1, 2, 5]})
+        >>> pipeline = FeaturePipeline([
+        ...     FormulaTransformer(formula="revenue_per_capita = revenue / employees"),
+        ...     GroupFeatureGenerator(["country"], "mean", target_name="revenue_per_capita"),
+        ...     FormulaTransformer(formula="relative = revenue_per_capita / mean_revenue_per_capita_country"),
+        ... ])
+        >>> print(pipeline.fit_transform(X))
+           revenue_per_capita  mean_revenue_per_capita_country  relative
+        0               100.0                            125.0       0.8
+        1               150.0                            125.0       1.2
+        2                10.0                             10.0       1.0
+
+    Attributes:
+        steps (List[Step]): Transformers to run. They are cloned in fit.
+        n_jobs (int | None): Number of threads for the group steps. Defaults to the executor default.
+        steps_ (List[Step]): The fitted transformers. Set in fit method.
+        stages_ (List[FeatureStage]): The execution plan. Set in fit method.
+        feature_names_out_ (List[str]): Generated features, in the order of the steps. Set in fit method.
+    """
+
+    def __init__(self, steps: List[Step], n_jobs: int | None = None):
+        self.steps = steps
+        self.n_jobs = n_jobs
+
+    def fit(self, X: pd.DataFrame, y: pd.Series | None = None):
+        self.fit_transform(X, y)
+        return self
+
+    def fit_transform(self, X: pd.DataFrame, y: pd.Series | None = None, **fit_params) -> pd.DataFrame:
+        self.steps_: List[Step] = [clone(step) for step in self.steps]
+        self.stages_: List[FeatureStage] = []
+        features: Dict[str, np.ndarray] = {}
+        pending = list(self.steps_)
+        while pending:
+            available = set(X.columns) | set(features)
+            formula_steps = self._get_ready_formulas(pending, available)
+            group_steps = [
+                step
+                for step in pending
+                if not isinstance(step, FormulaTransformer) and set(self._get_group_inputs(step, y)) <= available
+            ]
+            if not formula_steps and not group_steps:
+                missing = {col for step in pending for col in self._get_inputs(step, y)} - available
+                raise ValueError(f"Missing columns {sorted(missing)} or circular dependencies between steps.")
+            for step in formula_steps:
+                step.fit(X.head(0))  # NOTE: only compiles the formula, for get_feature_names_out
+            stage = FeatureStage(self._fuse(formula_steps), group_steps)
+            self._run_stage(stage, X, y, features, fit=True)
+            self.stages_.append(stage)
+            pending = [step for step in pending if all(step is not s for s in formula_steps + group_steps)]
+
+        self.feature_names_out_: List[str] = [name for step in self.steps_ for name in step.get_feature_names_out()]
+        duplicated = pd.Index(self.feature_names_out_)[pd.Index(self.feature_names_out_).duplicated()]
+        if len(duplicated):
+            raise ValueError(f"Features {sorted(set(duplicated))} are generated by several steps.")
+        return self._to_block(X, features)
+
+    def transform(self, X: pd.DataFrame, y=None) -> pd.DataFrame:
+        check_is_fitted(self, "stages_")
+        features: Dict[str, np.ndarray] = {}
+        for stage in self.stages_:
+            self._run_stage(stage, X, None, features, fit=False)
+        return self._to_block(X, features)
+
+    def get_feature_names_out(self, feature_names=None):
+        check_is_fitted(self, "feature_names_out_")
+        return list(self.feature_names_out_)
+
+    def _run_stage(
+        self, stage: FeatureStage, X: pd.DataFrame, y: pd.Series | None, features: Dict[str, np.ndarray], fit: bool
+    ):
+        if stage.formula is not None:
+            columns = {col: features[col] if col in features else X[col].to_numpy() for col in stage.formula.inputs}
+            features.update(stage.formula(columns, size=len(X)))
+        if not stage.group_steps:
+            return
+
+        def run_group_step(step: GroupStep) -> pd.DataFrame:
+            data = self._get_frame(X, features, self._get_group_inputs(step, y) if fit else step.group_cols)
+            if fit:
+                step.fit(data, y)
+            return step.transform(data)
+
+        with ThreadPoolExecutor(self.n_jobs) as executor:
+            for result in executor.map(run_group_step, stage.group_steps):
+                features.update({col: result[col].to_numpy() for col in result.columns})
+
+    def _to_block(self, X: pd.DataFrame, features: Dict[str, np.ndarray]) -> pd.DataFrame:
+        dtypes = {features[name].dtype for name in self.feature_names_out_}
+        if len(dtypes) != 1 or (dtype := dtypes.pop()).kind != "f":
+            return pd.DataFrame({name: features[name] for name in self.feature_names_out_}, index=X.index)
+        # NOTE: column major, so every feature is written contiguously and pandas does not copy the block
+        block = np.empty((len(X), len(self.feature_names_out_)), dtype=dtype, order="F")
+        for i, name in enumerate(self.feature_names_out_):
+            block[:, i] = features[name]
+        return pd.DataFrame(block, index=X.index, columns=self.feature_names_out_)
+
+    @staticmethod
+    def _get_frame(X: pd.DataFrame, features: Dict[str, np.ndarray], columns: List[str]) -> pd.DataFrame:
+        """Frame with the given input or generated columns, X itself if they are all inputs."""
+        if all(col in X.columns and col not in features for col in columns):
+            return X
+        return pd.DataFrame(
+            {col: features[col] if col in features else X[col].to_numpy() for col in columns}, index=X.index
+        )
+
+    @staticmethod
+    def _get_ready_formulas(pending: List[Step], available: Set[str]) -> List[FormulaTransformer]:
+        """Formulas whose inputs are available, including those using the outputs of other ready formulas."""
+        ready: List[FormulaTransformer] = []
+        available = set(available)
+        added = True
+        while added:
+            added = False
+            for step in pending:
+                if isinstance(step, FormulaTransformer) and all(step is not s for s in ready):
+                    formula = CompiledFormula(step.formula)
+                    if set(formula.inputs) <= available:
+                        ready.append(step)
+                        available |= set(formula.outputs)
+                        added = True
+        return ready
+
+    @staticmethod
+    def _fuse(formula_steps: List[FormulaTransformer]) -> CompiledFormula | None:
+        if not formula_steps:
+            return None
+        return CompiledFormula("\n".join(textwrap.dedent(step.formula).strip() for step in formula_steps))
+
+    @staticmethod
+    def _get_group_inputs(step: GroupStep, y: pd.Series | None) -> List[str]:
+        """Columns needed to fit a group step: the group columns and the targets not given as y."""
+        if isinstance(step, MultiGroupFeatureGenerator):
+            targets = list(step.target_names or [])
+        elif step.target_name != "y" and (y is None or y.name != step.target_name):
+            targets = [step.target_name]
+        else:
+            targets = []
+        return list(step.group_cols) + targets
+
+    @classmethod
+    def _get_inputs(cls, step: Step, y: pd.Series | None) -> List[str]:
+        if isinstance(step, FormulaTransformer):
+            return CompiledFormula(step.formula).inputs
+        return cls._get_group_inputs(step, y)
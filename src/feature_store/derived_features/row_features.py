@@ -4,14 +4,20 @@ import pandas as pd
 from sklearn import set_config
 from sklearn.preprocessing import FunctionTransformer
 
+from feature_store.derived_features.formulas import CompiledFormula
+
 set_config(transform_output="pandas")
 
 
 class FormulaTransformer(FunctionTransformer):
     """Sklearn transformers that applies a formula to a dataframe.
 
+    The formula is parsed and compiled once in fit, see `CompiledFormula` for the syntax.
+    It can have several `name = expression` lines, one output column per line.
+
     Attributes:
         formula (str): The formula to be applied to the dataframe.
+        compiled_formula_ (CompiledFormula): The compiled formula. Set in fit method.
 
     Example:
         >>> X = pd.DataFrame({"revenue": [100, 200, 300], "employees": [1, 2, 3]})
@@ -23,6 +29,12 @@ class FormulaTransformer(FunctionTransformer):
         2               100.0
         >>> print(t.get_feature_names_out())
         ['revenue_per_capita']
+        >>> t = FormulaTransformer(formula="revenue_k = revenue / 1000; is_large = revenue_k >= 0.2")
+        >>> print(t.fit_transform(X))
+           revenue_k  is_large
+        0        0.1     False
+        1        0.2      True
+        2        0.3      True
     """
 
     def __init__(self, *, formula: str):
@@ -32,11 +44,31 @@ class FormulaTransformer(FunctionTransformer):
             feature_names_out=self._get_feature_name_out_from_formula,
         )
 
+    def fit(self, X, y=None):
+        self.compiled_formula_ = CompiledFormula(self.formula)
+        return super().fit(X, y)
+
     def apply_formula(self, data: pd.DataFrame) -> pd.DataFrame:
-        return data.eval(self.formula)[self._get_feature_name_out_from_formula()]
+        formula = self._get_compiled_formula()
+        # NOTE: only the columns in the formula are read and the frame is never copied
+        columns = {col: data[col].to_numpy() for col in formula.inputs}
+        return pd.DataFrame(formula(columns, size=len(data)), index=data.index)
+
+    def _get_compiled_formula(self) -> CompiledFormula:
+        if getattr(self, "compiled_formula_", None) is None or self.compiled_formula_.formula != self.formula:
+            self.compiled_formula_ = CompiledFormula(self.formula)  # NOTE: transform without fit
+        return self.compiled_formula_
 
     def _get_feature_name_out_from_formula(self, *args, **kwargs) -> Sequence[str]:
-        return [self.formula.split("=")[0].strip()]
+        return self._get_compiled_formula().outputs
 
     def _get_feature_names_in_from_formula(self, *args, **kwargs) -> Sequence[str]:
-        return [col.strip() for col in self.formula.split("=")[1].split("/") if col.strip() != ""]
+        """Columns used by the formula, in order of appearance.
+
+        Examples:
+            >>> FormulaTransformer(formula="y = (a + b) / a - 2 * c")._get_feature_names_in_from_formula()
+            ['a', 'b', 'c']
+            >>> FormulaTransformer(formula="d = a - b; e = d ** 2 + c")._get_feature_names_in_from_formula()
+            ['a', 'b', 'c']
+        """
+        return self._get_compiled_formula().inputs
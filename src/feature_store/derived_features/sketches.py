@@ -0,0 +1,114 @@
+"""Mergeable per-group summaries used to fit group features out of core."""
+import numpy as np
+import pandas as pd
+
+
+class GroupQuantileSketch:
+    """Mergeable quantile sketch of the values of many groups.
+
+    Each group is summarized by weighted centroids, i.e. (value, weight) pairs sorted by value.
+    Groups are kept exact until they have more than `2 * size` centroids, then they are
+    compressed to `size` centroids of about the same weight. Quantiles are interpolated
+    linearly between centroids, so they match `pandas.Series.quantile` while a group is exact.
+    All the operations are vectorized over the groups.
+
+    Example:
+        >>> sketch = GroupQuantileSketch(size=100)
+        >>> sketch = sketch.update(pd.Index(["US", "US", "FR"]), np.array([1.0, 3.0, 5.0]))
+        >>> sketch = sketch.update(pd.Index(["US", "FR"]), np.array([2.0, 7.0]))
+        >>> sketch.quantile(0.5).to_dict()
+        {'US': 2.0, 'FR': 6.0}
+
+    Attributes:
+        size (int): Number of centroids a large group is compressed to.
+        groups (pd.Index): The groups seen so far, a MultiIndex for several group columns.
+        codes (np.ndarray): Position in `groups` of the group of each centroid.
+        values (np.ndarray): Value of each centroid.
+        weights (np.ndarray): Number of values summarized by each centroid.
+    """
+
+    def __init__(self, size: int = 1000):
+        if size < 1:
+            raise ValueError(f"Invalid sketch size {size}.")
+        self.size = size
+        self.groups: pd.Index = pd.Index([])
+        self.codes = np.empty(0, dtype=np.intp)
+        self.values = np.empty(0, dtype=float)
+        self.weights = np.empty(0, dtype=float)
+
+    def update(self, keys: pd.Index, values: np.ndarray) -> "GroupQuantileSketch":
+        """Adds the values of a chunk, `keys` being the group of each value. NaN values are skipped."""
+        values = np.asarray(values, dtype=float)
+        is_valid = ~np.isnan(values)
+        return self._add(keys[is_valid], values[is_valid], np.ones(is_valid.sum()))
+
+    def merge(self, other: "GroupQuantileSketch") -> "GroupQuantileSketch":
+        """Adds the centroids of another sketch, e.g. one fitted on another chunk or process."""
+        return self._add(other.groups.take(other.codes), other.values, other.weights)
+
+    def quantile(self, q: float) -> pd.Series:
+        """Quantile of each group, interpolated as with `pandas.Series.quantile`.
+
+        Args:
+            q (float): Quantile between 0 and 1
+
+        Returns:
+            pd.Series: The quantile of every group with values, indexed by group
+        """
+        n_groups = len(self.groups)
+        counts = np.bincount(self.codes, minlength=n_groups)
+        totals = np.bincount(self.codes, self.weights, minlength=n_groups)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        # NOTE: the position of a centroid is the rank of its middle value, i.e. i for an exact value
+        positions = self._cumulative_weights() - (self.weights + 1) / 2
+        # NOTE: offset the positions by group so a single search finds the centroids of every group
+        offsets = np.concatenate(([0.0], np.cumsum(totals + 1)[:-1]))
+        keys = positions + offsets[self.codes]
+        targets = (totals - 1) * q + offsets
+        ends = np.maximum(starts + counts - 1, starts)
+        lo = np.clip(np.searchsorted(keys, targets, side="right") - 1, starts, ends)
+        hi = np.clip(lo + 1, starts, ends)
+        has_values = counts > 0
+        lo, hi, targets = lo[has_values], hi[has_values], targets[has_values]
+        if len(keys) == 0:
+            return pd.Series([], index=self.groups[has_values], dtype=float)
+        gap = keys[hi] - keys[lo]
+        fraction = np.clip(np.divide(targets - keys[lo], gap, out=np.zeros_like(gap), where=gap > 0), 0, 1)
+        result = self.values[lo] + (self.values[hi] - self.values[lo]) * fraction
+        return pd.Series(result, index=self.groups[has_values])
+
+    def _add(self, keys: pd.Index, values: np.ndarray, weights: np.ndarray) -> "GroupQuantileSketch":
+        codes = self.groups.get_indexer(keys) if len(self.groups) else np.full(len(keys), -1)
+        if (codes < 0).any():
+            self.groups = self.groups.append(keys[codes < 0].unique()) if len(self.groups) else keys.unique()
+            codes = self.groups.get_indexer(keys)
+        order = np.lexsort((np.concatenate((self.values, values)), np.concatenate((self.codes, codes))))
+        self.codes = np.concatenate((self.codes, codes))[order]
+        self.values = np.concatenate((self.values, values))[order]
+        self.weights = np.concatenate((self.weights, weights))[order]
+        self._compress()
+        return self
+
+    def _cumulative_weights(self) -> np.ndarray:
+        """Cumulative weight of each centroid within its group. Centroids must be sorted by group."""
+        cumulative = np.cumsum(self.weights)
+        is_first = np.concatenate(([True], self.codes[1:] != self.codes[:-1]))
+        group_base = (cumulative - self.weights)[is_first]
+        return cumulative - np.repeat(group_base, np.diff(np.flatnonzero(np.append(is_first, True))))
+
+    def _compress(self):
+        counts = np.bincount(self.codes, minlength=len(self.groups))
+        if counts.max(initial=0) <= 2 * self.size:
+            return
+        totals = np.bincount(self.codes, self.weights, minlength=len(self.groups))
+        is_large = counts[self.codes] > 2 * self.size
+        buckets = np.arange(len(self.codes))  # NOTE: small groups keep one bucket per centroid
+        mid_weights = self._cumulative_weights() - self.weights / 2
+        buckets[is_large] = np.floor(mid_weights[is_large] / totals[self.codes[is_large]] * self.size)
+        starts = np.flatnonzero(
+            np.concatenate(([True], (self.codes[1:] != self.codes[:-1]) | (buckets[1:] != buckets[:-1])))
+        )
+        weights = np.add.reduceat(self.weights, starts)
+        self.values = np.add.reduceat(self.values * self.weights, starts) / weights
+        self.weights = weights
+        self.codes = self.codes[starts]
@@ -1,34 +1,149 @@
-from typing import Dict, Type
+import json
+import os
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Type
 
-from pydantic import PyObject, SecretStr
+import pandas as pd
+import sqlalchemy as sa
+from loguru import logger
+from pydantic import Field, PyObject, SecretStr
 
 from config import BaseConfig
 from config.logging import logger_wraps
-from data_access_layer import DataAccessLayer
-from data_access_layer.files import create_dir_if_not_exists
+from data_access_layer import DataAccessLayer, PoolConfig
+from data_access_layer.files import (
+    ParquetOptions,
+    check_is_local_path,
+    create_dir_if_not_exists,
+    write_parquet,
+    write_parquet_chunks,
+)
 from feature_store.feature_views import BaseFeatureView
 
 
 class Config(BaseConfig):
     feature_view: PyObject = Type[BaseFeatureView]
     db_url: SecretStr
+    pool: PoolConfig = Field(default_factory=PoolConfig)
     read_kwargs: Dict = {}
+    chunksize: int | None = None  # NOTE: stream the view in chunks of this many rows when set
+    # NOTE: when set, only rows newer than the last extracted value of this column are extracted
+    # and appended as new parquet part files to the `dst` dataset directory
+    watermark_column: str | None = None
 
     dst: str
+    parquet: ParquetOptions = ParquetOptions()
 
 
 class ExtractTask:
     def __init__(self, config: Config) -> None:
         self.config = config
-        self.dal = DataAccessLayer(conn_string=config.db_url.get_secret_value()).connect()
+        self.dal = DataAccessLayer(conn_string=config.db_url.get_secret_value(), pool_config=config.pool).connect()
 
     @logger_wraps(outputs=True)
     def run(self):
-        data = self.config.feature_view.read(self.dal, **self.config.read_kwargs)
+        if self.config.watermark_column is not None:
+            self.run_incremental()
+            return self.config.dst
+
         create_dir_if_not_exists(self.config.dst)
-        data.to_parquet(self.config.dst)
+        if self.config.chunksize is not None:
+            chunks = self.config.feature_view.read_chunks(
+                self.dal, chunksize=self.config.chunksize, **self.config.read_kwargs
+            )
+            write_parquet_chunks(chunks, self.config.dst, self.config.parquet)
+        else:
+            data = self.config.feature_view.read(self.dal, **self.config.read_kwargs)
+            write_parquet(data, self.config.dst, self.config.parquet)
         return self.config.dst
 
+    def run_incremental(self) -> int:
+        """Extract the rows newer than the stored watermark as new part files of the `dst` dataset.
+
+        The watermark is the maximum value of `watermark_column` extracted so far, kept in a
+        `_watermark.json` file inside the dataset directory (ignored by parquet readers). It
+        is only updated after the new part files are written, and `write_parquet_chunks` only
+        moves them in place once every chunk is written, so a failed run leaves no partial part
+        file and is retried from the previous watermark. The feature view `read` and
+        `read_chunks` must accept a `filters` argument, see `BaseFeatureView.build_query`.
+
+        Returns:
+            int: Number of new rows extracted
+        """
+        if not check_is_local_path(self.config.dst):
+            raise ValueError(f"Incremental extraction only supports local destinations: {self.config.dst}")
+        column = self.config.watermark_column
+        dataset_dir = Path(self.config.dst)
+        dataset_dir.mkdir(parents=True, exist_ok=True)
+        watermark_path = dataset_dir / "_watermark.json"
+
+        read_kwargs = dict(self.config.read_kwargs)
+        filters = list(read_kwargs.pop("filters", None) or [])
+        watermark = read_watermark(watermark_path, column)
+        if watermark is not None:
+            filters.append(sa.column(column) > watermark)
+        logger.info(f"Extracting rows with {column} > {watermark}")
+
+        chunks: Iterable[pd.DataFrame]
+        if self.config.chunksize is not None:
+            chunks = self.config.feature_view.read_chunks(
+                self.dal, chunksize=self.config.chunksize, filters=filters, **read_kwargs
+            )
+        else:
+            chunks = [self.config.feature_view.read(self.dal, filters=filters, **read_kwargs)]
+
+        new_watermark = None
+
+        def track_watermark(chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+            nonlocal new_watermark
+            for chunk in chunks:
+                if chunk.empty:
+                    continue
+                chunk_watermark = chunk[column].max()
+                new_watermark = chunk_watermark if new_watermark is None else max(new_watermark, chunk_watermark)
+                yield chunk
+
+        if self.config.parquet.partition_cols:
+            dst = str(dataset_dir)
+        else:
+            dst = str(dataset_dir / f"part-{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}.parquet")
+        n_rows = write_parquet_chunks(track_watermark(chunks), dst, self.config.parquet, append=True)
+
+        if n_rows:
+            write_watermark(watermark_path, column, new_watermark)
+        logger.info(f"Extracted {n_rows} new rows. Watermark {column} = {new_watermark or watermark}")
+        return n_rows
+
+
+def read_watermark(path: Path, column: str) -> Any:
+    """Returns the watermark stored in the file or None if there is none for the column.
+
+    Timestamps are returned as `datetime`, so they are bound as typed parameters in the incremental
+    filter. Compared as strings, e.g. by SQLite, their ISO format does not sort with the stored ones.
+    """
+    if not path.exists():
+        return None
+    state = json.loads(path.read_text())
+    if state["column"] != column:
+        raise ValueError(f"Watermark in {path} is for column {state['column']}, not {column}")
+    if state.get("type") == "timestamp":
+        return pd.Timestamp(state["value"]).to_pydatetime()
+    return state["value"]
+
+
+def write_watermark(path: Path, column: str, value: Any):
+    """Atomically writes the watermark of the column to the file."""
+    state = {"column": column, "value": value}
+    if isinstance(value, (pd.Timestamp, datetime)):
+        state.update(value=pd.Timestamp(value).isoformat(), type="timestamp")
+    elif hasattr(value, "item"):  # NOTE: numpy scalars
+        state.update(value=value.item())
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    tmp_path.write_text(json.dumps(state))
+    os.replace(tmp_path, path)
+
 
 if __name__ == "__main__":
     config = Config()
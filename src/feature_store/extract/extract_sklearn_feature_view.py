@@ -1,13 +1,17 @@
+from typing import Type
+
 from config import BaseConfig
 from config.logging import logger_wraps
 from data_access_layer.dal import SklearnDataAccessLayer
-from data_access_layer.files import create_dir_if_not_exists
-from feature_store.feature_views import DiabetesFeatureView, IrisFeatureView
+from data_access_layer.files import ParquetOptions, create_dir_if_not_exists, write_parquet, write_parquet_chunks
+from feature_store.feature_views import BaseFeatureView, DiabetesFeatureView, IrisFeatureView
 
 
 class Config(BaseConfig):
     sklearn_dataset: str = "diabetes"
+    chunksize: int | None = None  # NOTE: stream the view in chunks of this many rows when set
     dst: str
+    parquet: ParquetOptions = ParquetOptions()
 
 
 class ExtractTask:
@@ -17,16 +21,22 @@ class ExtractTask:
 
     @logger_wraps(outputs=True)
     def run(self):
+        feature_view: Type[BaseFeatureView]
         match self.config.sklearn_dataset:
             case "diabetes":
-                data = DiabetesFeatureView.read(self.dal)
+                feature_view = DiabetesFeatureView
             case "iris":
-                data = IrisFeatureView.read(self.dal)
+                feature_view = IrisFeatureView
             case _:
                 raise ValueError(f"Unknown sklearn dataset: {self.config.sklearn_dataset}")
 
         create_dir_if_not_exists(self.config.dst)
-        data.to_parquet(self.config.dst)
+        if self.config.chunksize is not None:
+            chunks = feature_view.read_chunks(self.dal, chunksize=self.config.chunksize)
+            write_parquet_chunks(chunks, self.config.dst, self.config.parquet)
+        else:
+            data = feature_view.read(self.dal)
+            write_parquet(data, self.config.dst, self.config.parquet)
         return self.config
 
 
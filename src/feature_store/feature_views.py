@@ -1,7 +1,13 @@
+import asyncio
+from typing import Any, Dict, Iterator, List, Sequence, Type
+
 import pandas as pd
 import pandera as pa
+import sqlalchemy as sa
+from sqlalchemy.sql import ColumnElement, Select
 
-from data_access_layer.dal import DataAccessLayer, SklearnDataAccessLayer
+from data_access_layer.async_dal import AsyncDataAccessLayer
+from data_access_layer.dal import DataAccessLayer, DataAccessProtocol, load_sklearn_dataset
 from datasets.datasets import BaseSchema
 
 
@@ -12,8 +18,132 @@ class BaseFeatureView(BaseSchema):
 
     @classmethod
     def read(cls, dal: DataAccessLayer, *, fast_coerce_types: bool = False, **kwargs):
+        """Read and validate the feature view.
+
+        With `fast_coerce_types` the data is read with `compact_dtypes` and not validated, see `read_compact`.
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def compact_dtypes(cls) -> Dict[str, Any]:
+        """Compact dtypes the schema columns are read with by `read_compact`.
+
+        Floats are read as float32, ints as nullable ints, downcast to the smallest size that
+        fits once read, booleans as nullable booleans and strings as categoricals.
+
+        Examples:
+            >>> IrisFeatureView.compact_dtypes()["sepal length (cm)"], IrisFeatureView.compact_dtypes()["target"]
+            ('float32', 'Int64')
+        """
+        compact_dtypes = {}
+        for name, dtype in cls.compiled_schema().dtypes.items():
+            if pd.api.types.is_bool_dtype(dtype):
+                compact_dtypes[name] = "boolean"
+            elif pd.api.types.is_float_dtype(dtype):
+                compact_dtypes[name] = "float32"
+            elif pd.api.types.is_integer_dtype(dtype):
+                compact_dtypes[name] = "Int64"
+            elif pd.api.types.is_string_dtype(dtype) and not pd.api.types.is_categorical_dtype(dtype):
+                compact_dtypes[name] = "category"
+            else:
+                compact_dtypes[name] = dtype
+        return compact_dtypes
+
+    @classmethod
+    def read_compact(cls, dal: DataAccessLayer, query: str | Select) -> pd.DataFrame:
+        """Read a query of the feature view with `compact_dtypes`, skipping the pandera validation.
+
+        The query should come from `build_query(..., cast=True)`, so the database sends values
+        of the column types and the inferred dtypes only need a cheap cast to the compact ones.
+        `read_sql_query` still infers the dtypes and casts after the read, most of the time
+        saved compared to `read` comes from skipping the validation.
+        """
+        dtypes = cls.compact_dtypes()
+        data = dal.query(query, dtype=dtypes)
+        for name in (name for name, dtype in dtypes.items() if dtype == "Int64"):
+            data[name] = pd.to_numeric(data[name], downcast="integer")
+        return data
+
+    @classmethod
+    def read_chunks(
+        cls, dal: DataAccessLayer, *, chunksize: int = 100_000, lazy: bool = False, **kwargs
+    ) -> Iterator[pd.DataFrame]:
+        """Read the feature view as a stream of chunks of at most `chunksize` rows, see `validate_chunks`.
+
+        The stream raises at the first invalid chunk, or once every chunk is read if `lazy` is set.
+        """
         raise NotImplementedError
 
+    @classmethod
+    def build_query(
+        cls,
+        table_name: str,
+        *,
+        filters: Sequence[str | ColumnElement] | None = None,
+        limit: int | None = None,
+        cast: bool = False,
+    ) -> Select:
+        """Build a SELECT of the schema columns so the database only sends the data the view keeps.
+
+        Columns are selected by their alias when they have one. If the schema has regex
+        columns every column is selected, as they cannot be resolved before reading. With
+        `cast`, the columns are cast to the SQL type of their dtype in the query, so the types
+        are converted by the database rather than coerced in pandas.
+
+        Examples:
+            >>> print(IrisFeatureView.build_query("iris", filters=["target > 0"], limit=10))  # doctest: +NORMALIZE_WHITESPACE
+            SELECT "sepal length (cm)", "sepal width (cm)", "petal length (cm)", "petal width (cm)", target
+            FROM iris
+            WHERE target > 0
+             LIMIT :param_1
+            >>> print(IrisFeatureView.build_query("iris", cast=True))  # doctest: +NORMALIZE_WHITESPACE
+            SELECT CAST("sepal length (cm)" AS FLOAT) AS "sepal length (cm)", CAST("sepal width (cm)" AS FLOAT) AS
+            "sepal width (cm)", CAST("petal length (cm)" AS FLOAT) AS "petal length (cm)", CAST("petal width (cm)" AS
+            FLOAT) AS "petal width (cm)", CAST(target AS INTEGER) AS target
+            FROM iris
+
+        Args:
+            table_name (str): The table to read from
+            filters (Sequence[str | ColumnElement] | None, optional): SQL predicates, combined with AND. Defaults to None.
+            limit (int | None, optional): Maximum number of rows. Defaults to None.
+            cast (bool, optional): Cast the columns to the SQL type of their dtype. Defaults to False.
+
+        Returns:
+            Select: The query
+        """
+        schema = cls.compiled_schema()
+        if schema.has_regex:
+            columns = [sa.text("*")]
+        else:
+            columns = [sa.column(name) for name in schema.names]
+            if cast:
+                sql_types = [_sql_type(schema.dtypes.get(name)) for name in schema.names]
+                columns = [
+                    sa.cast(column, sql_type).label(column.name) if sql_type is not None else column
+                    for column, sql_type in zip(columns, sql_types)
+                ]
+        query = sa.select(*columns).select_from(sa.table(table_name))
+        for predicate in filters or []:
+            query = query.where(sa.text(predicate) if isinstance(predicate, str) else predicate)
+        if limit is not None:
+            query = query.limit(limit)
+        return query
+
+
+def _sql_type(dtype: Any) -> sa.types.TypeEngine | None:
+    """SQL type a column of the dtype is cast to, see `BaseFeatureView.build_query`. None to not cast it."""
+    if dtype is None:
+        return None
+    if pd.api.types.is_bool_dtype(dtype):
+        return sa.Boolean()
+    if pd.api.types.is_float_dtype(dtype):
+        return sa.Float()
+    if pd.api.types.is_integer_dtype(dtype):
+        return sa.Integer()
+    if pd.api.types.is_string_dtype(dtype):
+        return sa.String()
+    return None
+
 
 class DiabetesFeatureView(BaseFeatureView):
     age: float
@@ -29,10 +159,27 @@ class DiabetesFeatureView(BaseFeatureView):
     target: float
 
     @classmethod
-    def read(cls, dal: SklearnDataAccessLayer, **kwargs):
-        dal.load_data("diabetes")
-        data = pd.read_sql_table("diabetes", dal.engine)
-        return cls(data)
+    def read(cls, dal: DataAccessProtocol, *, fast_coerce_types: bool = False, filters=None, limit=None, **kwargs):
+        load_sklearn_dataset(dal, "diabetes")
+        query = cls.build_query("diabetes", filters=filters, limit=limit, cast=fast_coerce_types)
+        if fast_coerce_types:
+            return cls.read_compact(dal, query)
+        return cls(dal.query(query))
+
+    @classmethod
+    def read_chunks(
+        cls,
+        dal: DataAccessProtocol,
+        *,
+        chunksize: int = 100_000,
+        lazy: bool = False,
+        filters=None,
+        limit=None,
+        **kwargs,
+    ) -> Iterator[pd.DataFrame]:
+        load_sklearn_dataset(dal, "diabetes")
+        chunks = dal.query_chunks(cls.build_query("diabetes", filters=filters, limit=limit), chunksize=chunksize)
+        yield from cls.validate_chunks(chunks, lazy=lazy)
 
 
 class IrisFeatureView(BaseFeatureView):
@@ -43,7 +190,55 @@ class IrisFeatureView(BaseFeatureView):
     target: int
 
     @classmethod
-    def read(cls, dal: SklearnDataAccessLayer, **kwargs):
-        dal.load_data()
-        data = pd.read_sql_table("diabetes", dal.engine)
-        return cls(data)
+    def read(cls, dal: DataAccessProtocol, *, fast_coerce_types: bool = False, filters=None, limit=None, **kwargs):
+        load_sklearn_dataset(dal, "iris")
+        query = cls.build_query("iris", filters=filters, limit=limit, cast=fast_coerce_types)
+        if fast_coerce_types:
+            return cls.read_compact(dal, query)
+        return cls(dal.query(query))
+
+    @classmethod
+    def read_chunks(
+        cls,
+        dal: DataAccessProtocol,
+        *,
+        chunksize: int = 100_000,
+        lazy: bool = False,
+        filters=None,
+        limit=None,
+        **kwargs,
+    ) -> Iterator[pd.DataFrame]:
+        load_sklearn_dataset(dal, "iris")
+        chunks = dal.query_chunks(cls.build_query("iris", filters=filters, limit=limit), chunksize=chunksize)
+        yield from cls.validate_chunks(chunks, lazy=lazy)
+
+
+async def read_feature_views(
+    dal: AsyncDataAccessLayer,
+    feature_views: Sequence[Type[BaseFeatureView]],
+    *,
+    max_concurrency: int = 4,
+    **kwargs,
+) -> List[pd.DataFrame]:
+    """Read several feature views concurrently, running at most `max_concurrency` reads at a time.
+
+    Example:
+        >>> dal = AsyncDataAccessLayer("sqlite+aiosqlite:///data.db").connect()  # doctest: +SKIP
+        >>> asyncio.run(read_feature_views(dal, [MyFeatureView, MyOtherFeatureView]))  # doctest: +SKIP
+
+    Args:
+        dal (AsyncDataAccessLayer): The async DAL to read from
+        feature_views (Sequence[Type[BaseFeatureView]]): The feature views to read
+        max_concurrency (int, optional): Maximum number of reads in flight. Defaults to 4.
+        **kwargs: Keyword arguments for every `read` call
+
+    Returns:
+        List[pd.DataFrame]: The data of each feature view, in the same order as `feature_views`
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def read(feature_view: Type[BaseFeatureView]) -> pd.DataFrame:
+        async with semaphore:
+            return await dal.run_sync(lambda sync_dal: feature_view.read(sync_dal, **kwargs))
+
+    return await asyncio.gather(*(read(feature_view) for feature_view in feature_views))
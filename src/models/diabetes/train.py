@@ -1,13 +1,14 @@
 import argparse
+from typing import List
 
 import mlflow
-import pandas as pd
 from loguru import logger
 from mlflow.models.signature import infer_signature
 from sklearn.linear_model import LinearRegression
 
 from config import BaseConfig, cli
 from config.logging import logger_wraps
+from data_access_layer.parquet import LazyParquet
 from models.mlflow_wrappers import MLFlowConfig, mlflow_bulk_log, mlflow_log_config
 from models.train import TrainResults, score_estimator_regression
 
@@ -15,6 +16,8 @@ from models.train import TrainResults, score_estimator_regression
 class Config(BaseConfig):
     model_name: str = "diabetes"
 
+    columns: List[str] | None = None  # NOTE: features the model is trained on, all of them if None
+
     src_x_train: str
     src_y_train: str
 
@@ -31,10 +34,10 @@ class Trainer:
 
     @logger_wraps()
     def run(self):
-        X_train = pd.read_parquet(self.config.src_x_train)
-        y_train = pd.read_parquet(self.config.src_y_train)["target"]
-        X_test = pd.read_parquet(self.config.src_x_test)
-        y_test = pd.read_parquet(self.config.src_y_test)["target"]
+        X_train = LazyParquet(self.config.src_x_train, columns=self.config.columns).to_pandas()
+        y_train = LazyParquet(self.config.src_y_train, columns=["target"]).to_pandas()["target"]
+        X_test = LazyParquet(self.config.src_x_test, columns=self.config.columns).to_pandas()
+        y_test = LazyParquet(self.config.src_y_test, columns=["target"]).to_pandas()["target"]
 
         self.model.fit(X_train, y_train)
 
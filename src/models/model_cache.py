@@ -0,0 +1,158 @@
+"""In-process cache of loaded MLFlow models, backed by a local disk cache of their artifacts."""
+import hashlib
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+
+import mlflow
+from loguru import logger
+
+_MODEL_STAGE_URI_REGEX = re.compile(r"^models:/(?P<name>[^/\s]+)/(?P<stage>[A-Za-z]\w*)/?$")
+_IMMUTABLE_URI_REGEX = re.compile(r"^models:/[^/\s]+/\d+/?$|^runs:/")
+
+
+class ModelCache:
+    """LRU cache of loaded models keyed by resolved model URI and flavour.
+
+    `models:/name/Stage` URIs are first resolved to the latest version in the stage, so a
+    model moved to the stage is loaded on the next call. The artifacts of immutable URIs, a
+    model version or a run, are downloaded once into `cache_dir`, which several processes
+    can share, and loaded from there. Other URIs are loaded directly.
+
+    Example:
+        >>> cache = ModelCache(maxsize=2, cache_dir="/tmp/model_cache")  # doctest: +SKIP
+        >>> model = load_mlflow_model_with_flavour("models:/diabetes/Production", "sklearn", cache=cache)  # doctest: +SKIP
+        >>> cache.stats()  # doctest: +SKIP
+        {'hits': 0, 'misses': 1, 'entries': 1, 'load_seconds': 1.2, 'hit_seconds': 0.0}
+
+    Attributes:
+        maxsize (int): Maximum number of models kept in memory.
+        cache_dir (Path | None): Directory where the artifacts are downloaded. None to not cache them.
+        hits (int): Number of models served from memory.
+        misses (int): Number of models loaded.
+        load_seconds (float): Total seconds spent loading models, including the downloads.
+        hit_seconds (float): Total seconds spent serving models from memory, including the URI resolution.
+    """
+
+    def __init__(self, maxsize: int = 4, cache_dir: str | None = None):
+        self.maxsize = maxsize
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.hits = 0
+        self.misses = 0
+        self.load_seconds = 0.0
+        self.hit_seconds = 0.0
+        self._models: OrderedDict[Tuple[str, str], Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading: Dict[Tuple[str, str], threading.Lock] = {}  # NOTE: one lock per model being loaded
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def get(self, model_uri: str, flavour: str, load: Callable[[str], Any]) -> Any:
+        """Returns the cached model, or loads it and evicts the least recently used one above `maxsize`.
+
+        Args:
+            model_uri (str): URI of the model
+            flavour (str): Flavour the model is loaded with
+            load (Callable[[str], Any]): Loads the model from a URI or a local path
+
+        Returns:
+            Any: The model
+        """
+        ts = time.perf_counter()
+        key = (self.resolve(model_uri), flavour)
+        with self._lock:
+            if key in self._models:
+                return self._hit(key, ts)
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        # NOTE: the global lock is only held for the bookkeeping, so other models load concurrently and
+        # the threads asking for the same model wait for a single load
+        with key_lock:
+            try:
+                with self._lock:
+                    if key in self._models:  # NOTE: loaded by another thread in the meantime
+                        return self._hit(key, ts)
+                model = load(self._download(key[0]))
+                with self._lock:
+                    self._models[key] = model
+                    while len(self._models) > self.maxsize:
+                        self._models.popitem(last=False)
+                    self.misses += 1
+                    elapsed = time.perf_counter() - ts
+                    self.load_seconds += elapsed
+            finally:
+                with self._lock:
+                    if self._loading.get(key) is key_lock:
+                        del self._loading[key]
+        logger.info(f"Loaded model {key[0]} ({flavour}) in {elapsed:.2f}s")
+        return model
+
+    @staticmethod
+    def resolve(model_uri: str) -> str:
+        """Resolves a `models:/name/Stage` URI to the URI of the latest version in the stage.
+
+        Examples:
+            >>> ModelCache.resolve("models:/diabetes/3")
+            'models:/diabetes/3'
+            >>> ModelCache.resolve("runs:/0a1b2c/model")
+            'runs:/0a1b2c/model'
+        """
+        match = _MODEL_STAGE_URI_REGEX.match(model_uri)
+        if match is None:
+            return model_uri
+        name, stage = match["name"], match["stage"]
+        versions = mlflow.MlflowClient().get_latest_versions(name, stages=[stage])
+        if not versions:
+            raise ValueError(f"No version of model {name} in stage {stage}")
+        return f"models:/{name}/{max(int(version.version) for version in versions)}"
+
+    def clear(self):
+        """Removes every model from memory. The downloaded artifacts are kept."""
+        with self._lock:
+            self._models.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Hit and miss counters, number of models in memory and time spent loading and serving them."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._models),
+            "load_seconds": self.load_seconds,
+            "hit_seconds": self.hit_seconds,
+        }
+
+    def _hit(self, key: Tuple[str, str], ts: float) -> Any:
+        """Returns a model in memory and counts the hit. The global lock must be held."""
+        self._models.move_to_end(key)
+        self.hits += 1
+        self.hit_seconds += time.perf_counter() - ts
+        logger.debug("Model cache hit {uri} ({flavour})", uri=key[0], flavour=key[1])
+        return self._models[key]
+
+    def _download(self, model_uri: str) -> str:
+        """Local path of the artifacts of an immutable URI, downloaded if needed, or the URI itself."""
+        if self.cache_dir is None or not _IMMUTABLE_URI_REGEX.match(model_uri):
+            return model_uri
+        server = f"{mlflow.get_tracking_uri()}\n{mlflow.get_registry_uri()}"
+        key = hashlib.sha256(f"{server}\n{model_uri}".encode()).hexdigest()
+        path = self.cache_dir / key
+        if path.exists():
+            return str(path)
+        tmp_path = self.cache_dir / f"{key}.{uuid.uuid4().hex}.tmp"
+        try:
+            # NOTE: run artifacts are downloaded into a subdirectory named as the artifact path
+            local_path = mlflow.artifacts.download_artifacts(artifact_uri=model_uri, dst_path=str(tmp_path))
+            try:
+                os.rename(local_path, path)  # NOTE: atomic, other processes never load a partial download
+            except OSError:
+                if not path.exists():
+                    raise
+                # NOTE: downloaded by another process in the meantime
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        return str(path)
@@ -1,27 +1,53 @@
 import argparse
+import functools
+import itertools
+import os
+import tempfile
+import time
 import warnings
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import List, Literal, Mapping
+from typing import Any, Dict, List, Literal, Mapping, Sequence
 
 import mlflow
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 import sklearn
 from joblib import parallel_backend
 from loguru import logger
 from mlflow.types.schema import Schema as MLFlowInputSchema
 from numpy.typing import ArrayLike
+from pandas.api.types import is_extension_array_dtype
 from pydantic import constr
 from tqdm.auto import tqdm
 
 from config import BaseConfig, cli
 from config.logging import log_time, logger_wraps
+from data_access_layer.files import ParquetChunkWriter
+from data_access_layer.parquet import LazyParquet
 from datasets import options
 from models.mlflow_wrappers import MLFlowConfig
+from models.model_cache import ModelCache
+from models.streaming import StageTiming, bottleneck, run_stages
 
 
 def load_mlflow_model_with_flavour(
-    model_uri: str, flavour: Literal["sklearn", "pyfunc"]
+    model_uri: str, flavour: Literal["sklearn", "pyfunc"], cache: ModelCache | None = None
 ) -> mlflow.pyfunc.PyFuncModel | sklearn.base.BaseEstimator:
+    """Load a model with the given flavour.
+
+    Args:
+        model_uri (str): URI of the model
+        flavour (Literal["sklearn", "pyfunc"]): Flavour to load the model with
+        cache (ModelCache | None, optional): Cache of the loaded models, see `models.model_cache`.
+            Defaults to None, to load the model on every call.
+
+    Returns:
+        mlflow.pyfunc.PyFuncModel | sklearn.base.BaseEstimator: The model
+    """
+    if cache is not None:
+        return cache.get(model_uri, flavour, functools.partial(load_mlflow_model_with_flavour, flavour=flavour))
     match flavour:
         case "sklearn":
             return mlflow.sklearn.load_model(model_uri)
@@ -36,10 +62,14 @@ class Config(BaseConfig):
     src_model: constr(regex=options.MODEL_URI_REGEX)
 
     flavour: str = "sklearn"
+    model_cache_dir: str | None = None
     parallel_backend: str = "threading"
     n_jobs: int = -1
     batch_predictions: bool = False
+    stream_predictions: bool = False
+    stream_queue_size: int = 2
     batch_size: int = 10000
+    n_workers: int = 1
     progress_bar: bool = True
 
     dst_y_hat: str
@@ -49,12 +79,83 @@ class Config(BaseConfig):
     execution_date: str = datetime.now().isoformat(timespec="seconds") + "Z"
 
 
+class PreparedModel:
+    """A model with the coercion of its inputs planned once, to predict many batches.
+
+    The dtype of each input column is read from the pyfunc input schema when the model is
+    prepared. `coerce` then only casts the columns whose dtype differs, so the batches of
+    an already coerced frame are not copied again.
+
+    Example:
+        >>> from sklearn.linear_model import LinearRegression
+        >>> prepared = PreparedModel(LinearRegression())
+        >>> X = pd.DataFrame({"a": [1.0, 2.0]})
+        >>> prepared.coerce(X) is X
+        True
+
+    Attributes:
+        model (mlflow.pyfunc.PyFuncModel | sklearn.base.BaseEstimator): The model.
+        dtypes (Mapping[str, str]): dtype of each input column, empty without an input schema.
+    """
+
+    def __init__(self, model: mlflow.pyfunc.PyFuncModel | sklearn.base.BaseEstimator):
+        self.model = model
+        self.dtypes: Mapping[str, str] = {}
+        if isinstance(model, mlflow.pyfunc.PyFuncModel):
+            self.dtypes = Predictor.get_pandas_dtypes_from_input_schema(model.metadata.get_input_schema())
+
+    def coerce(self, X: pd.DataFrame) -> pd.DataFrame:
+        """Cast the columns to the input schema dtypes and replace `pd.NA` by None.
+
+        Only the columns that change are copied, X itself is returned when none does. Columns
+        that can hold `pd.NA` end up as object columns, which are left as they are on the next
+        calls unless they hold `pd.NA` again, so coercing the batches of a coerced frame is cheap.
+
+        Args:
+            X (pd.DataFrame): Features
+
+        Returns:
+            pd.DataFrame: Features with the dtypes of the input schema
+        """
+        coerced = X
+        for name, dtype in X.dtypes.items():
+            target = self.dtypes.get(name, dtype)
+            if dtype == object and (target == object or is_extension_array_dtype(target)):
+                # NOTE: columns that can hold pd.NA are coerced to object, only look for pd.NA left in them
+                column, changed = X[name], False
+            elif dtype == target and not is_extension_array_dtype(target):
+                continue
+            else:
+                column, changed = X[name], dtype != target
+                if changed:
+                    column = column.astype(target)
+            if _has_pd_na(column):
+                column, changed = column.replace({pd.NA: None}), True
+            if changed:
+                if coerced is X:
+                    coerced = X.copy(deep=False)  # NOTE: the unchanged columns are not copied
+                coerced[name] = column
+        return coerced
+
+
 class Predictor:
     def __init__(self, config: Config):
         self.config = config
+        self.stage_timings: Dict[str, StageTiming] = {}
 
-    def run(self, model: mlflow.pyfunc.PyFuncModel | sklearn.base.BaseEstimator, X: pd.DataFrame) -> pd.DataFrame:
-        if self.config.batch_predictions:
+    def run(
+        self,
+        model: mlflow.pyfunc.PyFuncModel | sklearn.base.BaseEstimator | PreparedModel,
+        X: pd.DataFrame | LazyParquet,
+    ) -> pd.DataFrame:
+        model = self.prepare(model)
+        if isinstance(X, LazyParquet):
+            X = self.load_features(model.model, X)
+        if self.config.batch_predictions and isinstance(model.model, mlflow.pyfunc.PyFuncModel):
+            X = model.coerce(X)  # NOTE: once for all the batches
+        if self.config.batch_predictions and self.config.n_workers > 1:
+            y_hat = self.predict_in_processes(model, X, self.config.batch_size, self.config.n_workers)
+        elif self.config.batch_predictions:
             y_hat = self.predict_in_batches(model, X, self.config.batch_size)
         else:
             y_hat = self.predict(model, X)
@@ -65,10 +166,11 @@ class Predictor:
     @log_time(level="INFO", unit="seconds")
     def predict_in_batches(
         self,
-        model: mlflow.pyfunc.PyFuncModel | sklearn.base.BaseEstimator,
+        model: mlflow.pyfunc.PyFuncModel | sklearn.base.BaseEstimator | PreparedModel,
         X: pd.DataFrame,
         batch_size: int = 10000,
     ) -> pd.Series:
+        model = self.prepare(model)
         y_hat_batches: List[pd.Series] = []
         for i in tqdm(range(0, len(X), batch_size), disable=not self.config.progress_bar):
             batch_begin = i
@@ -78,17 +180,126 @@ class Predictor:
         y_hat = pd.concat(y_hat_batches, ignore_index=True)
         return y_hat
 
+    @logger_wraps()
+    @log_time(level="INFO", unit="seconds")
+    def predict_in_processes(
+        self,
+        model: mlflow.pyfunc.PyFuncModel | sklearn.base.BaseEstimator | PreparedModel,
+        X: pd.DataFrame,
+        batch_size: int = 10000,
+        n_workers: int = 2,
+    ) -> pd.Series:
+        """Predict the batches in a pool of worker processes.
+
+        The model is sent once to each worker, when it starts. The features are written once to a
+        temporary Arrow IPC file that every worker memory maps, so a task is only a row range and
+        no batch is pickled. The predictions are returned in the order of the rows.
+
+        Args:
+            model (mlflow.pyfunc.PyFuncModel | sklearn.base.BaseEstimator | PreparedModel): Model to predict with
+            X (pd.DataFrame): Features
+            batch_size (int, optional): Rows per task. Defaults to 10000.
+            n_workers (int, optional): Number of worker processes. Defaults to 2.
+
+        Returns:
+            pd.Series: Predictions, in the order of X
+        """
+        # NOTE: the workers already use every core, avoid oversubscribing them with joblib threads
+        worker_config = self.config.copy(update={"n_jobs": 1, "progress_bar": False})
+        model = self.prepare(model)
+        offsets = range(0, len(X), batch_size)
+        ts = time.perf_counter()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            features_path = os.path.join(tmp_dir, "features.arrow")
+            table = pa.Table.from_pandas(X, preserve_index=False)
+            with pa.OSFile(features_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            with ProcessPoolExecutor(
+                n_workers, initializer=_init_worker, initargs=(worker_config, model, features_path)
+            ) as executor:
+                results = executor.map(_predict_rows, offsets, itertools.repeat(batch_size))
+                y_hat_batches = list(tqdm(results, total=len(offsets), disable=not self.config.progress_bar))
+        elapsed = time.perf_counter() - ts
+        logger.info(f"Predicted {len(X)} rows with {n_workers} workers: {len(X) / elapsed:,.0f} rows/s")
+        if not y_hat_batches:
+            return pd.Series([], name="y_hat", dtype=float)
+        return pd.Series(np.concatenate(y_hat_batches), name="y_hat")
+
+    @logger_wraps()
+    @log_time(level="INFO", unit="seconds")
+    def predict_to_parquet(
+        self,
+        model: mlflow.pyfunc.PyFuncModel | sklearn.base.BaseEstimator | PreparedModel,
+        features: LazyParquet,
+        dst: str,
+        batch_size: int = 10000,
+        queue_size: int = 2,
+    ) -> int:
+        """Stream the predictions of a parquet source into a parquet file.
+
+        The feature columns are read one row group at a time, in record batches of `batch_size`
+        rows, and the predictions of each batch are appended to `dst` with a `ParquetWriter`.
+        The memory is therefore bounded by the largest row group of the source plus a few
+        batches, not by its size. Sources written with the pyarrow defaults can have row groups
+        of up to 64Mi rows, write them with a bounded `ParquetOptions.row_group_size`. The file
+        has the same `y_hat` frame as the one written from `run`, including the index of the
+        features, unless it is a RangeIndex other than the default one, which is not stored
+        in the rows of the source.
+
+        Reading, predicting and writing overlap, see `run_stages`. The time spent by each stage
+        is logged and kept in `stage_timings`, to find the bottleneck.
+
+        Args:
+            model (mlflow.pyfunc.PyFuncModel | sklearn.base.BaseEstimator | PreparedModel): Model to predict with
+            features (LazyParquet): Features source
+            dst (str): Path of the predictions parquet file
+            batch_size (int, optional): Rows per batch. Defaults to 10000.
+            queue_size (int, optional): Batches buffered between the stages, 0 to run them one
+                after the other. Defaults to 2.
+
+        Returns:
+            int: Number of predicted rows
+        """
+        model = self.prepare(model)
+        if (columns := self.get_model_input_columns(model.model)) is not None:
+            features = features.select(columns)
+        logger.info(f"Streaming data from {features}")
+        batches = tqdm(features.iter_batches(batch_size, prefetch=False), disable=not self.config.progress_bar)
+
+        def predict_batch(X_batch: pd.DataFrame) -> pa.Table:
+            # NOTE: the batches of a source without index have their own RangeIndex, which is not written,
+            # as `to_parquet` only stores the range of a RangeIndex
+            preserve_index = not isinstance(X_batch.index, pd.RangeIndex)
+            return pa.Table.from_pandas(self.predict(model, X_batch).to_frame(), preserve_index=preserve_index)
+
+        # NOTE: without rows, the file is still written with the y_hat column
+        with ParquetChunkWriter(dst, empty_schema=pa.schema([("y_hat", pa.float64())])) as writer:
+            self.stage_timings = run_stages(
+                (X_batch for X_batch in batches if not X_batch.empty), predict_batch, writer.write, queue_size
+            )
+        logger.info(
+            "Stage timings: "
+            + ", ".join(
+                f"{stage} {t.busy:.2f}s busy {t.waiting:.2f}s waiting" for stage, t in self.stage_timings.items()
+            )
+            + f". Bottleneck: {bottleneck(self.stage_timings)}"
+        )
+        return writer.n_rows
+
     @logger_wraps(level="DEBUG")
     @log_time(level="DEBUG", unit="seconds")
-    def predict(self, model: mlflow.pyfunc.PyFuncModel | sklearn.base.BaseEstimator, X: pd.DataFrame) -> pd.Series:
+    def predict(
+        self, model: mlflow.pyfunc.PyFuncModel | sklearn.base.BaseEstimator | PreparedModel, X: pd.DataFrame
+    ) -> pd.Series:
         y_hat: pd.Series
-        match model:
+        model = self.prepare(model)
+        match model.model:
             case mlflow.pyfunc.PyFuncModel():
                 y_hat = self.predict_mlflow_pyfunc_model(model, X)
             case sklearn.base.BaseEstimator():
-                y_hat = self.predict_sklearn_model(model, X)
+                y_hat = self.predict_sklearn_model(model.model, X)
             case _:
-                raise ValueError(f"Unknown model type {type(model)}")
+                raise ValueError(f"Unknown model type {type(model.model)}")
         y_hat = pd.Series(y_hat, name="y_hat", index=X.index)
         return y_hat
 
@@ -98,15 +309,42 @@ class Predictor:
             return model.predict(X)
 
     @logger_wraps(level="DEBUG")
-    def predict_mlflow_pyfunc_model(self, model: mlflow.pyfunc.PyFuncModel, X: pd.DataFrame) -> ArrayLike:
-        input_schema = model.metadata.get_input_schema()
-        dtypes = self.get_pandas_dtypes_from_input_schema(input_schema)
-        X = X.astype(dtypes).replace({pd.NA: None})
+    def predict_mlflow_pyfunc_model(
+        self, model: mlflow.pyfunc.PyFuncModel | PreparedModel, X: pd.DataFrame
+    ) -> ArrayLike:
+        model = self.prepare(model)
+        X = model.coerce(X)
         with warnings.catch_warnings():
             warnings.simplefilter("ignore", category=pd.errors.PerformanceWarning)
-            y_hat = model.predict(X)
+            y_hat = model.model.predict(X)
         return y_hat
 
+    @staticmethod
+    def prepare(model: mlflow.pyfunc.PyFuncModel | sklearn.base.BaseEstimator | PreparedModel) -> PreparedModel:
+        """Plans the coercion of the model inputs, once for all the batches predicted with it."""
+        return model if isinstance(model, PreparedModel) else PreparedModel(model)
+
+    def load_features(
+        self, model: mlflow.pyfunc.PyFuncModel | sklearn.base.BaseEstimator, features: LazyParquet
+    ) -> pd.DataFrame:
+        """Read only the feature columns the model consumes."""
+        if (columns := self.get_model_input_columns(model)) is not None:
+            features = features.select(columns)
+        logger.info(f"Reading data from {features}")
+        return features.to_pandas()
+
+    @staticmethod
+    def get_model_input_columns(model: mlflow.pyfunc.PyFuncModel | sklearn.base.BaseEstimator) -> Sequence[str] | None:
+        """Names of the columns the model consumes, or None if the model does not record them."""
+        match model:
+            case mlflow.pyfunc.PyFuncModel():
+                input_schema = model.metadata.get_input_schema()
+                if input_schema is not None and input_schema.has_input_names():
+                    return input_schema.input_names()
+            case sklearn.base.BaseEstimator() if hasattr(model, "feature_names_in_"):
+                return list(model.feature_names_in_)
+        return None
+
     @staticmethod
     def get_pandas_dtypes_from_input_schema(input_schema: MLFlowInputSchema) -> Mapping[str, str]:
         if input_schema is None:
@@ -115,6 +353,31 @@ class Predictor:
         return {name: type_ for name, type_ in zip(input_schema.input_names(), input_schema.pandas_types())}
 
 
+def _has_pd_na(column: pd.Series) -> bool:
+    """Whether the column holds `pd.NA`. Only its missing values are looked at."""
+    if column.dtype != object:
+        # NOTE: e.g. Int64 or string, categoricals use NaN
+        return is_extension_array_dtype(column.dtype) and column.dtype.na_value is pd.NA and column.hasnans
+    values = column.to_numpy()
+    missing = pd.isna(values)
+    return bool(missing.any()) and any(value is pd.NA for value in values[missing])
+
+
+# NOTE: state of each `Predictor.predict_in_processes` worker process, set once when it starts
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(config: Config, model: PreparedModel, features_path: str):
+    _worker["predictor"] = Predictor(config)
+    _worker["model"] = model
+    _worker["features"] = pa.ipc.open_file(pa.memory_map(features_path)).read_all()  # NOTE: zero copy
+
+
+def _predict_rows(offset: int, length: int) -> np.ndarray:
+    X = _worker["features"].slice(offset, length).to_pandas()
+    return np.asarray(_worker["predictor"].predict(_worker["model"], X))
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     cli.add_model(parser, Config)
@@ -125,11 +388,15 @@ if __name__ == "__main__":
 
     predictor = Predictor(config)
 
-    logger.info(f"Reading data from {config.src_features}")
-    features = pd.read_parquet(config.src_features)
     logger.info(f"Loading model from {config.src_model}")
-    model = load_mlflow_model_with_flavour(model_uri=config.src_model, flavour=config.flavour)
-
-    df_y = predictor.run(model, features)
-    logger.info(f"Writing y_hat to {config.dst_y_hat}")
-    df_y.y_hat.to_frame().to_parquet(config.dst_y_hat)
+    cache = ModelCache(cache_dir=config.model_cache_dir) if config.model_cache_dir is not None else None
+    model = load_mlflow_model_with_flavour(model_uri=config.src_model, flavour=config.flavour, cache=cache)
+    if config.stream_predictions:
+        logger.info(f"Streaming y_hat to {config.dst_y_hat}")
+        predictor.predict_to_parquet(
+            model, LazyParquet(config.src_features), config.dst_y_hat, config.batch_size, config.stream_queue_size
+        )
+    else:
+        df_y = predictor.run(model, LazyParquet(config.src_features))
+        logger.info(f"Writing y_hat to {config.dst_y_hat}")
+        df_y.y_hat.to_frame().to_parquet(config.dst_y_hat)
@@ -1,15 +1,18 @@
 """Example module to do preprocessing before training."""
 import argparse
+from typing import List
 
-import pandas as pd
 from sklearn.model_selection import train_test_split
 
 from config import BaseConfig, cli
 from config.logging import logger_wraps
+from data_access_layer.parquet import Filters, LazyParquet
 
 
 class Config(BaseConfig):
     src_features: str
+    columns: List[str] | None = None  # NOTE: features to keep, all of them if None
+    filters: Filters | None = None  # NOTE: rows to keep, in the pyarrow DNF filters format
 
     dst_x_train: str
     dst_y_train: str
@@ -24,7 +27,10 @@ class Preprocess:
 
     @logger_wraps(outputs=True)
     def run(self):
-        data = pd.read_parquet(self.config.src_features)
+        features = LazyParquet(self.config.src_features, filters=self.config.filters)
+        if self.config.columns is not None:
+            features = features.select([*self.config.columns, "target"])
+        data = features.to_pandas()
         X = data.drop(columns=["target"])
         y = data["target"]
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=0)
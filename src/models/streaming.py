@@ -0,0 +1,112 @@
+"""Overlapped read, predict and write stages of the streaming predictions."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+from typing import Any, Callable, Dict, Iterable, TypeVar
+
+from data_access_layer import handoff
+from data_access_layer.handoff import END_OF_DATA, StageTiming
+
+In = TypeVar("In")
+Out = TypeVar("Out")
+
+STAGES = ("read", "predict", "write")
+
+
+def bottleneck(timings: Dict[str, StageTiming]) -> str:
+    """Name of the stage with the most busy time.
+
+    Example:
+        >>> bottleneck({"read": StageTiming(1.0, 0.5), "predict": StageTiming(2.0), "write": StageTiming(0.2, 1.8)})
+        'predict'
+    """
+    return max(timings, key=lambda stage: timings[stage].busy)
+
+
+def run_stages(
+    read: Iterable[In], predict: Callable[[In], Out], write: Callable[[Out], Any], queue_size: int = 2
+) -> Dict[str, StageTiming]:
+    """Run the read, predict and write stages of a stream of batches, overlapping them.
+
+    The batches are read in a thread and written in another one, connected to the predict
+    stage, in the caller thread, by queues of `queue_size` batches. A full queue blocks the
+    previous stage, so at most about `2 * queue_size + 3` batches are in memory. Reading,
+    decoding and writing parquet release the GIL, so their latency is hidden behind the
+    predictions. The batches are written in the order they are read, and an error in any
+    stage stops the other ones and is raised.
+
+    Example:
+        >>> written = []
+        >>> timings = run_stages(range(5), lambda x: x * 10, written.append)
+        >>> written
+        [0, 10, 20, 30, 40]
+        >>> sorted(timings)
+        ['predict', 'read', 'write']
+
+    Args:
+        read (Iterable[In]): Batches to predict
+        predict (Callable[[In], Out]): Predictions of a batch
+        write (Callable[[Out], Any]): Writes the predictions of a batch
+        queue_size (int, optional): Batches buffered between the stages. 0 runs them one after
+            the other in the caller thread. Defaults to 2.
+
+    Returns:
+        Dict[str, StageTiming]: Timing of each stage
+    """
+    timings = {stage: StageTiming() for stage in STAGES}
+    if queue_size == 0:
+        for batch in _timed(read, timings["read"]):
+            ts = time.perf_counter()
+            predictions = predict(batch)
+            timings["predict"].busy += time.perf_counter() - ts
+            ts = time.perf_counter()
+            write(predictions)
+            timings["write"].busy += time.perf_counter() - ts
+        return timings
+
+    read_queue: Queue = Queue(maxsize=queue_size)
+    write_queue: Queue = Queue(maxsize=queue_size)
+    stopped = threading.Event()
+
+    def reader():
+        for batch in _timed(read, timings["read"]):
+            if not handoff.put(read_queue, batch, stopped.is_set, timings["read"]):
+                return
+        handoff.put(read_queue, END_OF_DATA, stopped.is_set, timings["read"])
+
+    def writer():
+        while (predictions := handoff.get(write_queue, stopped.is_set, timings["write"])) is not END_OF_DATA:
+            ts = time.perf_counter()
+            write(predictions)
+            timings["write"].busy += time.perf_counter() - ts
+
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="predict-stage") as executor:
+        read_future, write_future = executor.submit(reader), executor.submit(writer)
+        try:
+            while (batch := handoff.get(read_queue, read_future.done, timings["predict"])) is not END_OF_DATA:
+                ts = time.perf_counter()
+                predictions = predict(batch)
+                timings["predict"].busy += time.perf_counter() - ts
+                if not handoff.put(write_queue, predictions, write_future.done, timings["predict"]):
+                    break  # NOTE: the writer failed
+            else:
+                handoff.put(write_queue, END_OF_DATA, write_future.done, timings["predict"])
+        finally:
+            stopped.set()  # NOTE: unblocks the other stages, once the writer drained its queue
+    read_future.result()  # NOTE: raises the stage error if any
+    write_future.result()
+    return timings
+
+
+def _timed(batches: Iterable[In], timing: StageTiming) -> Iterable[In]:
+    iterator = iter(batches)
+    while True:
+        ts = time.perf_counter()
+        try:
+            batch = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            timing.busy += time.perf_counter() - ts
+        yield batch
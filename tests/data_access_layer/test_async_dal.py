@@ -0,0 +1,53 @@
+import asyncio
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from data_access_layer import AsyncDataAccessLayer, DataAccessLayer
+from data_access_layer.dal import DataAccessProtocol
+
+pytest.importorskip("aiosqlite")
+
+
+@pytest.fixture
+def data() -> pd.DataFrame:
+    return pd.DataFrame({"id": [1, 2, 3], "name": ["Alice", "Bob", "Charlie"], "age": [20, 30, 40]})
+
+
+@pytest.fixture
+def db_path(tmp_path: Path, data: pd.DataFrame) -> Path:
+    db_path = tmp_path / "data.db"
+    DataAccessLayer(f"sqlite:///{db_path}").connect().bulk_load(data, "testing_data")
+    return db_path
+
+
+@pytest.fixture
+def dal(db_path: Path) -> AsyncDataAccessLayer:  # type: ignore
+    dal = AsyncDataAccessLayer(f"sqlite+aiosqlite:///{db_path}").connect()
+    yield dal
+    asyncio.run(dal.dispose())
+
+
+def test_query(dal: AsyncDataAccessLayer, data: pd.DataFrame):
+    result = asyncio.run(dal.query("SELECT * FROM testing_data ORDER BY id"))
+    assert_frame_equal(result, data)
+
+
+def test_query_concurrent(dal: AsyncDataAccessLayer, data: pd.DataFrame):
+    async def run():
+        return await asyncio.gather(*(dal.query(f"SELECT * FROM testing_data WHERE id = {i}") for i in data.id))
+
+    results = asyncio.run(run())
+    assert_frame_equal(pd.concat(results, ignore_index=True), data)
+
+
+def test_run_sync(dal: AsyncDataAccessLayer, data: pd.DataFrame):
+    def load_and_query(sync_dal: DataAccessProtocol) -> pd.DataFrame:
+        sync_dal.bulk_load(data, "testing_data_copy")
+        return sync_dal.query_arrow("SELECT * FROM testing_data_copy ORDER BY id").to_pandas()
+
+    result = asyncio.run(dal.run_sync(load_and_query))
+    assert_frame_equal(result, data)
+    assert_frame_equal(asyncio.run(dal.query("SELECT * FROM testing_data_copy ORDER BY id")), data)
@@ -0,0 +1,85 @@
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+from sqlalchemy import column, select, table
+
+from data_access_layer import InMemoryDataAccessLayer, QueryCache
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> QueryCache:
+    return QueryCache(str(tmp_path / "cache"), ttl_seconds=60)
+
+
+@pytest.fixture
+def dal(cache: QueryCache) -> InMemoryDataAccessLayer:
+    dal = InMemoryDataAccessLayer(cache=cache).connect()
+    pd.DataFrame({"id": [1, 2, 3], "age": [20, 30, 40]}).to_sql("people", dal.engine, index=False)
+    return dal
+
+
+def test_query_cache_hits(dal: InMemoryDataAccessLayer, cache: QueryCache):
+    expected = dal.query("SELECT * FROM people")
+    with dal.engine.begin() as con:
+        con.execute("DELETE FROM people")
+
+    assert_frame_equal(dal.query("SELECT *   FROM people;"), expected)  # NOTE: served from the cache
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["entries"] == 1
+
+    dal.invalidate_cache("SELECT * FROM people")
+    assert dal.query("SELECT * FROM people").empty
+    assert cache.stats()["misses"] == 2
+
+
+def test_query_cache_dtype(dal: InMemoryDataAccessLayer, cache: QueryCache):
+    assert dal.query("SELECT * FROM people", dtype={"age": "float32"}).age.dtype == "float32"
+    assert dal.query("SELECT * FROM people").age.dtype == "int64"  # NOTE: served from the cache
+    assert cache.stats()["hits"] == 1
+
+
+def test_query_cache_selectable_params(dal: InMemoryDataAccessLayer, cache: QueryCache):
+    people = table("people", column("id"), column("age"))
+    assert dal.query(select(people).where(people.c.age > 25)).id.tolist() == [2, 3]
+    assert dal.query(select(people).where(people.c.age > 35)).id.tolist() == [3]
+    assert dal.query(select(people).where(people.c.age > 25)).id.tolist() == [2, 3]
+    assert cache.hits == 1
+    assert cache.misses == 2
+
+
+def test_query_cache_ttl(cache: QueryCache):
+    cache.put("key", pd.DataFrame({"a": [1]}))
+    assert cache.get("key") is not None
+
+    path = cache.cache_dir / "key.parquet"
+    expired = time.time() - 120
+    os.utime(path, (expired, expired))
+    assert cache.get("key") is None
+    assert not path.exists()
+
+
+def test_query_cache_lru_eviction(cache: QueryCache):
+    data = pd.DataFrame({"a": range(100)})
+    cache.put("first", data)
+    cache.put("second", data)
+    cache.max_size_bytes = cache.stats()["size_bytes"]
+    cache.get("first")  # NOTE: second is now the least recently used
+    os.utime(cache.cache_dir / "second.parquet", (time.time() - 10, time.time()))
+
+    cache.put("third", data)
+    assert cache.stats()["entries"] == 2
+    assert cache.get("second") is None
+    assert cache.get("first") is not None
+    assert cache.get("third") is not None
+
+
+def test_query_cache_invalidate_all(cache: QueryCache):
+    cache.put("first", pd.DataFrame({"a": [1]}))
+    cache.put("second", pd.DataFrame({"a": [2]}))
+    cache.invalidate()
+    assert cache.stats()["entries"] == 0
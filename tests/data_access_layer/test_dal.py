@@ -1,11 +1,14 @@
 from abc import ABCMeta, abstractmethod
 
 import pandas as pd
+import pyarrow as pa
 import pytest
 from pandas.testing import assert_frame_equal
+from sqlalchemy import create_engine
 from testcontainers.postgres import PostgresContainer
 
 from data_access_layer import DataAccessLayer, InMemoryDataAccessLayer
+from data_access_layer import dal as dal_module
 
 
 @pytest.fixture(scope="session")
@@ -43,6 +46,66 @@ class BaseDALTester(metaclass=ABCMeta):
 
         assert_frame_equal(result, expected, check_like=True)  # NOTE: ignore column order
 
+    def test_query_chunks(self, table_name: str, dal: DataAccessLayer, mock_data: pd.DataFrame):
+        chunks = list(dal.query_chunks(f"SELECT * FROM {table_name} ORDER BY id", chunksize=2))
+
+        assert [len(c) for c in chunks] == [2, 1]
+        result = pd.concat(chunks, ignore_index=True)
+        assert_frame_equal(result, mock_data, check_like=True)
+
+    def test_query_dtype(self, table_name: str, dal: DataAccessLayer, mock_data: pd.DataFrame):
+        result = dal.query(f"SELECT * FROM {table_name} ORDER BY id", dtype={"age": "float32", "name": "category"})
+
+        assert result.dtypes.to_dict() == {"id": "int64", "name": "category", "age": "float32"}
+        assert_frame_equal(result, mock_data.astype({"age": "float32", "name": "category"}), check_like=True)
+
+    def test_query_arrow(self, table_name: str, dal: DataAccessLayer, mock_data: pd.DataFrame):
+        result = dal.query_arrow(f"SELECT * FROM {table_name} ORDER BY id")
+
+        assert isinstance(result, pa.Table)
+        assert_frame_equal(result.to_pandas(), mock_data, check_like=True)
+
+    def test_query_arrow_empty(self, table_name: str, dal: DataAccessLayer, mock_data: pd.DataFrame):
+        result = dal.query_arrow(f"SELECT * FROM {table_name} WHERE id < 0")
+
+        assert result.num_rows == 0
+        assert result.column_names == list(mock_data.columns)
+
+    def test_bulk_load(self, dal: DataAccessLayer):
+        data = pd.DataFrame(
+            {
+                "id": [1, 2, 3, 4],
+                "name": ["Alice", None, "Charlie", "Dave"],
+                "score": [0.5, 1.5, None, 3.5],
+            }
+        )
+        assert dal.bulk_load(data, "bulk_data", batch_size=3)
+        assert_frame_equal(dal.query("SELECT * FROM bulk_data ORDER BY id"), data)
+
+        assert not dal.bulk_load(data, "bulk_data")  # NOTE: same content, skipped
+        assert dal.bulk_load(data, "bulk_data", force=True)
+
+        data_updated = data.assign(score=data.score * 2)
+        assert dal.bulk_load(data_updated, "bulk_data")
+        assert_frame_equal(dal.query("SELECT * FROM bulk_data ORDER BY id"), data_updated)
+
+        with dal.engine.begin() as con:
+            con.execute("DROP TABLE bulk_data;")
+        assert dal.bulk_load(data, "bulk_data")  # NOTE: table was dropped, loaded again
+
+        with dal.engine.begin() as con:
+            con.execute("DELETE FROM bulk_data;")
+        assert dal.bulk_load(data, "bulk_data")  # NOTE: table was truncated, loaded again
+        assert_frame_equal(dal.query("SELECT * FROM bulk_data ORDER BY id"), data)
+
+    def test_bulk_load_timestamps(self, dal: DataAccessLayer):
+        data = pd.DataFrame({"id": [1, 2], "created": pd.to_datetime(["2023-01-01 10:00", None])})
+        assert dal.bulk_load(data, "bulk_timestamps")
+        result = dal.query("SELECT * FROM bulk_timestamps ORDER BY id")
+        data.to_sql("to_sql_timestamps", dal.engine, index=False)
+        assert_frame_equal(result, dal.query("SELECT * FROM to_sql_timestamps ORDER BY id"))
+        assert_frame_equal(result.assign(created=pd.to_datetime(result.created)), data)
+
 
 class TestDAL(BaseDALTester):
     @pytest.fixture(scope="class")
@@ -60,3 +123,21 @@ class TestDALInMemory(BaseDALTester):
         dal = InMemoryDataAccessLayer(db_url).connect()
         yield dal
         dal.metadata.drop_all()
+
+
+def test_bulk_load_named_paramstyle():
+    dal = InMemoryDataAccessLayer().connect()
+    dal.engine = create_engine("sqlite://", paramstyle="named")
+    data = pd.DataFrame({"id": [1, 2, 3], "name": ["Alice", None, "Charlie"]})
+
+    assert dal.bulk_load(data, "bulk_named", batch_size=2)
+    assert_frame_equal(dal.query("SELECT * FROM bulk_named ORDER BY id"), data)
+
+
+def test_rows_to_arrow_null_sample_fallback():
+    rows = [(1, None), (2, None), (3, 1.5)]
+    result = dal_module._rows_to_arrow(rows, ["id", "value"], sample_size=2)
+
+    assert result.column_names == ["id", "value"]
+    assert result.schema.field("value").type == pa.float64()
+    assert result.column("value").to_pylist() == [None, None, 1.5]
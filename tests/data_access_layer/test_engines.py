@@ -0,0 +1,67 @@
+import os
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from sqlalchemy.pool import NullPool
+
+from data_access_layer import DataAccessLayer, InMemoryDataAccessLayer, PoolConfig, dispose_engines, engines
+
+
+@pytest.fixture
+def db_url(tmp_path: Path) -> str:  # type: ignore
+    yield f"sqlite:///{tmp_path / 'data.db'}"
+    dispose_engines()
+
+
+def test_get_engine_is_shared(db_url: str):
+    engine = engines.get_engine(db_url)
+    assert engines.get_engine(db_url) is engine
+    assert engines.get_engine(db_url, PoolConfig(pool_pre_ping=False)) is not engine
+    assert isinstance(engine.pool, NullPool)  # NOTE: queue pool sizing settings are not sent to sqlite
+
+
+def test_get_engine_with_dict_kwargs(db_url: str):
+    engine = engines.get_engine(
+        db_url, connect_args={"timeout": 10}, execution_options={"isolation_level": "SERIALIZABLE"}
+    )
+    assert (
+        engines.get_engine(db_url, execution_options={"isolation_level": "SERIALIZABLE"}, connect_args={"timeout": 10})
+        is engine
+    )
+    assert engines.get_engine(db_url, connect_args={"timeout": 20}) is not engine
+
+
+def test_dal_share_engine(db_url: str):
+    dal = DataAccessLayer(db_url).connect()
+    assert DataAccessLayer(db_url).connect().engine is dal.engine
+    assert InMemoryDataAccessLayer().connect().engine is not InMemoryDataAccessLayer().connect().engine
+
+
+def test_pool_config_from_env(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "20")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "false")
+    pool_config = PoolConfig()
+    assert pool_config.pool_size == 20
+    assert not pool_config.pool_pre_ping
+
+
+def test_get_engine_pool_kwargs():
+    pool_kwargs = engines.get_pool_kwargs("postgresql://user@localhost/db", PoolConfig(pool_size=2, pool_recycle=60))
+    assert pool_kwargs["pool_size"] == 2
+    assert pool_kwargs["pool_recycle"] == 60
+    assert "pool_size" not in engines.get_pool_kwargs("sqlite://", PoolConfig())
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="fork is not available")
+def test_engines_after_fork(db_url: str):
+    dal = DataAccessLayer(db_url).connect()
+    pd.DataFrame({"a": [1, 2, 3]}).to_sql("data", dal.engine, index=False)
+
+    pid = os.fork()
+    if pid == 0:  # NOTE: child process
+        exit_code = 0 if dal.query("SELECT * FROM data")["a"].sum() == 6 else 1
+        os._exit(exit_code)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert dal.query("SELECT * FROM data")["a"].sum() == 6
@@ -1,5 +1,11 @@
 from pathlib import Path
 
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from pandas.testing import assert_frame_equal
+
 from data_access_layer import files
 
 
@@ -19,3 +25,128 @@ def test_create_dir_if_not_exists(tmp_path: Path):
     assert tmp_path.exists()
     files.create_dir_if_not_exists(str(path))
     assert tmp_path.exists()
+
+
+def test_write_parquet_chunks(tmp_path: Path):
+    path = str(tmp_path / "data.parquet")
+    data = pd.DataFrame({"a": [1, 2, 3, 4, 5], "b": [0.1, 0.2, 0.3, 0.4, 0.5]})
+    chunks = (data.iloc[i : i + 2] for i in range(0, len(data), 2))  # noqa: E203
+
+    n_rows = files.write_parquet_chunks(chunks, path)
+
+    assert n_rows == len(data)
+    assert_frame_equal(pd.read_parquet(path), data)
+
+
+def test_write_parquet_chunks_null_columns(tmp_path: Path):
+    path = str(tmp_path / "data.parquet")
+    chunks = [
+        pd.DataFrame({"a": [1, 2], "s": [None, None], "t": [None, None]}),
+        pd.DataFrame({"a": [3], "s": ["x"], "t": [None]}),
+        pd.DataFrame({"a": [4], "s": [None], "t": [1.5]}),
+    ]
+
+    assert files.write_parquet_chunks(chunks, path, files.ParquetOptions(row_group_size=1)) == 4
+
+    assert pq.read_schema(path).types[1:] == [pa.string(), pa.float64()]
+    assert pq.ParquetFile(path).metadata.num_row_groups == 4
+    assert [p.name for p in tmp_path.iterdir()] == ["data.parquet"]
+    result = pd.read_parquet(path)
+    assert result.s.tolist() == [None, None, "x", None]
+    assert result.t.tolist()[3] == 1.5
+
+
+def test_write_parquet_partitioned_chunks_null_columns(tmp_path: Path):
+    path = str(tmp_path / "dataset")
+    chunks = [
+        pd.DataFrame({"s": [None, None], "country": ["US", "FR"]}),
+        pd.DataFrame({"s": ["x"], "country": ["US"]}),
+    ]
+
+    assert files.write_parquet_chunks(chunks, path, files.ParquetOptions(partition_cols=["country"])) == 3
+
+    assert sorted(p.name for p in Path(path).iterdir()) == ["country=FR", "country=US"]
+    result = pd.read_parquet(path)
+    assert result.s.dtype == object
+    assert sorted(result.s.fillna("")) == ["", "", "x"]
+
+
+def test_write_parquet_row_groups(tmp_path: Path):
+    path = str(tmp_path / "data.parquet")
+    data = pd.DataFrame({"a": range(10), "b": ["x", "y"] * 5})
+    options = files.ParquetOptions(row_group_size=4, compression="zstd", use_dictionary=False)
+
+    assert files.write_parquet(data, path, options) == len(data)
+
+    metadata = pq.ParquetFile(path).metadata
+    assert [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)] == [4, 4, 2]
+    assert metadata.row_group(0).column(0).compression == "ZSTD"
+    assert_frame_equal(pd.read_parquet(path), data)
+
+
+def test_write_parquet_partitioned(tmp_path: Path):
+    path = str(tmp_path / "dataset")
+    data = pd.DataFrame({"a": range(6), "country": ["US", "FR", "ES"] * 2})
+    options = files.ParquetOptions(partition_cols=["country"])
+    chunks = (data.iloc[i : i + 2] for i in range(0, len(data), 2))  # noqa: E203
+
+    assert files.write_parquet_chunks(chunks, path, options) == len(data)
+    assert sorted(p.name for p in Path(path).iterdir()) == ["country=ES", "country=FR", "country=US"]
+    result = pd.read_parquet(path, filters=[("country", "=", "FR")])
+    assert result.a.tolist() == [1, 4]
+
+    files.write_parquet(data.iloc[:1], path, options, append=True)
+    assert len(pd.read_parquet(path)) == len(data) + 1
+
+    files.write_parquet(data.iloc[:1], path, options)  # NOTE: replaces the whole dataset
+    assert [p.name for p in Path(path).iterdir()] == ["country=US"]
+    assert pd.read_parquet(path).a.tolist() == [0]
+
+
+def test_write_parquet_partitioned_chunks_error(tmp_path: Path):
+    path, options = str(tmp_path / "dataset"), files.ParquetOptions(partition_cols=["country"])
+    files.write_parquet(pd.DataFrame({"a": [0], "country": ["US"]}), path, options)
+
+    def chunks():
+        yield pd.DataFrame({"a": [1], "country": ["US"]})
+        raise KeyError("broken chunk")
+
+    with pytest.raises(KeyError, match="broken chunk"):
+        files.write_parquet_chunks(chunks(), path, options)
+    assert [p.name for p in Path(path).iterdir()] == ["country=US"]  # NOTE: no temporary dataset left
+    assert pd.read_parquet(path).a.tolist() == [0]
+
+
+def test_write_parquet_chunks_error(tmp_path: Path):
+    path = str(tmp_path / "data.parquet")
+    files.write_parquet(pd.DataFrame({"a": [0]}), path)
+
+    def chunks():
+        yield pd.DataFrame({"a": [1]})
+        raise KeyError("broken chunk")
+
+    with pytest.raises(KeyError, match="broken chunk"):
+        files.write_parquet_chunks(chunks(), path)
+    assert [p.name for p in tmp_path.iterdir()] == ["data.parquet"]  # NOTE: no temporary file left
+    assert pd.read_parquet(path).a.tolist() == [0]
+
+
+def test_parquet_chunk_writer(tmp_path: Path):
+    path = str(tmp_path / "data.parquet")
+    with files.ParquetChunkWriter(path) as writer:
+        writer.write(pd.DataFrame({"a": [1, 2]}))
+        writer.write(pd.DataFrame({"a": [3.0]}))  # NOTE: cast to the schema of the first chunk
+        assert list(tmp_path.iterdir())[0].name.startswith("_data.parquet.")
+
+    assert writer.n_rows == 3
+    assert_frame_equal(pd.read_parquet(path), pd.DataFrame({"a": [1, 2, 3]}))
+
+
+def test_parquet_chunk_writer_empty(tmp_path: Path):
+    with files.ParquetChunkWriter(str(tmp_path / "none.parquet")):
+        pass
+    with files.ParquetChunkWriter(str(tmp_path / "empty.parquet"), empty_schema=pa.schema([("y", pa.float64())])):
+        pass
+
+    assert [p.name for p in tmp_path.iterdir()] == ["empty.parquet"]
+    assert pd.read_parquet(tmp_path / "empty.parquet").columns.tolist() == ["y"]
@@ -0,0 +1,26 @@
+import threading
+from queue import Queue
+
+from data_access_layer import handoff
+
+
+def test_put_stops_with_consumer():
+    queue: Queue = Queue(maxsize=1)
+    stopped = threading.Event()
+    timing = handoff.StageTiming()
+    threading.Timer(0.2, stopped.set).start()
+
+    assert handoff.put(queue, 1, stopped.is_set, timing)
+    assert not handoff.put(queue, 2, stopped.is_set, timing)  # NOTE: blocked on the full queue until stopped
+    assert timing.waiting >= 0.2
+    assert timing.busy == 0
+
+
+def test_get_end_of_data_once_producer_stopped_and_drained():
+    queue: Queue = Queue()
+    queue.put(1)
+    queue.put(handoff.END_OF_DATA)
+
+    assert handoff.get(queue, stopped=lambda: False) == 1
+    assert handoff.get(queue, stopped=lambda: False) is handoff.END_OF_DATA
+    assert handoff.get(queue, stopped=lambda: True) is handoff.END_OF_DATA  # NOTE: the producer stopped early
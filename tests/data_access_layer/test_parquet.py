@@ -0,0 +1,99 @@
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+from pandas.testing import assert_frame_equal
+
+from data_access_layer import parquet
+from data_access_layer.files import ParquetOptions, write_parquet
+from data_access_layer.parquet import LazyParquet, read_parquet
+
+
+@pytest.fixture
+def data() -> pd.DataFrame:
+    return pd.DataFrame({"a": range(6), "b": [0.5] * 6, "country": ["US", "FR", "ES"] * 2})
+
+
+@pytest.fixture
+def file_path(tmp_path: Path, data: pd.DataFrame) -> str:
+    path = str(tmp_path / "data.parquet")
+    write_parquet(data, path, ParquetOptions(row_group_size=2))
+    return path
+
+
+def test_lazy_parquet_projection(file_path: str, data: pd.DataFrame):
+    features = LazyParquet(file_path)
+    assert features.column_names == ["a", "b", "country"]
+
+    features_a = features.select(["a"])
+    assert features_a.column_names == ["a"]
+    assert features.column_names == ["a", "b", "country"]  # NOTE: select returns a new handle
+    assert_frame_equal(features_a.to_pandas(), data[["a"]])
+
+
+def test_lazy_parquet_projection_keeps_index(tmp_path: Path):
+    path = str(tmp_path / "data.parquet")
+    data = pd.DataFrame({"a": [1, 2, 3], "b": [4, 5, 6]}, index=[10, 20, 30])
+    data.to_parquet(path)
+
+    features = LazyParquet(path).select(["a"])
+
+    assert features.column_names == ["a"]
+    assert_frame_equal(features.to_pandas(), data[["a"]])
+    assert_frame_equal(pd.concat(features.iter_batches()), data[["a"]])
+    assert_frame_equal(pd.concat(features.iter_batches(prefetch=False)), data[["a"]])
+
+
+def test_lazy_parquet_filters(file_path: str, data: pd.DataFrame):
+    result = read_parquet(file_path, columns=["a", "country"], filters=[("country", "=", "FR")])
+    assert_frame_equal(result, data.loc[data.country == "FR", ["a", "country"]].reset_index(drop=True))
+
+
+def test_lazy_parquet_partitioned_dataset(tmp_path: Path, data: pd.DataFrame):
+    path = str(tmp_path / "dataset")
+    write_parquet(data, path, ParquetOptions(partition_cols=["country"]))
+
+    features = LazyParquet(path).filter([("country", "in", ["US", "ES"])]).select(["a"])
+    assert sorted(features.to_pandas().a) == [0, 2, 3, 5]
+
+
+def test_lazy_parquet_iter_batches(file_path: str, data: pd.DataFrame):
+    batches = list(LazyParquet(file_path, columns=["a"], filters=[("a", ">", 0)]).iter_batches(batch_size=2))
+    assert all(len(b) <= 2 for b in batches)
+    assert pd.concat(batches).a.tolist() == [1, 2, 3, 4, 5]
+
+
+def test_lazy_parquet_iter_batches_no_prefetch(file_path: str, data: pd.DataFrame):
+    batches = list(LazyParquet(file_path).iter_batches(batch_size=1, prefetch=False))
+    assert len(batches) == len(data)
+    assert_frame_equal(pd.concat(batches, ignore_index=True), data)
+
+
+def test_lazy_parquet_iter_batches_warns_large_row_groups(file_path: str, monkeypatch: pytest.MonkeyPatch):
+    messages = []
+    monkeypatch.setattr(parquet.logger, "warning", messages.append)  # NOTE: adding a handler shifts the handler ids
+    list(LazyParquet(file_path).iter_batches(batch_size=1, prefetch=False))
+    assert messages == []
+
+    monkeypatch.setattr(parquet, "LARGE_ROW_GROUP_ROWS", 1)
+    list(LazyParquet(file_path).iter_batches(batch_size=1, prefetch=False))
+    assert len(messages) == 1
+    assert "has row groups of up to 2 rows" in messages[0]
+
+
+def test_parquet_options_bounded_row_groups(tmp_path: Path):
+    path = str(tmp_path / "data.parquet")
+    write_parquet(pd.DataFrame({"a": range(250_000)}), path)
+    metadata = pq.ParquetFile(path).metadata
+    assert [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)] == [100_000, 100_000, 50_000]
+
+
+def test_lazy_parquet_iter_batches_no_prefetch_partitioned_dataset(tmp_path: Path, data: pd.DataFrame):
+    path = str(tmp_path / "dataset")
+    write_parquet(data, path, ParquetOptions(partition_cols=["country"]))
+
+    features = LazyParquet(path).filter([("country", "in", ["US", "ES"]), ("a", ">", 0)]).select(["a", "country"])
+    batches = list(features.iter_batches(batch_size=1, prefetch=False))
+    result = pd.concat(batches, ignore_index=True).astype({"country": str})  # NOTE: categories differ by batch
+    assert_frame_equal(result, features.to_pandas().astype({"country": str}))
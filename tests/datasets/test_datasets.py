@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+import pandera as pa
+import pytest
+
+from datasets.datasets import BaseSchema
+
+
+class EventSchema(BaseSchema):
+    value: float
+    count: int = pa.Field(ge=0)
+    event_date: str
+
+
+class TestValidateFast:
+    @pytest.fixture
+    def data(self):
+        return pd.DataFrame(
+            {
+                "value": np.arange(100, dtype=np.float32),
+                "count": np.arange(100),
+                "event_date": ["2023-01-01T00:00:00Z"] * 100,
+                "extra": 1,
+            }
+        )
+
+    def test_validate_fast(self, data: pd.DataFrame):
+        validated = EventSchema.validate_fast(data)
+        pd.testing.assert_frame_equal(validated, EventSchema.validate(data))
+
+    def test_compiled_schema_is_cached(self):
+        assert EventSchema.compiled_schema() is EventSchema.compiled_schema()
+        assert list(EventSchema.compiled_schema().columns) == ["value", "count", "event_date"]
+
+    def test_nulls_are_checked_on_every_row(self, data: pd.DataFrame):
+        data.loc[97, "value"] = np.nan
+        with pytest.raises(pa.errors.SchemaError) as e:
+            EventSchema.validate_fast(data, sample=1, random_state=0)
+        assert e.value.failure_cases[["column", "check", "index"]].values.tolist() == [["value", "not_nullable", 97]]
+
+    def test_checks_run_on_a_sample(self, data: pd.DataFrame):
+        data.loc[:49, "event_date"] = "not a date"
+        data.loc[0, "count"] = -1
+        with pytest.raises(pa.errors.SchemaError) as e:
+            EventSchema.validate_fast(data, sample=None)
+        failure_cases = e.value.failure_cases
+        assert (failure_cases.check == "date_time_iso_format").sum() == 50
+        assert failure_cases[failure_cases.check == "greater_than_or_equal_to"]["index"].tolist() == [0]
+
+        with pytest.raises(pa.errors.SchemaError) as e:
+            EventSchema.validate_fast(data, sample=0.2, random_state=0)
+        assert 0 < (e.value.failure_cases.check == "date_time_iso_format").sum() <= 20
+
+        assert len(EventSchema.validate_fast(data.iloc[50:], sample=10)) == 50
+
+    def test_missing_columns(self, data: pd.DataFrame):
+        with pytest.raises(pa.errors.SchemaError, match="count"):
+            EventSchema.validate_fast(data.drop(columns="count"))
+
+
+class TestCompiledSchema:
+    def test_aliases_and_dtypes(self):
+        class AliasSchema(BaseSchema):
+            sepal_length: float = pa.Field(alias="sepal length (cm)")
+            target: int
+
+        compiled = AliasSchema.compiled_schema()
+        assert compiled.names == ["sepal length (cm)", "target"]
+        assert compiled.aliases == {"sepal_length": "sepal length (cm)", "target": "target"}
+        assert compiled.dtypes == {"sepal length (cm)": np.dtype("float64"), "target": np.dtype("int64")}
+
+    def test_regex_columns(self):
+        class RegexSchema(BaseSchema):
+            feature: float = pa.Field(alias="feature_\\d+", regex=True)
+
+        compiled = RegexSchema.compiled_schema()
+        assert compiled.has_regex and compiled.names == []
+        data = pd.DataFrame({"feature_1": [1], "feature_2": [2], "other": [3]})
+        assert list(compiled.resolve_dtypes(data.columns)) == ["feature_1", "feature_2"]
+        assert RegexSchema.coerce_filter_columns(data).dtypes.tolist() == [np.dtype("float64")] * 2
+
+    def test_coerce_filter_columns(self):
+        data = pd.DataFrame({"value": [1.0], "count": ["2"], "event_date": ["2023-01-01T00:00:00Z"], "extra": [1]})
+        coerced = EventSchema.coerce_filter_columns(data)
+        assert coerced.columns.tolist() == ["value", "count", "event_date"]
+        assert coerced["count"].tolist() == [2]
+
+    def test_fill_missing_cols(self):
+        data = EventSchema.fill_missing_cols(pd.DataFrame({"value": [1.0]}))
+        assert data.columns.tolist() == ["value", "count", "event_date"]
+
+
+class TestValidateChunks:
+    def test_validate_chunks(self):
+        chunks = [
+            pd.DataFrame({"value": [1.0, 2.0], "count": [1, 2], "event_date": ["2023-01-01T00:00:00Z"] * 2}),
+            pd.DataFrame({"value": [3.0], "count": ["3"], "event_date": ["2023-01-02T00:00:00Z"], "extra": [1]}),
+        ]
+        validated = list(EventSchema.validate_chunks(iter(chunks)))
+        pd.testing.assert_frame_equal(pd.concat(validated), EventSchema.validate(pd.concat(chunks)))
+
+    def test_failure_cases_are_aggregated(self):
+        def chunks():
+            for i in range(3):
+                yield pd.DataFrame({"value": [1.0, np.nan], "count": [i - 1, 1], "event_date": ["not a date"] * 2})
+
+        validated = []
+        with pytest.raises(pa.errors.SchemaError) as e:
+            for chunk in EventSchema.validate_chunks(chunks(), lazy=True):
+                validated.append(chunk)
+        assert len(validated) == 3
+        failure_cases = e.value.failure_cases
+        assert failure_cases.groupby("check").chunk.nunique().to_dict() == {
+            "date_time_iso_format": 3,
+            "greater_than_or_equal_to": 1,
+            "not_nullable": 3,
+        }
+        assert "failed 10 checks in 3 chunks" in str(e.value)
+
+    def test_fail_fast(self):
+        chunks = [
+            pd.DataFrame({"value": [1.0], "count": [1], "event_date": ["2023-01-01T00:00:00Z"]}),
+            pd.DataFrame({"value": [2.0], "count": [-1], "event_date": ["2023-01-01T00:00:00Z"]}),
+            pd.DataFrame({"value": [3.0], "count": [1], "event_date": ["2023-01-01T00:00:00Z"]}),
+        ]
+        validated = []
+        with pytest.raises(pa.errors.SchemaError, match="failed 1 checks in 1 chunks") as e:
+            for chunk in EventSchema.validate_chunks(iter(chunks)):
+                validated.append(chunk)
+        assert len(validated) == 1  # NOTE: the failing chunk is not yielded
+        assert e.value.failure_cases.chunk.tolist() == [1]
+
+    def test_missing_columns_fail_right_away(self):
+        chunks = iter([pd.DataFrame({"value": [1.0]}), pd.DataFrame({"value": [1.0]})])
+        with pytest.raises(pa.errors.SchemaError, match="Missing columns"):
+            next(EventSchema.validate_chunks(chunks))
@@ -1,3 +1,6 @@
+import pickle
+
+import numpy as np
 import pandas as pd
 import pytest
 
@@ -57,3 +60,129 @@ class TestGroupFeatureGenerator:
             ("BB", "FR"): 5.5,
             ("BB", "US"): 2.5,
         }  # type: ignore[comparison-overlap]
+
+    def test_group_feature_generator_unseen_groups(self, X: pd.DataFrame, y: pd.Series):
+        group_feature_generator = agg_feat.GroupFeatureGenerator(
+            group_cols=["industry", "country"], group_metric="mean"
+        ).fit(X, y)
+        X_new = pd.DataFrame({"industry": ["AA", "CC"], "country": ["FR", "US"]}, index=[10, 11])
+        X_transformed = group_feature_generator.transform(X_new)
+        assert X_transformed.index.tolist() == [10, 11]
+        np.testing.assert_array_equal(X_transformed["mean_sales_industry_country"], [4.0, np.nan])
+
+    def test_group_feature_generator_unnamed_y(self, X: pd.DataFrame):
+        group_feature_generator = agg_feat.GroupFeatureGenerator(group_cols=["country"], group_metric="mean")
+        X_transformed = group_feature_generator.fit_transform(X, pd.Series(X.sales.to_list()))
+        assert X_transformed.columns.tolist() == ["mean_None_country"]
+        assert group_feature_generator.values_by_group == {"US": 2.0, "FR": 5.0}
+        assert group_feature_generator.get_params()["target_name"] == "y"
+
+    def test_group_feature_generator_pickle(self, X: pd.DataFrame, y: pd.Series):
+        group_feature_generator = agg_feat.GroupFeatureGenerator(group_cols=["country"], group_metric="max").fit(X, y)
+        unpickled = pickle.loads(pickle.dumps(group_feature_generator))
+        assert unpickled.values_by_group == {"US": 3.0, "FR": 6.0}
+        assert unpickled.transform(X).equals(group_feature_generator.transform(X))
+
+    @pytest.mark.parametrize("group_cols", [["country"], ["industry", "country"]])
+    def test_group_feature_generator_unpickle_values_by_group(self, X: pd.DataFrame, y: pd.Series, group_cols):
+        fitted = agg_feat.GroupFeatureGenerator(group_cols=group_cols, group_metric="mean").fit(X, y)
+        old = agg_feat.GroupFeatureGenerator.__new__(agg_feat.GroupFeatureGenerator)
+        old.__dict__.update(  # NOTE: as pickled before the array-backed lookup
+            group_cols=group_cols,
+            group_metric="mean",
+            percentile_q=None,
+            target_name="sales",
+            values_by_group=fitted.values_by_group,
+        )
+
+        unpickled = pickle.loads(pickle.dumps(old))
+
+        assert unpickled.values_by_group == fitted.values_by_group
+        assert unpickled.transform(X).equals(fitted.transform(X))
+        assert unpickled.get_params()["sketch_size"] == 1000
+
+
+class TestMultiGroupFeatureGenerator:
+    @pytest.fixture(scope="class")
+    def X(self):
+        rng = np.random.default_rng(0)
+        return pd.DataFrame(
+            {
+                "industry": rng.choice(["AA", "BB", "CC"], 100),
+                "country": rng.choice(["US", "FR"], 100),
+                "sales": rng.random(100),
+                "employees": rng.integers(1, 100, 100),
+            }
+        )
+
+    @pytest.mark.parametrize("group_cols", [["country"], ["industry", "country"]])
+    def test_same_as_stacked_generators(self, X: pd.DataFrame, group_cols):
+        multi = agg_feat.MultiGroupFeatureGenerator(
+            group_cols,
+            ["mean", "median", "rank", "min", "max"],
+            percentiles=[0.1, 0.9],
+            target_names=["sales", "employees"],
+        )
+        X_transformed = multi.fit_transform(X)
+
+        expected = []
+        for target in ["sales", "employees"]:
+            generators = [
+                agg_feat.GroupFeatureGenerator(group_cols, m) for m in ["mean", "median", "rank", "min", "max"]
+            ]
+            generators += [agg_feat.GroupFeatureGenerator(group_cols, "percentile", percentile_q=q) for q in [0.1, 0.9]]
+            expected += [g.fit_transform(X, X[target]) for g in generators]
+        expected_df = pd.concat(expected, axis=1)
+        assert multi.get_feature_names_out() == expected_df.columns.tolist()
+        pd.testing.assert_frame_equal(X_transformed, expected_df, check_dtype=False)
+
+    def test_target_from_y_and_unseen_groups(self, X: pd.DataFrame):
+        multi = agg_feat.MultiGroupFeatureGenerator(["country"], ["mean"], percentiles=[0.5]).fit(X, X.sales)
+        X_transformed = multi.transform(pd.DataFrame({"country": ["US", "ES"]}))
+        assert X_transformed.columns.tolist() == ["mean_sales_country", "percentile_50_sales_country"]
+        assert X_transformed.iloc[0, 0] == pytest.approx(X.sales[X.country == "US"].mean())
+        assert X_transformed.iloc[1].isna().all()
+
+    def test_invalid_metrics(self):
+        with pytest.raises(ValueError):
+            agg_feat.MultiGroupFeatureGenerator(["country"], ["mean", "invalid"])  # type: ignore[list-item]
+        with pytest.raises(ValueError):
+            agg_feat.MultiGroupFeatureGenerator(["country"])
+
+
+class TestGroupFeatureGeneratorPartialFit:
+    @pytest.fixture(scope="class")
+    def X(self):
+        rng = np.random.default_rng(0)
+        sales = rng.random(1_000)
+        sales[::50] = np.nan
+        return pd.DataFrame(
+            {
+                "industry": rng.choice(["AA", "BB", "CC"], 1_000),
+                "country": rng.choice(["US", "FR", None], 1_000),
+                "sales": sales,
+            }
+        )
+
+    @pytest.mark.parametrize(
+        "group_metric, percentile_q",
+        [("mean", None), ("median", None), ("rank", None), ("min", None), ("max", None), ("percentile", 0.9)],
+    )
+    @pytest.mark.parametrize("group_cols", [["country"], ["industry", "country"]])
+    def test_partial_fit_same_as_fit(self, X: pd.DataFrame, group_metric, percentile_q, group_cols):
+        fitted = agg_feat.GroupFeatureGenerator(group_cols, group_metric, percentile_q=percentile_q).fit(X, X.sales)
+        partially_fitted = agg_feat.GroupFeatureGenerator(group_cols, group_metric, percentile_q=percentile_q)
+        for chunk in np.array_split(X, 7):
+            partially_fitted.partial_fit(chunk, chunk.sales)
+
+        assert partially_fitted.values_by_group.keys() == fitted.values_by_group.keys()
+        assert partially_fitted.values_by_group == pytest.approx(fitted.values_by_group)
+        pd.testing.assert_frame_equal(partially_fitted.transform(X), fitted.transform(X), check_dtype=False)
+
+    def test_partial_fit_approximate_quantiles(self, X: pd.DataFrame):
+        fitted = agg_feat.GroupFeatureGenerator(["country"], "median").fit(X, X.sales)
+        partially_fitted = agg_feat.GroupFeatureGenerator(["country"], "median", sketch_size=20)
+        for chunk in np.array_split(X, 7):
+            partially_fitted.partial_fit(chunk, chunk.sales)
+        assert len(partially_fitted.state_.values) <= 2 * 20 * 2
+        assert partially_fitted.values_by_group == pytest.approx(fitted.values_by_group, abs=0.05)
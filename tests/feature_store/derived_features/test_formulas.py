@@ -0,0 +1,69 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_store.derived_features.formulas import CompiledFormula
+
+
+class TestCompiledFormula:
+    @pytest.fixture(scope="class")
+    def data(self):
+        rng = np.random.default_rng(0)
+        return pd.DataFrame({"a": rng.random(100), "b": rng.integers(0, 5, 100), "c": rng.normal(size=100)})
+
+    @pytest.mark.parametrize(
+        "expression",
+        [
+            "a + b",
+            "a - b * c",
+            "(a + b) / b",
+            "a ** 2 - c",
+            "-a + 1.5",
+            "a > c",
+            "b == 2",
+            "(a > 0.5) & (b != 0)",
+            "a > 0.5 and b != 0",
+            "a > 0.5 or not b == 2 and c < 0",
+            "`a` * `b`",
+        ],
+    )
+    def test_same_as_pandas_eval(self, data: pd.DataFrame, expression: str):
+        formula = CompiledFormula(f"x = {expression}")
+        result = formula({col: data[col].to_numpy() for col in formula.inputs}, size=len(data))
+        np.testing.assert_array_equal(result["x"], data.eval(expression).to_numpy())
+
+    def test_several_lines(self, data: pd.DataFrame):
+        formula = CompiledFormula(
+            """
+            ratio = a / c
+            scaled = ratio * 2 + b
+            one = 1
+            """
+        )
+        assert formula.inputs == ["a", "c", "b"]
+        assert formula.outputs == ["ratio", "scaled", "one"]
+        result = formula({col: data[col].to_numpy() for col in formula.inputs}, size=len(data))
+        np.testing.assert_allclose(result["scaled"], data.a / data.c * 2 + data.b)
+        np.testing.assert_array_equal(result["one"], np.ones(len(data)))
+
+    def test_backtick_names(self, data: pd.DataFrame):
+        data = data.rename(columns={"a": "sepal length (cm)", "b": "petal-width"})
+        formula = CompiledFormula("`ratio (%)` = `sepal length (cm)` / `petal-width`; x = `ratio (%)` * 100")
+        assert formula.inputs == ["sepal length (cm)", "petal-width"]
+        assert formula.outputs == ["ratio (%)", "x"]
+        result = formula({col: data[col].to_numpy() for col in formula.inputs}, size=len(data))
+        np.testing.assert_array_equal(result["x"], data.eval("`sepal length (cm)` / `petal-width` * 100").to_numpy())
+
+    @pytest.mark.parametrize(
+        "formula",
+        ["x = a.b", "x = f(a)", "x = a if b else c", "x = 'a'", "x = 0 < a < 1", "a + b", "x = y = a", "x = (", ""],
+    )
+    def test_invalid_formulas(self, formula: str):
+        with pytest.raises(ValueError):
+            CompiledFormula(formula)
+
+    def test_pickle(self, data: pd.DataFrame):
+        formula = pickle.loads(pickle.dumps(CompiledFormula("x = a * b")))
+        np.testing.assert_array_equal(formula({"a": data.a, "b": data.b}, size=len(data))["x"], data.a * data.b)
@@ -0,0 +1,103 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+
+from feature_store.derived_features.aggregated_features import GroupFeatureGenerator, MultiGroupFeatureGenerator
+from feature_store.derived_features.pipeline import FeaturePipeline
+from feature_store.derived_features.row_features import FormulaTransformer
+
+
+class TestFeaturePipeline:
+    @pytest.fixture(scope="class")
+    def X(self):
+        rng = np.random.default_rng(0)
+        return pd.DataFrame(
+            {
+                "industry": rng.choice(["AA", "BB", "CC"], 200),
+                "country": rng.choice(["US", "FR"], 200),
+                "revenue": rng.random(200) * 100,
+                "employees": rng.integers(1, 10, 200),
+            },
+            index=np.arange(200) + 1000,
+        )
+
+    @pytest.fixture(scope="class")
+    def y(self, X: pd.DataFrame):
+        return pd.Series(np.random.default_rng(1).random(len(X)), index=X.index, name="target")
+
+    def test_same_as_column_transformer(self, X: pd.DataFrame, y: pd.Series):
+        steps = [
+            FormulaTransformer(formula="revenue_per_capita = revenue / employees"),
+            FormulaTransformer(formula="is_large = employees > 5"),
+            GroupFeatureGenerator(["country"], "median"),
+            MultiGroupFeatureGenerator(["industry", "country"], ["mean", "max"], percentiles=[0.9]),
+        ]
+        column_transformer = ColumnTransformer(
+            [
+                ("f1", steps[0], ["revenue", "employees"]),
+                ("f2", steps[1], ["employees"]),
+                ("g1", steps[2], ["country"]),
+                ("g2", steps[3], ["industry", "country"]),
+            ],
+            verbose_feature_names_out=False,
+        )
+        expected = column_transformer.fit_transform(X, y)
+
+        pipeline = FeaturePipeline(steps, n_jobs=2)
+        pd.testing.assert_frame_equal(pipeline.fit_transform(X, y), expected)
+        pd.testing.assert_frame_equal(pipeline.transform(X), expected)
+        assert pipeline.get_feature_names_out() == expected.columns.tolist()
+
+    def test_dtypes_same_as_unfused_transformers(self, X: pd.DataFrame):
+        steps = [
+            FormulaTransformer(formula="is_large = employees > 5"),
+            FormulaTransformer(formula="revenue_per_capita = revenue / employees"),
+        ]
+        expected = pd.concat([step.fit_transform(X) for step in steps], axis=1)
+        assert expected.dtypes.tolist() == [bool, float]
+
+        pd.testing.assert_frame_equal(FeaturePipeline(steps).fit_transform(X), expected)
+        assert FeaturePipeline(steps[1:]).fit_transform(X).dtypes.tolist() == [float]
+
+    def test_dependencies_between_steps(self, X: pd.DataFrame):
+        pipeline = FeaturePipeline(
+            [
+                FormulaTransformer(formula="relative = revenue_per_capita / mean_revenue_per_capita_country"),
+                GroupFeatureGenerator(["country"], "mean", target_name="revenue_per_capita"),
+                FormulaTransformer(formula="revenue_per_capita = revenue / employees"),
+            ]
+        )
+        X_transformed = pipeline.fit_transform(X)
+        assert [len(stage.group_steps) for stage in pipeline.stages_] == [0, 1, 0]
+        revenue_per_capita = X.revenue / X.employees
+        expected = revenue_per_capita / revenue_per_capita.groupby(X.country).transform("mean")
+        np.testing.assert_allclose(X_transformed["relative"], expected)
+
+        X_new = X.sample(20, random_state=0)
+        X_new_transformed = pickle.loads(pickle.dumps(pipeline)).transform(X_new)
+        pd.testing.assert_frame_equal(X_new_transformed, X_transformed.loc[X_new.index])
+
+    def test_formulas_are_fused(self, X: pd.DataFrame):
+        pipeline = FeaturePipeline(
+            [
+                FormulaTransformer(formula="b = a * 2"),
+                FormulaTransformer(formula="a = revenue + 1"),
+                FormulaTransformer(formula="c = employees ** 2"),
+            ]
+        ).fit(X)
+        assert len(pipeline.stages_) == 1
+        assert pipeline.stages_[0].formula.outputs == ["a", "c", "b"]
+        assert pipeline.get_feature_names_out() == ["b", "a", "c"]
+
+    def test_missing_columns(self, X: pd.DataFrame):
+        with pytest.raises(ValueError, match="missing_col"):
+            FeaturePipeline([FormulaTransformer(formula="a = missing_col * 2")]).fit(X)
+
+    def test_duplicated_features(self, X: pd.DataFrame):
+        with pytest.raises(ValueError, match="several steps"):
+            FeaturePipeline(
+                [FormulaTransformer(formula="a = revenue"), FormulaTransformer(formula="a = employees")]
+            ).fit(X)
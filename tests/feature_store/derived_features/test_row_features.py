@@ -0,0 +1,40 @@
+import pickle
+
+import pandas as pd
+import pytest
+
+from feature_store.derived_features import row_features
+
+
+class TestFormulaTransformer:
+    @pytest.fixture(scope="class")
+    def X(self):
+        return pd.DataFrame(
+            {"revenue": [100.0, 200.0, 300.0], "employees": [1, 2, 4], "country": ["US", "FR", "US"]},
+            index=[10, 11, 12],
+        )
+
+    def test_formula_transformer(self, X: pd.DataFrame):
+        X_original = X.copy()
+        t = row_features.FormulaTransformer(formula="revenue_per_capita = revenue / employees")
+        X_transformed = t.fit_transform(X)
+        expected = pd.DataFrame({"revenue_per_capita": [100.0, 100.0, 75.0]}, index=[10, 11, 12])
+        pd.testing.assert_frame_equal(X_transformed, expected)
+        pd.testing.assert_frame_equal(X, X_original)
+
+    def test_feature_names_in(self):
+        t = row_features.FormulaTransformer(formula="margin = (revenue - costs) / revenue * 100")
+        assert t._get_feature_names_in_from_formula() == ["revenue", "costs"]
+
+    def test_several_outputs_and_pickle(self, X: pd.DataFrame):
+        t = row_features.FormulaTransformer(formula="revenue_k = revenue / 1000\nis_large = revenue_k > 0.15").fit(X)
+        assert t.get_feature_names_out().tolist() == ["revenue_k", "is_large"]
+        X_transformed = pickle.loads(pickle.dumps(t)).transform(X)
+        assert X_transformed["is_large"].tolist() == [False, True, True]
+
+    def test_pandas_eval_syntax(self, X: pd.DataFrame):
+        X = X.rename(columns={"revenue": "revenue ($)"})
+        expression = "`revenue ($)` > 150 and not employees > 3"
+        t = row_features.FormulaTransformer(formula=f"is_large = {expression}")
+        assert t._get_feature_names_in_from_formula() == ["revenue ($)", "employees"]
+        assert t.fit_transform(X)["is_large"].tolist() == X.eval(expression).tolist() == [False, True, False]
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_store.derived_features.sketches import GroupQuantileSketch
+
+
+class TestGroupQuantileSketch:
+    @pytest.fixture(scope="class")
+    def data(self):
+        rng = np.random.default_rng(0)
+        return pd.DataFrame({"group": rng.integers(0, 10, 5_000), "value": rng.normal(size=5_000)})
+
+    @pytest.mark.parametrize("q", [0.0, 0.1, 0.5, 0.75, 1.0])
+    def test_exact_quantiles(self, data: pd.DataFrame, q: float):
+        sketch = GroupQuantileSketch(size=1_000)
+        for chunk in np.array_split(data, 3):
+            sketch.update(pd.Index(chunk.group), chunk.value.to_numpy())
+        expected = data.groupby("group").value.quantile(q)
+        pd.testing.assert_series_equal(sketch.quantile(q).sort_index(), expected, check_names=False)
+
+    def test_compressed_quantiles(self, data: pd.DataFrame):
+        sketch = GroupQuantileSketch(size=50).update(pd.Index(data.group), data.value.to_numpy())
+        assert np.bincount(sketch.codes).max() <= 2 * 50
+        expected = data.groupby("group").value.quantile(0.5)
+        np.testing.assert_allclose(sketch.quantile(0.5).sort_index(), expected, atol=0.05)
+
+    def test_merge(self, data: pd.DataFrame):
+        first, second = np.array_split(data, 2)
+        sketch = GroupQuantileSketch().update(pd.Index(first.group), first.value.to_numpy())
+        other = GroupQuantileSketch().update(pd.Index(second.group), second.value.to_numpy())
+        expected = data.groupby("group").value.quantile(0.25)
+        pd.testing.assert_series_equal(sketch.merge(other).quantile(0.25).sort_index(), expected, check_names=False)
+
+    def test_invalid_size(self):
+        with pytest.raises(ValueError):
+            GroupQuantileSketch(size=0)
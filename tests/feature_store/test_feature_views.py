@@ -0,0 +1,113 @@
+import asyncio
+from pathlib import Path
+
+import pandas as pd
+import pandera as pa
+import pytest
+from pandas.testing import assert_frame_equal
+
+from data_access_layer import AsyncDataAccessLayer, DataAccessLayer
+from data_access_layer.dal import SklearnDataAccessLayer
+from feature_store.feature_views import BaseFeatureView, DiabetesFeatureView, IrisFeatureView, read_feature_views
+
+
+class PeopleFeatureView(BaseFeatureView):
+    id: int
+    age: float
+
+    @classmethod
+    def read(cls, dal: DataAccessLayer, **kwargs):
+        return cls(dal.query("SELECT * FROM people ORDER BY id"))
+
+
+class OldPeopleFeatureView(PeopleFeatureView):
+    @classmethod
+    def read(cls, dal: DataAccessLayer, **kwargs):
+        return cls(dal.query("SELECT * FROM people WHERE age > 25 ORDER BY id"))
+
+
+@pytest.fixture
+def dal(tmp_path: Path) -> AsyncDataAccessLayer:  # type: ignore
+    pytest.importorskip("aiosqlite")
+    db_path = tmp_path / "data.db"
+    data = pd.DataFrame({"id": [1, 2, 3], "name": ["Alice", "Bob", "Charlie"], "age": [20, 30, 40]})
+    DataAccessLayer(f"sqlite:///{db_path}").connect().bulk_load(data, "people")
+    dal = AsyncDataAccessLayer(f"sqlite+aiosqlite:///{db_path}").connect()
+    yield dal
+    asyncio.run(dal.dispose())
+
+
+def test_read_feature_views(dal: AsyncDataAccessLayer):
+    feature_views = [PeopleFeatureView, OldPeopleFeatureView, PeopleFeatureView]
+    people, old_people, people_again = asyncio.run(read_feature_views(dal, feature_views, max_concurrency=2))
+
+    assert list(people.columns) == ["id", "age"]
+    assert people.id.tolist() == [1, 2, 3]
+    assert old_people.id.tolist() == [2, 3]
+    assert people_again.equals(people)
+
+
+def test_read_sklearn_feature_views(tmp_path: Path):
+    pytest.importorskip("aiosqlite")
+    dal = AsyncDataAccessLayer(f"sqlite+aiosqlite:///{tmp_path / 'sklearn.db'}").connect()
+    feature_views = [DiabetesFeatureView, IrisFeatureView, DiabetesFeatureView]
+    try:
+        diabetes, iris, diabetes_again = asyncio.run(read_feature_views(dal, feature_views, max_concurrency=2))
+    finally:
+        asyncio.run(dal.dispose())
+
+    assert_frame_equal(diabetes, DiabetesFeatureView.read(SklearnDataAccessLayer().connect()))
+    assert_frame_equal(iris, IrisFeatureView.read(SklearnDataAccessLayer().connect()))
+    assert_frame_equal(diabetes_again, diabetes)
+
+
+class TestSklearnFeatureViews:
+    @pytest.fixture
+    def dal(self) -> SklearnDataAccessLayer:
+        return SklearnDataAccessLayer().connect()
+
+    def test_read_diabetes(self, dal: SklearnDataAccessLayer):
+        data = DiabetesFeatureView.read(dal)
+        assert list(data.columns) == list(DiabetesFeatureView.to_schema().columns)
+        assert len(data) == 442
+
+    def test_read_iris_aliases(self, dal: SklearnDataAccessLayer):
+        data = IrisFeatureView.read(dal)
+        assert list(data.columns) == list(IrisFeatureView.to_schema().columns)
+        assert len(data) == 150
+
+    @pytest.mark.parametrize("feature_view", [DiabetesFeatureView, IrisFeatureView])
+    def test_read_fast_coerce_types(self, dal: SklearnDataAccessLayer, feature_view):
+        data = feature_view.read(dal)
+        compact = feature_view.read(dal, fast_coerce_types=True)
+
+        assert list(compact.columns) == list(data.columns)
+        assert all(compact[c].dtype == "float32" for c in data.columns if data[c].dtype == "float64")
+        assert compact.memory_usage(deep=True).sum() < data.memory_usage(deep=True).sum()
+        assert_frame_equal(compact.astype(data.dtypes), data, check_exact=False, rtol=1e-6)
+
+    def test_read_fast_coerce_types_downcasts_ints(self, dal: SklearnDataAccessLayer):
+        assert IrisFeatureView.read(dal, fast_coerce_types=True).target.dtype == "Int8"
+
+    def test_read_compact_casts_in_sql(self, tmp_path: Path):
+        dal = DataAccessLayer(f"sqlite:///{tmp_path / 'data.db'}").connect()
+        pd.DataFrame({"id": ["1", "2"], "age": ["20.5", "30"]}).to_sql("people", dal.engine, index=False)
+
+        data = PeopleFeatureView.read_compact(dal, PeopleFeatureView.build_query("people", cast=True))
+
+        assert data.dtypes.astype(str).to_dict() == {"id": "Int8", "age": "float32"}
+        assert data.age.tolist() == [20.5, 30.0]
+
+    def test_read_pushdown(self, dal: SklearnDataAccessLayer):
+        data = DiabetesFeatureView.read(dal, filters=["target > 100", "sex > 0"], limit=10)
+        assert len(data) == 10
+        assert (data.target > 100).all()
+        assert (data.sex > 0).all()
+
+    def test_build_query_only_selects_schema_columns(self):
+        class SubsetFeatureView(BaseFeatureView):
+            age: float
+            bmi: float = pa.Field(alias="body mass index")
+
+        query = str(SubsetFeatureView.build_query("diabetes"))
+        assert query.startswith('SELECT age, "body mass index" \nFROM diabetes')
@@ -1,8 +1,15 @@
+import itertools
+from datetime import datetime
 from pathlib import Path
 
+import pandas as pd
 import pytest
+from pandas.testing import assert_frame_equal
 
-from feature_store.extract import extract_sklearn_feature_view
+from data_access_layer import DataAccessLayer
+from data_access_layer.files import ParquetOptions
+from feature_store.extract import extract_feature_view, extract_sklearn_feature_view
+from feature_store.feature_views import BaseFeatureView
 
 
 @pytest.fixture(scope="session")
@@ -28,3 +35,134 @@ class TestExtractSklearnFeatureView:
         result = task.run()
         assert result.dst == config.dst
         assert Path(result.dst).exists()
+
+    def test_run_chunks(self, config: extract_sklearn_feature_view.Config):
+        result = extract_sklearn_feature_view.ExtractTask(config).run()
+        expected = pd.read_parquet(result.dst)
+
+        config_chunks = config.copy(update={"chunksize": 100, "dst": config.dst.replace(".parquet", "_chunks.parquet")})
+        result_chunks = extract_sklearn_feature_view.ExtractTask(config_chunks).run()
+
+        assert_frame_equal(pd.read_parquet(result_chunks.dst), expected)
+
+    def test_run_partitioned(self, config: extract_sklearn_feature_view.Config):
+        parquet = ParquetOptions(partition_cols=["target"], row_group_size=10)
+        config = config.copy(update={"sklearn_dataset": "iris", "parquet": parquet})
+        result = extract_sklearn_feature_view.ExtractTask(config).run()
+
+        assert sorted(p.name for p in Path(result.dst).iterdir()) == ["target=0", "target=1", "target=2"]
+        assert len(pd.read_parquet(result.dst)) == 150
+
+
+class PeopleFeatureView(BaseFeatureView):
+    id: int
+    name: str
+    created_date: str
+
+    @classmethod
+    def read(cls, dal: DataAccessLayer, *, filters=None, limit=None, **kwargs):
+        return cls(dal.query(cls.build_query("people", filters=filters, limit=limit)))
+
+    @classmethod
+    def read_chunks(cls, dal: DataAccessLayer, *, chunksize: int = 100_000, filters=None, limit=None, **kwargs):
+        for chunk in dal.query_chunks(cls.build_query("people", filters=filters, limit=limit), chunksize=chunksize):
+            yield cls(chunk)
+
+
+class FailingPeopleFeatureView(PeopleFeatureView):
+    @classmethod
+    def read_chunks(cls, dal: DataAccessLayer, *, chunksize: int = 100_000, filters=None, limit=None, **kwargs):
+        yield from itertools.islice(super().read_chunks(dal, chunksize=chunksize, filters=filters, limit=limit), 1)
+        raise ConnectionError("connection lost")
+
+
+class TimestampedPeopleFeatureView(BaseFeatureView):
+    id: int
+    created_at: pd.Timestamp
+
+    @classmethod
+    def read(cls, dal: DataAccessLayer, *, filters=None, limit=None, **kwargs):
+        return cls(dal.query(cls.build_query("people", filters=filters, limit=limit)))
+
+
+class TestExtractFeatureViewIncremental:
+    @pytest.fixture
+    def dal(self, tmp_path: Path) -> DataAccessLayer:
+        return DataAccessLayer(f"sqlite:///{tmp_path / 'data.db'}").connect()
+
+    @pytest.fixture
+    def people(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "id": [1, 2, 3, 4, 5],
+                "name": ["Alice", "Bob", "Charlie", "Dave", "Eve"],
+                "created_date": [f"2023-01-0{i}T00:00:00Z" for i in range(1, 6)],
+            }
+        )
+
+    @pytest.mark.parametrize("chunksize", [None, 2])
+    @pytest.mark.parametrize("partition_cols", [[], ["name"]])
+    def test_run_incremental(
+        self, dal: DataAccessLayer, people: pd.DataFrame, tmp_path: Path, chunksize, partition_cols
+    ):
+        config = extract_feature_view.Config(
+            feature_view=PeopleFeatureView,
+            db_url=dal.conn_string,
+            watermark_column="created_date",
+            chunksize=chunksize,
+            dst=str(tmp_path / "people"),
+            parquet=ParquetOptions(partition_cols=partition_cols),
+        )
+        task = extract_feature_view.ExtractTask(config)
+
+        dal.bulk_load(people.iloc[:3], "people")
+        assert task.run_incremental() == 3
+        assert task.run_incremental() == 0
+
+        dal.bulk_load(people, "people")
+        assert task.run_incremental() == 2
+
+        result = pd.read_parquet(config.dst).sort_values("id", ignore_index=True)
+        assert_frame_equal(result[people.columns], people, check_dtype=False, check_categorical=False)
+        watermark = extract_feature_view.read_watermark(Path(config.dst) / "_watermark.json", "created_date")
+        assert watermark == "2023-01-05T00:00:00Z"
+
+    def test_run_incremental_timestamps(self, dal: DataAccessLayer, tmp_path: Path):
+        created_at = pd.to_datetime(["2023-01-01 10:00", "2023-01-02 10:00", "2023-01-02 12:00", "2023-01-03"])
+        people = pd.DataFrame({"id": [1, 2, 3, 4], "created_at": created_at})
+        config = extract_feature_view.Config(
+            feature_view=TimestampedPeopleFeatureView,
+            db_url=dal.conn_string,
+            watermark_column="created_at",
+            dst=str(tmp_path / "people"),
+        )
+        task = extract_feature_view.ExtractTask(config)
+
+        dal.bulk_load(people.iloc[:2], "people")
+        assert task.run_incremental() == 2
+        dal.bulk_load(people, "people")
+        assert task.run_incremental() == 2  # NOTE: including the row later on the day of the watermark
+
+        assert sorted(pd.read_parquet(config.dst)["id"]) == [1, 2, 3, 4]
+        watermark = extract_feature_view.read_watermark(Path(config.dst) / "_watermark.json", "created_at")
+        assert watermark == datetime(2023, 1, 3)
+
+    @pytest.mark.parametrize("partition_cols", [[], ["name"]])
+    def test_run_incremental_retry(self, dal: DataAccessLayer, people: pd.DataFrame, tmp_path: Path, partition_cols):
+        config = extract_feature_view.Config(
+            feature_view=FailingPeopleFeatureView,
+            db_url=dal.conn_string,
+            watermark_column="created_date",
+            chunksize=2,
+            dst=str(tmp_path / "people"),
+            parquet=ParquetOptions(partition_cols=partition_cols),
+        )
+        dal.bulk_load(people, "people")
+
+        with pytest.raises(ConnectionError):
+            extract_feature_view.ExtractTask(config).run_incremental()
+        assert [p.name for p in Path(config.dst).iterdir()] == []  # NOTE: no partial part file left
+
+        config = config.copy(update={"feature_view": PeopleFeatureView})
+        assert extract_feature_view.ExtractTask(config).run_incremental() == 5
+        assert sorted(pd.read_parquet(config.dst)["id"]) == [1, 2, 3, 4, 5]
@@ -0,0 +1,126 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import mlflow
+import pytest
+from sklearn.base import BaseEstimator
+from sklearn.pipeline import Pipeline
+
+from models.model_cache import ModelCache
+from models.predict import load_mlflow_model_with_flavour
+
+
+def log_model_version(model: Pipeline, name: str, stage: str | None = None) -> str:
+    with mlflow.start_run():
+        model_info = mlflow.sklearn.log_model(model, "model", registered_model_name=name)
+    version = model_info.registered_model_version
+    if stage is not None:
+        mlflow.MlflowClient().transition_model_version_stage(name, version, stage, archive_existing_versions=True)
+    return f"models:/{name}/{version}"
+
+
+class TestModelCache:
+    def test_hits(self, mlruns_file: str, fitted_model: Pipeline):
+        model_uri = log_model_version(fitted_model, "cache-hits")
+        cache = ModelCache()
+
+        model = load_mlflow_model_with_flavour(model_uri, "sklearn", cache=cache)
+
+        assert isinstance(model, BaseEstimator)
+        assert load_mlflow_model_with_flavour(model_uri, "sklearn", cache=cache) is model
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+        assert stats["load_seconds"] > stats["hit_seconds"] > 0
+
+    def test_flavours(self, mlruns_file: str, fitted_model: Pipeline):
+        model_uri = log_model_version(fitted_model, "cache-flavours")
+        cache = ModelCache()
+
+        assert isinstance(load_mlflow_model_with_flavour(model_uri, "sklearn", cache=cache), BaseEstimator)
+        assert isinstance(load_mlflow_model_with_flavour(model_uri, "pyfunc", cache=cache), mlflow.pyfunc.PyFuncModel)
+        assert cache.misses == 2
+
+    def test_lru_eviction(self, mlruns_file: str, fitted_model: Pipeline):
+        model_uris = [log_model_version(fitted_model, "cache-lru") for _ in range(2)]
+        cache = ModelCache(maxsize=1)
+
+        for model_uri in model_uris + model_uris[:1]:
+            load_mlflow_model_with_flavour(model_uri, "sklearn", cache=cache)
+
+        assert (cache.hits, cache.misses) == (0, 3)
+        assert cache.stats()["entries"] == 1
+
+    def test_stage_resolution(self, mlruns_file: str, fitted_model: Pipeline):
+        log_model_version(fitted_model, "cache-stage", stage="Production")
+        cache = ModelCache()
+
+        assert ModelCache.resolve("models:/cache-stage/Production") == "models:/cache-stage/1"
+        first = load_mlflow_model_with_flavour("models:/cache-stage/Production", "sklearn", cache=cache)
+        assert load_mlflow_model_with_flavour("models:/cache-stage/Production", "sklearn", cache=cache) is first
+
+        log_model_version(fitted_model, "cache-stage", stage="Production")
+        assert ModelCache.resolve("models:/cache-stage/Production") == "models:/cache-stage/2"
+        assert load_mlflow_model_with_flavour("models:/cache-stage/Production", "sklearn", cache=cache) is not first
+        assert (cache.hits, cache.misses) == (1, 2)
+
+    def test_stage_without_versions(self, mlruns_file: str, fitted_model: Pipeline):
+        log_model_version(fitted_model, "cache-no-stage")
+
+        with pytest.raises(ValueError, match="No version of model cache-no-stage in stage Staging"):
+            ModelCache.resolve("models:/cache-no-stage/Staging")
+
+    def test_disk_cache(self, mlruns_file: str, fitted_model: Pipeline, tmp_path: Path, monkeypatch):
+        model_uri = log_model_version(fitted_model, "cache-disk")
+        load_mlflow_model_with_flavour(model_uri, "sklearn", cache=ModelCache(cache_dir=str(tmp_path)))
+        assert len(list(tmp_path.iterdir())) == 1  # NOTE: no temporary download left
+
+        def download_artifacts(*args, **kwargs):
+            raise AssertionError("Artifacts downloaded again")
+
+        monkeypatch.setattr(mlflow.artifacts, "download_artifacts", download_artifacts)
+        model = load_mlflow_model_with_flavour(model_uri, "pyfunc", cache=ModelCache(cache_dir=str(tmp_path)))
+        assert isinstance(model, mlflow.pyfunc.PyFuncModel)
+
+    def test_disk_cache_runs_uri(self, mlruns_file: str, fitted_model: Pipeline, tmp_path: Path):
+        with mlflow.start_run():
+            model_info = mlflow.sklearn.log_model(fitted_model, "model")
+        cache = ModelCache(cache_dir=str(tmp_path))
+
+        model = load_mlflow_model_with_flavour(model_info.model_uri, "sklearn", cache=cache)
+
+        assert isinstance(model, BaseEstimator)
+        (cache_entry,) = tmp_path.iterdir()
+        assert (cache_entry / "MLmodel").exists()
+
+
+class TestModelCacheConcurrency:
+    def test_models_load_concurrently(self):
+        cache = ModelCache()
+        both_loading = threading.Barrier(2, timeout=10)
+
+        def load(model_uri: str) -> str:
+            both_loading.wait()  # NOTE: raises if the loads are serialized
+            return model_uri
+
+        with ThreadPoolExecutor(2) as executor:
+            models = list(executor.map(lambda uri: cache.get(uri, "sklearn", load), ["runs:/a/m", "runs:/b/m"]))
+
+        assert models == ["runs:/a/m", "runs:/b/m"]
+        assert cache.misses == 2
+
+    def test_model_loaded_once(self):
+        cache = ModelCache()
+        calls = []
+
+        def load(model_uri: str) -> str:
+            calls.append(model_uri)
+            threading.Event().wait(0.2)  # NOTE: the other threads wait for this load
+            return model_uri
+
+        with ThreadPoolExecutor(4) as executor:
+            models = list(executor.map(lambda _: cache.get("runs:/a/m", "sklearn", load), range(4)))
+
+        assert models == ["runs:/a/m"] * 4
+        assert calls == ["runs:/a/m"]
+        assert (cache.hits, cache.misses) == (3, 1)
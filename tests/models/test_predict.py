@@ -1,11 +1,15 @@
+from pathlib import Path
+
 import mlflow
 import numpy as np
 import pandas as pd
 import pytest
+from pandas.testing import assert_frame_equal
 from sklearn.base import BaseEstimator
 from sklearn.pipeline import Pipeline
 
-from models.predict import Config, Predictor, load_mlflow_model_with_flavour
+from data_access_layer.parquet import LazyParquet
+from models.predict import Config, Predictor, PreparedModel, load_mlflow_model_with_flavour
 
 
 def test_load_mlflow_model_with_flavour(mlruns: str, fitted_model: Pipeline):
@@ -79,9 +83,172 @@ class TestPredict:
         y_hat_result = df_y_hat["y_hat"]
         assert np.isclose(y_hat_expected, y_hat_result).all()
 
+    def test_predict_in_processes(self, X: pd.DataFrame, fitted_model: Pipeline, y_hat: pd.Series, config: Config):
+        config_processes = config.copy(update={"batch_size": 64, "batch_predictions": True, "n_workers": 2})
+        predictor = Predictor(config_processes)
+
+        df_y_hat = predictor.run(fitted_model, X.copy())
+
+        assert len(df_y_hat) == len(X)
+        assert np.isclose(y_hat, df_y_hat["y_hat"]).all()  # NOTE: in the order of the rows
+
+    def test_predict_in_processes_mlflow(
+        self, X: pd.DataFrame, fitted_model: Pipeline, y_hat: pd.Series, config: Config
+    ):
+        mlflow.set_experiment(config.mlflow.experiment_name)
+        with mlflow.start_run():
+            model_info = mlflow.sklearn.log_model(fitted_model, "model")
+        model_mlflow = mlflow.pyfunc.load_model(model_info.model_uri)
+        predictor = Predictor(config)
+
+        y_hat_result = predictor.predict_in_processes(model_mlflow, X, batch_size=100, n_workers=2)
+
+        assert np.isclose(y_hat, y_hat_result).all()
+
+    def test_predict_in_processes_empty(self, X: pd.DataFrame, fitted_model: Pipeline, config: Config):
+        assert Predictor(config).predict_in_processes(fitted_model, X.head(0), n_workers=2).empty
+
+    def test_predict_lazy_parquet(
+        self, X: pd.DataFrame, fitted_model: Pipeline, y_hat: pd.Series, config: Config, tmp_path: Path
+    ):
+        src_features = str(tmp_path / "features.parquet")
+        X.assign(unused="not a feature").to_parquet(src_features)
+        predictor = Predictor(config)
+
+        df_y_hat = predictor.run(fitted_model, LazyParquet(src_features))
+
+        assert len(df_y_hat) == len(X)
+        assert np.isclose(y_hat, df_y_hat["y_hat"]).all()
+        assert predictor.get_model_input_columns(fitted_model) == list(X.columns)
+
+    @pytest.mark.parametrize("batch_size, queue_size", [(64, 0), (64, 2), (10000, 2)])
+    def test_predict_to_parquet(
+        self, X: pd.DataFrame, fitted_model: Pipeline, config: Config, tmp_path: Path, batch_size: int, queue_size: int
+    ):
+        src_features = str(tmp_path / "features.parquet")
+        X.assign(unused="not a feature").to_parquet(src_features, row_group_size=100)
+        predictor = Predictor(config)
+        predictor.run(fitted_model, LazyParquet(src_features)).y_hat.to_frame().to_parquet(tmp_path / "y_hat.parquet")
+
+        n_rows = predictor.predict_to_parquet(
+            fitted_model, LazyParquet(src_features), str(tmp_path / "y_hat_stream.parquet"), batch_size, queue_size
+        )
+
+        assert n_rows == len(X)
+        assert set(predictor.stage_timings) == {"read", "predict", "write"}
+        assert_frame_equal(
+            pd.read_parquet(tmp_path / "y_hat_stream.parquet"), pd.read_parquet(tmp_path / "y_hat.parquet")
+        )
+
+    def test_predict_to_parquet_keeps_index(
+        self, X: pd.DataFrame, fitted_model: Pipeline, config: Config, tmp_path: Path
+    ):
+        src_features = str(tmp_path / "features.parquet")
+        X.sample(frac=1, random_state=0).rename_axis("id").to_parquet(src_features, row_group_size=100)
+        predictor = Predictor(config)
+        predictor.run(fitted_model, LazyParquet(src_features)).y_hat.to_frame().to_parquet(tmp_path / "y_hat.parquet")
+
+        predictor.predict_to_parquet(
+            fitted_model, LazyParquet(src_features), str(tmp_path / "y_hat_stream.parquet"), 64
+        )
+
+        y_hat = pd.read_parquet(tmp_path / "y_hat.parquet")
+        assert y_hat.index.tolist() == X.sample(frac=1, random_state=0).index.tolist()
+        assert_frame_equal(pd.read_parquet(tmp_path / "y_hat_stream.parquet"), y_hat)
+
+    def test_predict_to_parquet_empty(self, X: pd.DataFrame, fitted_model: Pipeline, config: Config, tmp_path: Path):
+        src_features = str(tmp_path / "features.parquet")
+        X.head(0).to_parquet(src_features)
+
+        assert (
+            Predictor(config).predict_to_parquet(fitted_model, LazyParquet(src_features), str(tmp_path / "y.pq")) == 0
+        )
+        assert pd.read_parquet(tmp_path / "y.pq").columns.tolist() == ["y_hat"]
+
     def test_predict_unknown_model(self, X: pd.DataFrame, config: Config):
         data = X.copy()
         predictor = Predictor(config)
 
         with pytest.raises(ValueError):
             predictor.run("dummy", data)
+
+
+class TestPreparedModel:
+    @pytest.fixture
+    def data(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "float": [1.0, np.nan],
+                "int": [1, 2],
+                "nullable_int": pd.array([1, None], dtype="Int64"),
+                "string": pd.array(["a", None], dtype="string"),
+                "object": ["a", pd.NA],
+            }
+        )
+
+    def test_coerce(self, data: pd.DataFrame, fitted_model: Pipeline):
+        prepared = PreparedModel(fitted_model)
+        prepared.dtypes = {"float": np.dtype("float32"), "int": np.dtype("float64"), "string": object}
+        original = data.copy()
+
+        result = prepared.coerce(data)
+
+        assert_frame_equal(result, data.astype(prepared.dtypes).replace({pd.NA: None}))
+        assert_frame_equal(data, original)  # NOTE: the input is not modified
+
+    def test_coerce_skips_matching_columns(self, data: pd.DataFrame, fitted_model: Pipeline):
+        prepared = PreparedModel(fitted_model)
+        prepared.dtypes = {"float": np.dtype("float32"), "int": np.dtype("int64")}
+        data = data[["float", "int"]]
+
+        result = prepared.coerce(data)
+
+        assert np.shares_memory(result["int"].to_numpy(), data["int"].to_numpy())
+        assert prepared.coerce(result) is result
+
+    def test_coerce_coerced_frame(self, data: pd.DataFrame, fitted_model: Pipeline):
+        prepared = PreparedModel(fitted_model)
+        prepared.dtypes = {"nullable_int": "Int64", "string": "string", "object": object}
+
+        result = prepared.coerce(data)
+
+        assert result["nullable_int"].tolist() == [1, None]
+        assert prepared.coerce(result) is result  # NOTE: the None left by the first call are not replaced again
+        assert prepared.coerce(result.iloc[1:]).equals(result.iloc[1:])
+
+    def test_run_coerces_pyfunc_models_only(self, X: pd.DataFrame, fitted_model: Pipeline, monkeypatch):
+        calls = []
+        monkeypatch.setattr(PreparedModel, "coerce", lambda self, X: calls.append(X) or X)
+        config = Config(
+            src_features="dummy", src_model="models:/test-model/1", dst_y_hat="dummy", batch_predictions=True
+        )
+
+        Predictor(config).run(fitted_model, X)
+
+        assert calls == []
+
+    def test_pyfunc_dtypes_planned_once(
+        self, X: pd.DataFrame, y: pd.Series, fitted_model: Pipeline, y_hat: pd.Series, mlruns: str, monkeypatch
+    ):
+        with mlflow.start_run():
+            signature = mlflow.models.infer_signature(X.astype({"id": "float64"}), y)
+            model_info = mlflow.sklearn.log_model(fitted_model, "model", signature=signature)
+        model_mlflow = mlflow.pyfunc.load_model(model_info.model_uri)
+        calls = []
+        get_dtypes = Predictor.get_pandas_dtypes_from_input_schema
+        monkeypatch.setattr(
+            Predictor, "get_pandas_dtypes_from_input_schema", staticmethod(lambda s: calls.append(s) or get_dtypes(s))
+        )
+        config = Config(
+            src_features="dummy",
+            src_model="models:/test-model/1",
+            dst_y_hat="dummy",
+            batch_predictions=True,
+            batch_size=10,
+        )
+
+        df_y_hat = Predictor(config).run(model_mlflow, X)
+
+        assert len(calls) == 1
+        assert PreparedModel(model_mlflow).dtypes["id"] == np.dtype("float64")
+        assert np.isclose(y_hat, df_y_hat["y_hat"]).all()
@@ -0,0 +1,94 @@
+import threading
+import time
+
+import pytest
+
+from models.streaming import StageTiming, bottleneck, run_stages
+
+
+@pytest.mark.parametrize("queue_size", [0, 1, 3])
+def test_run_stages_keeps_order(queue_size: int):
+    written = []
+
+    timings = run_stages(range(100), lambda x: x * 2, written.append, queue_size)
+
+    assert written == [x * 2 for x in range(100)]
+    assert set(timings) == {"read", "predict", "write"}
+    assert all(isinstance(t, StageTiming) for t in timings.values())
+
+
+def test_run_stages_threads():
+    threads = {}
+
+    def read():
+        threads["read"] = threading.current_thread()
+        yield 1
+
+    def predict(x):
+        threads["predict"] = threading.current_thread()
+        return x
+
+    def write(x):
+        threads["write"] = threading.current_thread()
+
+    run_stages(read(), predict, write)
+
+    assert threads["predict"] is threading.current_thread()
+    assert threads["read"] is not threading.current_thread()
+    assert threads["write"] is not threading.current_thread()
+
+
+def test_run_stages_bottleneck():
+    def slow_write(x):
+        time.sleep(0.02)
+
+    timings = run_stages(range(10), lambda x: x, slow_write, queue_size=1)
+
+    assert bottleneck(timings) == "write"
+    assert timings["write"].busy >= 0.2
+    assert timings["predict"].waiting > timings["write"].waiting  # NOTE: blocked on the full write queue
+
+
+def test_run_stages_overlaps_io():
+    def slow_read():
+        for i in range(10):
+            time.sleep(0.05)
+            yield i
+
+    def slow_write(x):
+        time.sleep(0.05)
+
+    ts = time.perf_counter()
+    run_stages(slow_read(), lambda x: x, slow_write, queue_size=2)
+    elapsed = time.perf_counter() - ts
+
+    assert elapsed < 0.8  # NOTE: 1s one after the other
+
+
+def test_run_stages_read_error():
+    def read():
+        yield 1
+        raise OSError("read failed")
+
+    written = []
+    with pytest.raises(OSError, match="read failed"):
+        run_stages(read(), lambda x: x, written.append)
+    assert written == [1]
+
+
+def test_run_stages_predict_error():
+    def predict(x):
+        if x == 5:
+            raise ValueError("predict failed")
+        return x
+
+    with pytest.raises(ValueError, match="predict failed"):
+        run_stages(range(1000), predict, lambda x: None, queue_size=1)
+
+
+def test_run_stages_write_error():
+    def write(x):
+        raise OSError("write failed")
+
+    with pytest.raises(OSError, match="write failed"):
+        run_stages(range(1000), lambda x: x, write, queue_size=1)